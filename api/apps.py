@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from utils.sqlite import apply_pragmas
+        connection_created.connect(apply_pragmas,
+                                   dispatch_uid='hbnn_sqlite_pragmas')
@@ -1,34 +1,174 @@
+import asyncio
+import hashlib
+from calendar import timegm
 from functools import wraps
 
+from django.conf import settings
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import available_attrs
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
 
-from utils.auth import JWTManager
+from utils import response_cache
+from utils.auth import JWTManager, TokenUserDoesNotExist
+from utils.routers import reading_from_replica
 
 
 def jwt_login_required(view_func):
-    """JWT(Json Web Token)을 통한 인증이 필요한 경우에 사용합니다"""
+    """JWT(Json Web Token)을 통한 인증이 필요한 경우에 사용합니다
+
+        토큰만 검증하고 request.user 에 LazyUser 를 붙이므로, 핸들러가
+        id 외의 속성을 읽을 때 비로소 user_cache 나 DB 에서 유저를
+        가져옵니다. 그때 유저가 지워졌으면 401 을 응답합니다.
+        id 만 쓰는 핸들러는 request.user.exists() 로 확인합니다.
+
+        async 핸들러에도 사용할 수 있습니다. async 핸들러에서
+        request.user 의 id 외의 속성은 utils.aio.run_sync 안에서 읽어야
+        합니다.
+    """
     def fail():
         from api.views import APIView
         return APIView.response(status_code=401, message='JWT required')
 
+    def authenticate(request) -> bool:
+        # /api/batch/ 의 하위 요청은 배치가 검증한 유저를 함께 씁니다
+        if getattr(request, 'jwt_user', None) is not None:
+            request.user = request.jwt_user
+            return True
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization is None:
+            return False
+        auth_options = authorization.split(' ')
+        if len(auth_options) != 2:
+            return False
+        type_, token = auth_options
+        if type_.upper() != 'JWT':
+            return False
+        # 토큰만 검증하고, 유저는 필요할 때 조회합니다
+        user = JWTManager.decode_lazy(token=token)
+        if user is None:
+            return False
+        request.user = user
+        return True
+
     def decorator(view_func_):
+        if asyncio.iscoroutinefunction(view_func_):
+            @wraps(view_func_, assigned=available_attrs(view_func_))
+            async def _wrapped_async_view(view, *args, **kwargs):
+                if not authenticate(view.request):
+                    return fail()
+                try:
+                    return await view_func_(view, *args, **kwargs)
+                except TokenUserDoesNotExist:
+                    return fail()
+
+            return _wrapped_async_view
+
         @wraps(view_func_, assigned=available_attrs(view_func_))
         def _wrapped_view(view, *args, **kwargs):
-            authorization = view.request.META.get('HTTP_AUTHORIZATION')
-            if authorization is None:
+            if not authenticate(view.request):
                 return fail()
-            auth_options = authorization.split(' ')
-            if len(auth_options) != 2:
+            try:
+                return view_func_(view, *args, **kwargs)
+            except TokenUserDoesNotExist:
                 return fail()
-            type_, token = auth_options
-            if type_.upper() != 'JWT':
-                return fail()
-            user = JWTManager.decode(token=token)
-            if user is None:
-                return fail()
-            view.request.user = user
-            return view_func_(view, *args, **kwargs)
 
         return _wrapped_view
 
     return decorator(view_func)
+
+
+def conditional(state_func):
+    """If-None-Match, If-Modified-Since 조건부 요청을 처리합니다
+
+        state_func(view, request, *args, **kwargs) 는 본문을 만들기 전에
+        가벼운 쿼리로 리소스의 상태를 구해 (상태 문자열, 마지막 변경 시각)
+        을 반환합니다. None 을 반환하면 조건 없이 view 를 실행합니다.
+        세 번째 값으로 상태를 구하며 읽은 행 등을 함께 반환할 수 있습니다.
+
+        state_func 의 반환값은 request.conditional_state 로 view 에
+        넘겨지므로 view 는 같은 행을 다시 조회하지 않을 수 있습니다.
+        속성이 없으면 (conditional 을 거치지 않았으면) view 가 직접 조회합니다.
+
+        상태가 같으면 직렬화 없이 304 Not Modified 로 응답합니다.
+    """
+    def decorator(view_func_):
+        @wraps(view_func_, assigned=available_attrs(view_func_))
+        def _wrapped_view(view, *args, **kwargs):
+            request = view.request
+            state = state_func(view, *args, **kwargs)
+            request.conditional_state = state
+            if state is None:
+                return view_func_(view, *args, **kwargs)
+
+            key, last_modified = state[:2]
+            # 같은 리소스라도 쿼리스트링이 다르면 다른 응답입니다
+            key = f'{request.get_full_path()}|{key}'
+            etag = quote_etag(hashlib.md5(key.encode('utf8')).hexdigest())
+            timestamp = timegm(last_modified.utctimetuple()) \
+                if last_modified else None
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_func_(view, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            return response
+
+        return _wrapped_view
+
+    return decorator
+
+
+def cached_response(dependencies_func):
+    """GET 응답을 API_RESPONSE_CACHE 에 저장합니다
+
+        dependencies_func(view, request, *args, **kwargs) 는 응답이 의존하는
+        버전 이름 목록 (예: ['user:{id}']) 을 반환합니다. 캐시 키에 각
+        버전이 들어가므로 모델 시그널이 버전을 올리면 이전 응답은 다시
+        쓰이지 않습니다. 버전은 view 를 실행하기 전에 읽으므로, 실행 중에
+        변경이 일어나도 오래된 응답이 새 버전으로 저장되지 않습니다.
+
+        캐시된 응답의 ETag, Last-Modified 로 조건부 요청도 DB 없이
+        처리합니다.
+
+        복제본에서 읽어 만든 응답은 복제 지연 중의 값일 수 있으므로 따로
+        저장합니다. 쓰기 직후 primary 에서 읽는 요청 (APIView.PRIMARY_COOKIE)
+        은 primary 에서 만든 응답만 받습니다.
+    """
+    def decorator(view_func_):
+        @wraps(view_func_, assigned=available_attrs(view_func_))
+        def _wrapped_view(view, *args, **kwargs):
+            request = view.request
+            names = dependencies_func(view, *args, **kwargs)
+            versions = response_cache.get_versions(names)
+            replica = reading_from_replica()
+            key = response_cache.response_key(request.get_full_path(),
+                                              versions, replica=replica)
+            cache = response_cache.get_cache()
+
+            response = cache.get(key)
+            if response is not None:
+                last_modified = response.get('Last-Modified')
+                if last_modified:
+                    last_modified = parse_http_date_safe(last_modified)
+                return get_conditional_response(
+                    request, etag=response.get('ETag'),
+                    last_modified=last_modified, response=response)
+
+            response = view_func_(view, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+                if replica:
+                    # 복제 지연 중에 읽은 값일 수 있으므로 짧게 둡니다
+                    timeout = min(timeout,
+                                  settings.DATABASE_REPLICA_STICKY_SECONDS)
+                cache.set(key, response, timeout)
+            return response
+
+        return _wrapped_view
+
+    return decorator
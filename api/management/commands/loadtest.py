@@ -0,0 +1,495 @@
+import argparse
+import gc
+import http.client
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (WSGIRequestHandler, WSGIServer,
+                                          get_internal_wsgi_application)
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+from utils.asgi import ASGIServer
+from utils.tables import print_table
+
+DEFAULT_MIX = 'users=4,user=2,profile=3,profile_put=1,auth=1'
+
+
+def percentile(timings: typing.Sequence[float], p: float) -> float:
+    """정렬된 timings 의 p 백분위수 (nearest-rank)"""
+    if not timings:
+        return 0.
+    rank = max(int(round(p / 100 * len(timings) + .5)) - 1, 0)
+    return timings[min(rank, len(timings) - 1)]
+
+
+def summarize(timings: typing.List[float], statuses: Counter,
+              seconds: float) -> dict:
+    timings = sorted(timings)
+    count = len(timings)
+    errors = sum(n for status, n in statuses.items()
+                 if status == 'error' or int(status) >= 400)
+    return OrderedDict((
+        ('requests', count),
+        ('errors', errors),
+        ('statuses', OrderedDict(sorted(statuses.items()))),
+        ('rps', round(count / seconds, 1) if seconds else 0.),
+        ('mean_ms', round(sum(timings) / count * 1000, 2) if count else 0.),
+        ('p50_ms', round(percentile(timings, 50) * 1000, 2)),
+        ('p95_ms', round(percentile(timings, 95) * 1000, 2)),
+        ('p99_ms', round(percentile(timings, 99) * 1000, 2)),
+    ))
+
+
+def current_rss() -> int:
+    """이 프로세스의 현재 RSS (바이트)
+
+        /proc 이 없으면 getrusage 의 (지금까지의) 최대 RSS 입니다.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 는 KB, macOS 는 바이트 단위입니다
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class MemorySampler:
+    """블록 안에서 이 프로세스의 RSS 를 interval 초마다 잽니다
+
+        클라이언트와 섞이지 않도록 서버의 자식 프로세스 (--serve) 에서
+        사용합니다.
+    """
+
+    def __init__(self, interval: float = .1):
+        self.interval = interval
+        self.start = self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> 'MemorySampler':
+        self.start = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        self.peak = max(self.peak, current_rss())
+
+    def report(self) -> 'OrderedDict[str, float]':
+        mb = 1024 * 1024
+        return OrderedDict((
+            ('rss_start_mb', round(self.start / mb, 1)),
+            ('rss_peak_mb', round(self.peak / mb, 1)),
+            ('rss_growth_mb', round((self.peak - self.start) / mb, 1)),
+        ))
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestServer(WSGIServer):
+    """threads 개의 스레드로 요청을 처리하는 WSGI 서버
+
+        ASGI 와 같은 스레드 수로 비교할 수 있도록 요청마다 스레드를
+        만들지 않고 풀을 사용합니다.
+    """
+    # 동시에 접속하는 클라이언트가 많으므로 대기열을 늘립니다
+    request_queue_size = 1024
+
+    def __init__(self, *args, threads: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='loadtest-wsgi')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request,
+                             client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+class Client:
+    """부하 테스트용 HTTP 클라이언트 (요청마다 새로 연결합니다)"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method: str, path: str,
+                data: typing.Optional[dict] = None,
+                token: typing.Optional[str] = None) -> typing.Tuple[int, dict]:
+        headers = {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if token is not None:
+            headers['Authorization'] = f'JWT {token}'
+        conn = http.client.HTTPConnection(self.host, self.port,
+                                          timeout=self.timeout)
+        try:
+            conn.request(method, self.prefix + path, body=body,
+                         headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+        finally:
+            conn.close()
+        try:
+            payload = json.loads(content.decode('utf8'))
+        except ValueError:
+            payload = None
+        return response.status, payload
+
+
+class Command(BaseCommand):
+    help = ('Drive a weighted mix of API calls from concurrent clients and '
+            'report throughput and p50/p95/p99 latency per endpoint')
+
+    # 서버 프로세스가 없는 상태에서 데이터베이스를 바꿀 수 있도록 합니다
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server (e.g. http://127.0.0.1:8000). '
+                 'Without it the app is served by a child process per '
+                 'server.')
+        parser.add_argument(
+            '--server', choices=('wsgi', 'asgi', 'both'), default='wsgi',
+            help='Server to start in a child process; both runs WSGI then '
+                 'ASGI, each in its own process (default: wsgi)')
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Request threads of the WSGI server, or ASYNC_THREADS of '
+                 'the ASGI app (default: 8)')
+        parser.add_argument(
+            '--database',
+            help='SQLite file for the started server '
+                 '(default: a new temporary database)')
+        parser.add_argument('--serve', choices=('wsgi', 'asgi'),
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds to run after setup')
+        parser.add_argument('--users', type=int, default=None,
+                            help='Users to sign up before the run '
+                                 '(default: --clients)')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f'Weighted scenarios '
+                                 f'(default: {DEFAULT_MIX})')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--json', dest='json_path',
+                            help="Write the report as JSON ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['serve'] is not None:
+            return self.serve(options['serve'], options['threads'],
+                              options['database'])
+        mix = self.parse_mix(options['mix'])
+
+        if options['url'] is not None:
+            report = self.load_test(options['url'], mix, options)
+            report['target'] = options['url']
+            reports = [report]
+        else:
+            reports = self.load_test_in_process(mix, options)
+
+        for report in reports:
+            self.print_report(report)
+        # --server both 이면 JSON 은 보고서의 목록입니다
+        result = reports[0] if len(reports) == 1 else reports
+        json_path = options['json_path']
+        if json_path == '-':
+            self.stdout.write(json.dumps(result, indent=2))
+        elif json_path:
+            with open(json_path, 'w') as f:
+                json.dump(result, f, indent=2)
+
+    def load_test(self, url: str, mix: 'OrderedDict[str, float]',
+                  options: dict) -> dict:
+        client = Client(url, options['timeout'])
+        accounts = self.setup_accounts(
+            client, options['users'] or options['clients'])
+        return self.run(client, accounts, mix, options)
+
+    def load_test_in_process(self, mix: 'OrderedDict[str, float]',
+                             options: dict) -> typing.List[dict]:
+        directory = None
+        database = options['database']
+        if database is None:
+            directory = tempfile.TemporaryDirectory()
+            database = os.path.join(directory.name, 'loadtest.sqlite3')
+        servers = ('wsgi', 'asgi') if options['server'] == 'both' \
+            else (options['server'], )
+        threads = options['threads']
+
+        reports = []
+        try:
+            self.setup_database(database)
+            for server in servers:
+                # 서버마다 새 프로세스에서 띄우고 그 프로세스의 RSS 를 잽니다
+                process = subprocess.Popen(
+                    [sys.executable, '-m', 'django', 'loadtest',
+                     '--serve', server, '--threads', str(threads),
+                     '--database', database],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    universal_newlines=True)
+                try:
+                    url = process.stdout.readline().strip()
+                    if not url:
+                        raise CommandError(f'{server} server did not start')
+                    report = self.load_test(url, mix, options)
+                finally:
+                    # stdin 을 닫으면 서버가 멈추고 메모리 보고서를 씁니다
+                    process.stdin.close()
+                    memory = process.stdout.read()
+                    process.wait()
+                report['target'] = f'{server} process, {threads} threads'
+                report['server'] = server
+                report['threads'] = threads
+                report['memory'] = json.loads(memory,
+                                              object_pairs_hook=OrderedDict)
+                reports.append(report)
+        finally:
+            if directory is not None:
+                directory.cleanup()
+        return reports
+
+    def serve(self, server: str, threads: int, database: str) -> None:
+        """(--serve) 서버를 띄워 URL 을 쓰고, stdin 이 닫히면 RSS 를 씁니다"""
+        self.setup_database(database)
+        gc.collect()
+        # 서버의 스레드와 연결을 포함하도록 띄우기 전부터 잽니다
+        with MemorySampler() as memory:
+            stop, url = self.start_server(server, threads)
+            self.stdout.write(url)
+            self.stdout.flush()
+            sys.stdin.read()
+            stop()
+        self.stdout.write(json.dumps(memory.report()))
+
+    def parse_mix(self, value: str) -> 'OrderedDict[str, float]':
+        mix = OrderedDict()
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            name = name.strip()
+            if name not in self.scenarios:
+                choices = ', '.join(self.scenarios)
+                raise CommandError(f'Unknown scenario: {name} '
+                                   f'(choose from {choices})')
+            try:
+                mix[name] = float(weight or 1)
+            except ValueError:
+                raise CommandError(f'Invalid weight: {item}')
+        if not any(mix.values()):
+            raise CommandError('--mix needs a positive weight')
+        return mix
+
+    def setup_database(self, database: str) -> None:
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'] = database
+        connections[DEFAULT_DB_ALIAS].close()
+        call_command('migrate', verbosity=0)
+
+    def start_server(self, server: str,
+                     threads: int) -> typing.Tuple[typing.Callable, str]:
+        """서버를 스레드에서 띄우고 (멈추는 함수, URL) 을 돌려줍니다"""
+        if server == 'asgi':
+            # 스레드 풀은 처음 사용할 때 만들어집니다
+            settings.ASYNC_THREADS = threads
+            asgi_server = ASGIServer(import_string('hbnn.asgi.application'))
+            host, port = asgi_server.start()
+            return asgi_server.shutdown, f'http://{host}:{port}'
+
+        wsgi_server = LoadTestServer(('127.0.0.1', 0), QuietWSGIRequestHandler,
+                                     threads=threads)
+        wsgi_server.set_app(get_internal_wsgi_application())
+        threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+        host, port = wsgi_server.server_address[:2]
+
+        def stop():
+            wsgi_server.shutdown()
+            wsgi_server.server_close()
+        return stop, f'http://{host}:{port}'
+
+    def setup_accounts(self, client: Client, count: int) -> typing.List[dict]:
+        """부하 테스트에 쓸 유저를 가입시키고 토큰과 프로파일을 만듭니다"""
+        run_id = uuid.uuid4().hex[:8]
+        password = uuid.uuid4().hex
+
+        def request(what, *args, **kwargs):
+            # 해싱 풀이 가득 차면 503 이므로 잠시 뒤 다시 시도합니다
+            for attempt in range(20):
+                status, payload = client.request(*args, **kwargs)
+                if status != 503:
+                    break
+                time.sleep(.1 * (attempt + 1))
+            if status != 200:
+                raise CommandError(f'{what} failed ({status}): {payload}')
+            return payload['data']
+
+        def setup(i):
+            email = f'loadtest-{run_id}-{i}@hbnn.kr'
+            user_id = request('Sign up', 'POST', '/api/users/', {
+                'email': email,
+                'username': f'loadtest-{run_id}-{i}',
+                'password': password,
+            })['pk']
+            token = request('Login', 'POST', '/api/auth/', {
+                'email': email, 'password': password})['token']
+            request('Profile', 'POST', f'/api/users/{user_id}/profile/', {
+                'taste': i % 5 + 1,
+                'introduction': '부하 테스트',
+                'description': '부하 테스트',
+            }, token=token)
+            return {'id': user_id, 'email': email, 'password': password,
+                    'token': token}
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return list(executor.map(setup, range(count)))
+
+    # 시나리오: (client, rng, account, accounts) -> HTTP 상태 코드
+
+    def scenario_users(self, client, rng, account, accounts):
+        return client.request('GET', '/api/users/?limit=20')[0]
+
+    def scenario_user(self, client, rng, account, accounts):
+        user_id = rng.choice(accounts)['id']
+        return client.request('GET', f'/api/users/{user_id}/')[0]
+
+    def scenario_profile(self, client, rng, account, accounts):
+        user_id = rng.choice(accounts)['id']
+        return client.request('GET', f'/api/users/{user_id}/profile/',
+                              token=account['token'])[0]
+
+    def scenario_profile_put(self, client, rng, account, accounts):
+        return client.request(
+            'PUT', f'/api/users/{account["id"]}/profile/',
+            {'introduction': f'부하 테스트 {rng.random()}'},
+            token=account['token'])[0]
+
+    def scenario_auth(self, client, rng, account, accounts):
+        return client.request('POST', '/api/auth/', {
+            'email': account['email'], 'password': account['password']})[0]
+
+    def scenario_signup(self, client, rng, account, accounts):
+        name = f'loadtest-{uuid.uuid4().hex}'
+        return client.request('POST', '/api/users/', {
+            'email': f'{name}@hbnn.kr', 'username': name,
+            'password': account['password']})[0]
+
+    scenarios = OrderedDict((
+        ('users', scenario_users),
+        ('user', scenario_user),
+        ('profile', scenario_profile),
+        ('profile_put', scenario_profile_put),
+        ('auth', scenario_auth),
+        ('signup', scenario_signup),
+    ))
+
+    def run(self, client: Client, accounts: typing.List[dict],
+            mix: 'OrderedDict[str, float]', options: dict) -> dict:
+        names = [name for name, weight in mix.items() if weight > 0]
+        weights = [mix[name] for name in names]
+        seed = options['seed']
+        deadline = time.monotonic() + options['duration']
+
+        def client_loop(i):
+            rng = random.Random(None if seed is None else seed + i)
+            account = accounts[i % len(accounts)]
+            timings = {name: [] for name in names}
+            statuses = {name: Counter() for name in names}
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                scenario = self.scenarios[name]
+                started_at = time.perf_counter()
+                try:
+                    status = str(scenario(self, client, rng, account,
+                                          accounts))
+                except (OSError, http.client.HTTPException):
+                    status = 'error'
+                timings[name].append(time.perf_counter() - started_at)
+                statuses[name][status] += 1
+            return timings, statuses
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['clients']) as executor:
+            results = list(executor.map(client_loop,
+                                        range(options['clients'])))
+        seconds = time.monotonic() - started_at
+
+        endpoints = OrderedDict()
+        all_timings, all_statuses = [], Counter()
+        for name in names:
+            timings = [t for result, _ in results for t in result[name]]
+            statuses = sum((result[name] for _, result in results),
+                           Counter())
+            endpoints[name] = summarize(timings, statuses, seconds)
+            all_timings.extend(timings)
+            all_statuses.update(statuses)
+
+        return OrderedDict((
+            ('clients', options['clients']),
+            ('duration', round(seconds, 3)),
+            ('mix', mix),
+            ('endpoints', endpoints),
+            ('total', summarize(all_timings, all_statuses, seconds)),
+        ))
+
+    def print_report(self, report: dict) -> None:
+        header = ('endpoint', 'requests', 'errors', 'rps', 'p50 ms',
+                  'p95 ms', 'p99 ms')
+        rows = [
+            (name, stats['requests'], stats['errors'], stats['rps'],
+             stats['p50_ms'], stats['p95_ms'], stats['p99_ms'])
+            for name, stats in (*report['endpoints'].items(),
+                                ('total', report['total']))
+        ]
+        self.stdout.write(f'{report["target"]}: {report["clients"]} clients, '
+                          f'{report["duration"]}s')
+        print_table(rows, header, write=self.stdout.write)
+        memory = report.get('memory')
+        if memory is not None:
+            self.stdout.write(f'RSS {memory["rss_start_mb"]} MB -> peak '
+                              f'{memory["rss_peak_mb"]} MB '
+                              f'(+{memory["rss_growth_mb"]} MB)')
@@ -0,0 +1,64 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Copy the default SQLite database into every alias in '
+            'DATABASE_REPLICAS (a local stand-in for replication)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repeat every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS is empty')
+        for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS):
+            if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias} is not a SQLite database')
+
+        while True:
+            started_at = time.monotonic()
+            self.replicate(databases)
+            self.stdout.write(
+                f'Replicated in {time.monotonic() - started_at:.3f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def replicate(databases):
+        source = sqlite3.connect(databases[DEFAULT_DB_ALIAS]['NAME'],
+                                 isolation_level=None)
+        try:
+            # 읽기 트랜잭션 안에서 덤프하여 한 시점의 primary 를 복사합니다
+            source.execute('BEGIN')
+            try:
+                dump = [statement for statement in source.iterdump()
+                        if statement not in ('BEGIN TRANSACTION;',
+                                             'COMMIT;')]
+            finally:
+                source.execute('COMMIT')
+        finally:
+            source.close()
+
+        for alias in settings.DATABASE_REPLICAS:
+            target = sqlite3.connect(databases[alias]['NAME'],
+                                     isolation_level=None)
+            try:
+                # 복제본을 읽는 쪽은 한 트랜잭션으로 바뀐 전후만 봅니다
+                objects = target.execute(
+                    "SELECT type, name FROM sqlite_master "
+                    "WHERE type IN ('table', 'view') "
+                    "AND name NOT LIKE 'sqlite_%'").fetchall()
+                drops = [f'DROP {type_.upper()} IF EXISTS "{name}";'
+                         for type_, name in objects]
+                target.executescript('\n'.join(
+                    ['BEGIN;', *drops, *dump, 'COMMIT;']))
+            finally:
+                target.close()
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from utils import aio
+from utils.compression import Compressor, choose_encoding, compress
+from utils.metrics import FileExporter, registry
+from utils.query_budget import QueryBudget
+
+logger = logging.getLogger('hbnn.query_budget')
+
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576,
+                4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+request_seconds = registry.histogram(
+    'hbnn_http_request_seconds',
+    'Time from receiving a request to its last response byte.',
+    labelnames=('route', 'method'))
+requests_total = registry.counter(
+    'hbnn_http_requests_total',
+    'Handled requests by route and status code.',
+    labelnames=('route', 'method', 'status'))
+response_bytes = registry.histogram(
+    'hbnn_http_response_bytes',
+    'Response body size.',
+    labelnames=('route', 'method'), buckets=SIZE_BUCKETS)
+request_queries = registry.histogram(
+    'hbnn_http_request_queries',
+    'SQL queries executed while handling a request.',
+    labelnames=('route', 'method'), buckets=QUERY_BUCKETS)
+request_query_seconds = registry.histogram(
+    'hbnn_http_request_query_seconds',
+    'Time spent in SQL while handling a request.',
+    labelnames=('route', 'method'))
+
+compression_input_bytes = registry.counter(
+    'hbnn_compression_input_bytes_total',
+    'Response bytes before compression.',
+    labelnames=('route', 'encoding'))
+compression_output_bytes = registry.counter(
+    'hbnn_compression_output_bytes_total',
+    'Response bytes after compression.',
+    labelnames=('route', 'encoding'))
+compression_saved_bytes = registry.counter(
+    'hbnn_compression_saved_bytes_total',
+    'Bytes saved by compression.',
+    labelnames=('route', 'encoding'))
+compression_cpu_seconds = registry.counter(
+    'hbnn_compression_cpu_seconds_total',
+    'CPU time spent compressing responses.',
+    labelnames=('route', 'encoding'))
+compression_skipped = registry.counter(
+    'hbnn_compression_skipped_total',
+    'Responses sent uncompressed by reason.',
+    labelnames=('route', 'reason'))
+
+exporter = FileExporter(registry, settings.METRICS_DIR,
+                        settings.METRICS_FLUSH_INTERVAL)
+
+
+def api_view_class(request):
+    """요청을 처리한 view 가 APIView 이면 그 클래스, 아니면 None"""
+    from api.views import APIView
+    match = request.resolver_match
+    view_class = getattr(match.func, 'view_class', None) \
+        if match is not None else None
+    if view_class is None or not issubclass(view_class, APIView):
+        return None
+    return view_class
+
+
+class QueryRecorder:
+    """connection.execute_wrapper 로 쿼리 수와 시간을 셉니다"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started_at
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """api 의 URL 이름(api_*)별로 지연 시간, 쿼리 수와 시간,
+        응답 크기, 상태 코드를 기록합니다
+
+        스트리밍 응답은 마지막 조각을 보낼 때까지를 잽니다.
+        다른 미들웨어의 시간까지 포함하도록 MIDDLEWARE 의 맨 앞에 둡니다.
+
+        ASGI 의 async 핸들러 앞에서는 run_sync 로 실행한 쿼리를 셉니다.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        started_at = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        return self.finish(request, response, stack, recorder, started_at)
+
+    async def acall(self, request):
+        recorder = QueryRecorder()
+        started_at = time.perf_counter()
+        with aio.execute_wrapper(recorder):
+            response = await self.get_response(request)
+        return self.finish(request, response, ExitStack(), recorder,
+                           started_at)
+
+    def finish(self, request, response, stack, recorder, started_at):
+        match = request.resolver_match
+        route = match.url_name if match is not None else None
+        if not route or not route.startswith('api_'):
+            stack.close()
+            return response
+
+        labels = {'route': route, 'method': request.method}
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, stack, recorder, started_at,
+                labels, response.status_code)
+            return response
+
+        stack.close()
+        self.record(labels, response.status_code, started_at, recorder,
+                    len(response.content))
+        return response
+
+    def stream(self, content, stack, recorder, started_at, labels, status):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            stack.close()
+            self.record(labels, status, started_at, recorder, size)
+
+    @staticmethod
+    def record(labels, status, started_at, recorder, size):
+        request_seconds.observe(time.perf_counter() - started_at, **labels)
+        requests_total.inc(status=status, **labels)
+        response_bytes.observe(size, **labels)
+        request_queries.observe(recorder.count, **labels)
+        request_query_seconds.observe(recorder.seconds, **labels)
+        exporter.maybe_flush()
+
+
+class QueryBudgetMiddleware:
+    """개발 환경(DEBUG)에서 APIView 의 query_budget 을 넘은 요청을
+        경고 로그로 남깁니다
+
+        query_budget 에 없는 메서드는 QUERY_BUDGET_DEFAULT 를 사용합니다.
+        스트리밍 응답의 본문에서 실행되는 쿼리는 세지 않습니다.
+
+        ASGI 의 async 핸들러 앞에서는 run_sync 로 실행한 쿼리를 셉니다.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        with QueryBudget(raise_exception=False) as budget:
+            response = self.get_response(request)
+        return self.check(request, response, budget)
+
+    async def acall(self, request):
+        budget = QueryBudget(raise_exception=False)
+        with aio.execute_wrapper(budget.record):
+            response = await self.get_response(request)
+        return self.check(request, response, budget)
+
+    @staticmethod
+    def check(request, response, budget):
+        view_class = api_view_class(request)
+        if view_class is None:
+            return response
+
+        budget.max_queries, budget.max_repeats = view_class.query_budget.get(
+            request.method.lower(), settings.QUERY_BUDGET_DEFAULT)
+        for violation in budget.violations():
+            logger.warning('%s %s (%s): %s', request.method, request.path,
+                           view_class.__name__, violation)
+        return response
+
+
+class CompressionMiddleware:
+    """APIView 의 응답을 Accept-Encoding 에 따라 gzip 으로
+        (brotli 가 설치되어 있으면 br 로도) 압축합니다
+
+        COMPRESSION_MIN_SIZE 보다 작은 응답은 압축하지 않으며, 스트리밍
+        응답은 크기를 미리 알 수 없으므로 조각마다 압축합니다.
+        압축 수준은 APIView.compression_level 로 view 마다 바꿀 수 있고
+        0 이면 압축하지 않습니다.
+
+        압축 전후 바이트와 압축에 쓴 CPU 시간을 메트릭으로 남깁니다.
+    """
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.process(request, self.get_response(request))
+
+    async def acall(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        view_class = api_view_class(request)
+        if view_class is None or response.has_header('Content-Encoding'):
+            return response
+
+        level = view_class.compression_level
+        if level is None:
+            level = settings.COMPRESSION_LEVEL
+        if not level:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        route = request.resolver_match.url_name
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING',
+                                                    ''))
+        if encoding is None:
+            compression_skipped.inc(route=route, reason='not_accepted')
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, Compressor(encoding, level),
+                route)
+        else:
+            content = response.content
+            if len(content) < settings.COMPRESSION_MIN_SIZE:
+                compression_skipped.inc(route=route, reason='small')
+                return response
+            # 다른 스레드의 시간이 섞이지 않도록 이 스레드의 CPU 시간을
+            # 잽니다 (time.thread_time, Python 3.7+)
+            started_at = time.thread_time()
+            compressed = compress(content, encoding, level)
+            seconds = time.thread_time() - started_at
+            if len(compressed) >= len(content):
+                compression_skipped.inc(route=route, reason='larger')
+                return response
+            self.record(route, encoding, len(content), len(compressed),
+                        seconds)
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # 본문이 달라지므로 ETag 는 약한 비교만 가능합니다
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def stream(self, content, compressor, route):
+        size = compressed_size = 0
+        seconds = 0.
+        try:
+            for chunk in content:
+                size += len(chunk)
+                started_at = time.thread_time()
+                data = compressor.compress(chunk)
+                seconds += time.thread_time() - started_at
+                if data:
+                    compressed_size += len(data)
+                    yield data
+            started_at = time.thread_time()
+            data = compressor.flush()
+            seconds += time.thread_time() - started_at
+            compressed_size += len(data)
+            yield data
+        finally:
+            self.record(route, compressor.encoding, size, compressed_size,
+                        seconds)
+
+    @staticmethod
+    def record(route, encoding, size, compressed_size, seconds):
+        labels = {'route': route, 'encoding': encoding}
+        compression_input_bytes.inc(size, **labels)
+        compression_output_bytes.inc(compressed_size, **labels)
+        compression_saved_bytes.inc(size - compressed_size, **labels)
+        compression_cpu_seconds.inc(seconds, **labels)
@@ -1,11 +1,33 @@
+import asyncio
+import gzip
 import json
+import tempfile
+from io import StringIO
+from unittest import mock
 from urllib.parse import urljoin, urlencode
 
-from django.test import LiveServerTestCase, TestCase
+from django.conf import settings
+from django.core import serializers, signals
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import (Client, LiveServerTestCase, RequestFactory,
+                         TestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from user.models import User, UserProfile
-from api.views import APIView
+from api.decorators import jwt_login_required
+from api.management.commands.loadtest import MemorySampler
+from api.middleware import compression_saved_bytes, compression_skipped
+from api.views import APIView, UserAPIView, UserProfileAPIView
+from user.matching import taste_index
+from utils.asgi import ASGIHandler, ASGIServer
+from utils.auth import JWTManager
+from utils.hashing import hashing_pool
+from utils.health import HealthChecker, check_database
+from utils.query_budget import QueryBudget
 
 
 class ApiViewTestCase(TestCase):
@@ -46,6 +68,25 @@ class ApiViewTestCase(TestCase):
                 if len(args) >= 2 and isinstance(args[1], int) else 200
             self.assertEqual(response.status_code, status_code)
 
+    def test_serialize(self):
+        user = User.objects.create_user('test@test.com', 'test', 'test')
+        UserProfile.objects.create(user=user, taste=UserProfile.KOREAN,
+                                   introduction='안녕하세요',
+                                   description='자세한 설명은 생략한다')
+
+        test_cases = (
+            (User.objects.all(), ('username', 'email', 'created_at')),
+            (UserProfile.objects.all(),
+             ('user', 'taste', 'introduction', 'description', 'modified_at')),
+        )
+        for queryset, fields in test_cases:
+            expect = json.loads(
+                serializers.serialize('json', queryset, fields=fields))
+            # QuerySet 은 .values() 로, 리스트는 인스턴스로 직렬화합니다
+            self.assertEqual(APIView.serialize(queryset, fields), expect)
+            self.assertEqual(APIView.serialize(list(queryset), fields),
+                             expect)
+
 
 class PingViewTestCase(LiveServerTestCase):
     def test_get(self):
@@ -63,6 +104,275 @@ class PingViewTestCase(LiveServerTestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class HealthViewTestCase(TestCase):
+    def test_live(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api_live'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'ALIVE')
+
+    def test_ready(self):
+        checker = HealthChecker(checks={'database': check_database},
+                                interval=60, stale_after=60)
+        with mock.patch('api.views.health', checker), \
+                mock.patch.object(checker, 'start'):
+            # 첫 검사가 끝나기 전에는 준비되지 않은 상태입니다
+            response = self.client.get(reverse('api_ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['message'], 'NOT READY')
+
+            checker.refresh()
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('api_ready'))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()['data']
+            self.assertEqual(data['checks'],
+                             {'database': {'ok': True, 'message': 'ok'}})
+            self.assertLess(data['age'], 60)
+
+            checker.checks['failing'] = mock.Mock(side_effect=OSError('x'))
+            checker.refresh()
+            response = self.client.get(reverse('api_ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['data']['checks']['failing'],
+                             {'ok': False, 'message': 'OSError: x'})
+
+            checker.checks.pop('failing')
+            checker.refresh()
+            checker.stale_after = 0
+            response = self.client.get(reverse('api_ready'))
+            self.assertEqual(response.status_code, 503)
+
+
+class MetricsViewTestCase(TestCase):
+    def sample(self, name, **labels):
+        content = self.client.get(reverse('api_metrics')).content
+        label = ','.join(f'{k}="{v}"' for k, v in labels.items())
+        prefix = f'{name}{{{label}}} '
+        for line in content.decode('utf8').splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return 0.
+
+    def test_metrics(self):
+        User.objects.create_user('test@test.com', 'test', 'test')
+        labels = {'route': 'api_user', 'method': 'GET'}
+        requests = self.sample('hbnn_http_requests_total', **labels,
+                               status=200)
+        queries = self.sample('hbnn_http_request_queries_bucket', **labels,
+                              le='0')
+
+        response = self.client.get(reverse('api_metrics'))
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('# TYPE hbnn_http_request_seconds histogram',
+                      response.content.decode('utf8'))
+
+        self.client.get(reverse('api_user'))
+        self.assertEqual(self.sample('hbnn_http_requests_total', **labels,
+                                     status=200), requests + 1)
+        # 쿼리를 실행했으므로 0 개 구간에는 더해지지 않습니다
+        self.assertEqual(self.sample('hbnn_http_request_queries_bucket',
+                                     **labels, le='0'), queries)
+
+        # 스트리밍 응답은 본문을 다 읽은 뒤에 기록됩니다
+        before = self.sample('hbnn_http_response_bytes_sum', **labels)
+        response = self.client.get(reverse('api_user'), {'stream': 'json'})
+        self.assertEqual(self.sample('hbnn_http_response_bytes_sum',
+                                     **labels), before)
+        size = len(b''.join(response.streaming_content))
+        response.close()
+        self.assertEqual(self.sample('hbnn_http_response_bytes_sum',
+                                     **labels), before + size)
+
+    def test_cache_metrics(self):
+        user = User.objects.create_user('test@test.com', 'test', 'test')
+        JWTManager.invalidate_user(user.pk)
+        misses = self.sample('hbnn_cache_misses_total', cache='jwt_user')
+        hits = self.sample('hbnn_cache_hits_total', cache='jwt_user')
+
+        JWTManager.get_user(str(user.pk))
+        JWTManager.get_user(str(user.pk))
+        self.assertEqual(self.sample('hbnn_cache_misses_total',
+                                     cache='jwt_user'), misses + 1)
+        self.assertEqual(self.sample('hbnn_cache_hits_total',
+                                     cache='jwt_user'), hits + 1)
+        self.assertEqual(self.sample('hbnn_cache_entries', cache='jwt_user'),
+                         len(JWTManager.user_cache))
+        self.assertIn('hbnn_cache_entries{cache="fragment_user"}',
+                      self.client.get(reverse('api_metrics')).content
+                      .decode('utf8'))
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self):
+        caches[settings.API_RESPONSE_CACHE].clear()
+        User.objects.bulk_create(
+            User(email=f'test{i}@test.com', username=f'test{i}',
+                 password='test') for i in range(30))
+
+    def test_compress(self):
+        url = reverse('api_user')
+        saved = compression_saved_bytes.value(route='api_user',
+                                              encoding='gzip')
+        identity = self.client.get(url, {'limit': 30})
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', identity['Vary'])
+
+        response = self.client.get(url, {'limit': 30},
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertEqual(response['Content-Length'],
+                         str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/' + identity['ETag'])
+        self.assertEqual(
+            compression_saved_bytes.value(route='api_user', encoding='gzip'),
+            saved + len(identity.content) - len(response.content))
+
+    def test_stream(self):
+        url = reverse('api_user')
+        identity = self.client.get(url, {'stream': 'ndjson'})
+        content = b''.join(identity.streaming_content)
+        response = self.client.get(url, {'stream': 'ndjson'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                         content)
+
+    def test_skip(self):
+        user = User.objects.first()
+        small = compression_skipped.value(route='api_user', reason='small')
+        response = self.client.get(reverse('api_user', args=[user.id]),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(compression_skipped.value(route='api_user',
+                                                   reason='small'), small + 1)
+
+        response = self.client.get(reverse('api_user'), {'limit': 30},
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        # compression_level = 0 인 view 는 압축하지 않습니다
+        response = self.client.get(reverse('api_live'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+
+class FragmentCacheAPITestCase(TestCase):
+    def setUp(self):
+        caches[settings.API_RESPONSE_CACHE].clear()
+        User.objects.bulk_create(
+            User(email=f'test{i}@test.com', username=f'test{i}',
+                 password='test') for i in range(5))
+
+    def get_users(self):
+        # 응답 캐시를 거치지 않도록 비웁니다
+        caches[settings.API_RESPONSE_CACHE].clear()
+        return self.client.get(reverse('api_user')).json()['data']
+
+    def test_users(self):
+        expected = UserAPIView.user_serializer.serialize(
+            User.objects.order_by('created_at', 'id'))
+        self.assertEqual(self.get_users(), expected)
+
+        # 모든 조각이 캐시에 있으면 상태와 페이지의 키만 읽습니다
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_users(), expected)
+
+        user = User.objects.order_by('created_at', 'id')[2]
+        user.username = 'changed'
+        user.save()
+        with self.assertNumQueries(3):
+            users = self.get_users()
+        self.assertEqual(users[2]['fields']['username'], 'changed')
+
+        # 유저 하나도 ETag 를 위한 상태 쿼리만 실행합니다
+        caches[settings.API_RESPONSE_CACHE].clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_user', args=[user.id]))
+        self.assertEqual(response.json()['data'], users[2])
+
+
+class SparseFieldsTestCase(TestCase):
+    def setUp(self):
+        caches[settings.API_RESPONSE_CACHE].clear()
+        self.user = User.objects.create_user('test@test.com', 'test', 'test')
+        User.objects.create_user('test2@test.com', 'test2', 'test')
+        UserProfile.objects.create(user=self.user, taste=UserProfile.KOREAN,
+                                   introduction='안녕하세요',
+                                   description='자세한 설명은 생략한다')
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, HTTP_AUTHORIZATION=(
+                f'JWT {JWTManager.encode(user_id=str(self.user.id))}'))
+        sql = ' '.join(query['sql'] for query in queries)
+        return response, sql
+
+    def test_users(self):
+        response, sql = self.get(reverse('api_user'),
+                                 fields='created_at,username')
+        users = response.json()['data']
+        self.assertEqual([list(user['fields']) for user in users],
+                         [['username', 'created_at']] * 2)
+        self.assertNotIn('"email"', sql)
+        self.assertIsNone(response.json()['next'])
+
+        response, sql = self.get(reverse('api_user', args=[self.user.id]),
+                                 fields='email')
+        self.assertEqual(response.json()['data']['fields'],
+                         {'email': 'test@test.com'})
+        self.assertNotIn('"username"', sql)
+
+        response, _ = self.get(reverse('api_user'), fields='username',
+                               stream='ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(json.loads(lines[0])['data']['fields'],
+                         {'username': 'test'})
+
+        # 빈 값이면 fields 가 없을 때와 같이 전체 필드를 응답합니다
+        response, _ = self.get(reverse('api_user'), fields='')
+        self.assertEqual(response.json(), self.get(reverse('api_user'))[0]
+                         .json())
+
+        response, _ = self.get(reverse('api_user'), fields='username,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'],
+                         'Unknown fields: password')
+
+    def test_profile(self):
+        url = reverse('api_userprofile', args=[self.user.id])
+        with QueryBudget(max_queries=1):
+            response, sql = self.get(url, fields='user,taste')
+        self.assertEqual(response.json()['data']['fields'], {
+            'user': str(self.user.id), 'taste': UserProfile.KOREAN})
+        self.assertNotIn('"description"', sql)
+
+        response, _ = self.get(url, fields='description,secret')
+        self.assertEqual(response.status_code, 400)
+
+    def test_without_conditional(self):
+        # 데코레이터의 순서가 바뀌어 상태 함수가 실행되지 않아도 직접 읽습니다
+        factory = RequestFactory()
+        user_id = str(self.user.id)
+        for view_class, expected in (
+                (UserAPIView, {'username': 'test'}),
+                (UserProfileAPIView, {'taste': UserProfile.KOREAN})):
+            request = factory.get('/')
+            request.user = self.user
+            view = view_class()
+            view.setup(request, user_id)
+            handler = view_class.get
+            while hasattr(handler, '__wrapped__'):
+                handler = handler.__wrapped__
+            response = handler(view, request, user_id)
+            self.assertEqual(response.status_code, 200)
+            fields = json.loads(response.content)['data']['fields']
+            self.assertEqual({k: fields[k] for k in expected}, expected)
+
+
 class HBNNLiveServerTestCase(LiveServerTestCase):
     email = 'test@test.com'
     username = 'test'
@@ -71,6 +381,11 @@ class HBNNLiveServerTestCase(LiveServerTestCase):
     introduction = '안녕하세요'
     description = '자세한 설명은 생략한다'
 
+    def _pre_setup(self):
+        super()._pre_setup()
+        # 테스트마다 DB 를 비우므로 응답 캐시도 비웁니다
+        caches[settings.API_RESPONSE_CACHE].clear()
+
     def create_user(self):
         url = reverse('api_user')
         self.client.post(url, {
@@ -88,6 +403,166 @@ class HBNNLiveServerTestCase(LiveServerTestCase):
         return token
 
 
+class AsyncView(APIView):
+    @jwt_login_required
+    def get(self, request):
+        return self.response(data='sync')
+
+    @jwt_login_required
+    async def async_get(self, request):
+        return self.response(data=str(request.user.id))
+
+
+class AsyncAPIViewTestCase(TestCase):
+    def test_wsgi(self):
+        # WSGI 에서는 async 핸들러를 쓰지 않고 동기 핸들러를 실행합니다
+        user = User.objects.create_user('test@test.com', 'test', 'test')
+        view = AsyncView.as_view()
+        factory = RequestFactory()
+        self.assertTrue(AsyncView.is_async('GET'))
+        self.assertFalse(AsyncView.is_async('POST'))
+
+        token = JWTManager.encode(user_id=str(user.id))
+        with mock.patch('asyncio.run') as run:
+            response = view(factory.get('/',
+                                        HTTP_AUTHORIZATION=f'JWT {token}'))
+        run.assert_not_called()
+        self.assertEqual(json.loads(response.content)['data'], 'sync')
+
+    def test_asgi(self):
+        user = User.objects.create_user('test@test.com', 'test', 'test')
+        view = AsyncView.as_view()
+        request = RequestFactory().get('/')
+        request.is_asgi = True
+
+        response = asyncio.run(view(request))
+        self.assertEqual(response.status_code, 401)
+
+        token = JWTManager.encode(user_id=str(user.id))
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'JWT {token}')
+        request.is_asgi = True
+        response = asyncio.run(view(request))
+        self.assertEqual(json.loads(response.content)['data'], str(user.id))
+
+
+class SyncOnlyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        response['X-Sync-Only'] = '1'
+        return response
+
+
+class ASGIHandlerTestCase(HBNNLiveServerTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.application = ASGIHandler()
+
+    def asgi(self, method, path, data=None, token=None):
+        body = urlencode(data or {}).encode()
+        headers = [(b'content-type', b'application/x-www-form-urlencoded')]
+        if token is not None:
+            headers.append((b'authorization', token.encode()))
+        scope = {'type': 'http', 'method': method, 'path': path,
+                 'query_string': b'', 'headers': headers}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        start, *bodies = messages
+        content = b''.join(message['body'] for message in bodies)
+        self.headers = dict(start['headers'])
+        self.assertEqual(self.headers[b'Content-Length'],
+                         str(len(content)).encode())
+        return start['status'], json.loads(content.decode('utf8'))
+
+    def test_sync_view(self):
+        status, payload = self.asgi('GET', reverse('api_live'))
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['message'], 'ALIVE')
+
+    def test_async_view(self):
+        # 가입과 로그인은 ASGI 에서 async 핸들러 (async_post) 로 실행합니다
+        status, payload = self.asgi('POST', reverse('api_user'), {
+            'email': self.email,
+            'username': self.username,
+            'password': self.password,
+        })
+        self.assertEqual(status, 200)
+        user_id = payload['data']['pk']
+        self.assertTrue(User.objects.filter(email=self.email).exists())
+
+        status, _ = self.asgi('POST', reverse('api_auth'), {
+            'email': self.email, 'password': 'wrong'})
+        self.assertEqual(status, 400)
+        status, payload = self.asgi('POST', reverse('api_auth'), {
+            'email': self.email, 'password': self.password})
+        self.assertEqual(status, 200)
+        token = f"JWT {payload['data']['token']}"
+
+        url = reverse('api_userprofile', args=[user_id])
+        status, _ = self.asgi('POST', url, {
+            'taste': self.taste,
+            'introduction': self.introduction,
+            'description': self.description,
+        }, token=token)
+        self.assertEqual(status, 200)
+        status, payload = self.asgi('GET', url, token=token)
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['data']['fields']['introduction'],
+                         self.introduction)
+
+    def test_async_view_middleware(self):
+        # async 핸들러도 WSGI 와 같은 미들웨어와 시그널을 거칩니다
+        started = mock.Mock()
+        signals.request_started.connect(started)
+        self.addCleanup(signals.request_started.disconnect, started)
+        status, _ = self.asgi('POST', reverse('api_auth'), {
+            'email': self.email, 'password': self.password})
+        self.assertEqual(status, 400)
+        self.assertEqual(started.call_count, 1)
+        # XFrameOptionsMiddleware, CompressionMiddleware
+        self.assertEqual(self.headers[b'X-Frame-Options'], b'SAMEORIGIN')
+        self.assertEqual(self.headers[b'Vary'], b'Accept-Encoding')
+
+    def test_sync_only_middleware(self):
+        # async 로 감쌀 수 없는 미들웨어가 있으면 동기 체인에서 동기
+        # 핸들러를 실행합니다
+        middleware = [*settings.MIDDLEWARE,
+                      'api.test_api.SyncOnlyMiddleware']
+        with self.settings(MIDDLEWARE=middleware):
+            self.application = ASGIHandler()
+        self.assertIsNone(self.application._async_middleware_chain)
+
+        status, _ = self.asgi('POST', reverse('api_auth'), {
+            'email': self.email, 'password': self.password})
+        self.assertEqual(status, 400)
+        self.assertEqual(self.headers[b'X-Sync-Only'], b'1')
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.shutdown'},
+                    {'type': 'lifespan.startup'}]
+        sent = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
+
+
 class UserAPITestCase(HBNNLiveServerTestCase):
     url = reverse('api_user')
 
@@ -128,10 +603,126 @@ class UserAPITestCase(HBNNLiveServerTestCase):
             {
                 'status': 'success',
                 'data': [],
-                'message': None
+                'message': None,
+                'next': None,
+                'prev': None
             }
         )
 
+    def test_api_user_read_all_paginated(self):
+        url = self.url
+
+        for i in range(5):
+            User.objects.create_user(f'{i}@test.com', f'test{i}')
+        expect = [str(pk) for pk in
+                  User.objects.order_by('created_at', 'id')
+                  .values_list('id', flat=True)]
+
+        seen = []
+        cursor = None
+        while True:
+            parameter = {'limit': 2}
+            if cursor:
+                parameter['cursor'] = cursor
+            response = self.client.get(url, parameter).json()
+            self.assertEqual(response.get('status'), 'success')
+            self.assertLessEqual(len(response['data']), 2)
+            seen += [user['pk'] for user in response['data']]
+            cursor = response['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expect)
+
+        # 마지막 페이지에서 이전 페이지로 돌아갑니다
+        response = self.client.get(url, {'limit': 2,
+                                         'cursor': response['prev']}).json()
+        self.assertEqual([user['pk'] for user in response['data']],
+                         expect[2:4])
+
+        fail_response = self.client.get(url, {'cursor': 'broken'})
+        self.assertEqual(fail_response.status_code, 400)
+        fail_response = self.client.get(url, {'limit': 'zero'})
+        self.assertEqual(fail_response.status_code, 400)
+
+    def test_api_user_read_all_stream(self):
+        url = self.url
+
+        for i in range(3):
+            User.objects.create_user(f'{i}@test.com', f'test{i}')
+        expect = [str(pk) for pk in
+                  User.objects.order_by('created_at', 'id')
+                  .values_list('id', flat=True)]
+
+        response = self.client.get(url, {'stream': 'json'})
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['status'], 'success')
+        self.assertIsNone(body['message'])
+        self.assertEqual([user['pk'] for user in body['data']], expect)
+        self.assertEqual(body['data'][0]['fields']['username'], 'test0')
+
+        response = self.client.get(url, {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['data']['pk'] for row in rows], expect)
+        self.assertTrue(all(row['status'] == 'success' for row in rows))
+
+        fail_response = self.client.get(url, {'stream': 'xml'})
+        self.assertEqual(fail_response.status_code, 400)
+
+    def test_api_user_read_conditional(self):
+        url = self.url
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        # 캐시된 응답의 ETag 로 비교합니다
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # 쿼리스트링이 다르면 다른 ETag 입니다
+        response = self.client.get(url, {'limit': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.create_user()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        user = User.objects.get(email=self.email)
+        user_url = urljoin(url, f'{user.id}/')
+        etag = self.client.get(user_url)['ETag']
+        self.assertEqual(
+            self.client.get(user_url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304)
+        user.username = 'test2'
+        user.save()
+        self.assertEqual(
+            self.client.get(user_url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200)
+
+    def test_api_user_read_cached(self):
+        url = self.url
+        self.create_user()
+        user = User.objects.get(email=self.email)
+        user_url = urljoin(url, f'{user.id}/')
+
+        for target in (url, user_url):
+            expect = self.client.get(target).json()
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(target).json(), expect)
+
+        # 저장하면 유저와 목록의 캐시가 모두 무효화됩니다
+        user.username = 'test2'
+        user.save()
+        response = self.client.get(user_url).json()
+        self.assertEqual(response['data']['fields']['username'], 'test2')
+        response = self.client.get(url).json()
+        self.assertEqual(response['data'][0]['fields']['username'], 'test2')
+
+        user.delete()
+        self.assertEqual(self.client.get(user_url).status_code, 404)
+        self.assertEqual(self.client.get(url).json()['data'], [])
+
     def test_api_user_read_by_uuid(self):
         base_url = self.url
 
@@ -225,6 +816,145 @@ class UserAPITestCase(HBNNLiveServerTestCase):
         self.assertEqual(fail_response.json().get('status'), 'error')
 
 
+class UserBulkAPITestCase(HBNNLiveServerTestCase):
+    url = reverse('api_user_bulk')
+
+    def post(self, items, token):
+        return self.client.post(self.url, data=json.dumps(items),
+                                content_type='application/json',
+                                HTTP_AUTHORIZATION=token)
+
+    def test_api_user_bulk_create(self):
+        self.create_user()
+        token = self.get_jwt_token()
+
+        items = [
+            {'email': 'a@test.com', 'username': 'a', 'password': 'a'},
+            {'email': self.email, 'username': 'b', 'password': 'b'},
+            {'email': 'c@test.com', 'username': 'a', 'password': 'c'},
+            {'email': 'd@test.com', 'username': 'd'},
+            {'email': 'not-email', 'username': 'e', 'password': 'e'},
+            {'email': 'f@TEST.com', 'username': 'f', 'password': 'f'},
+        ]
+
+        # 관리자만 사용할 수 있습니다
+        self.assertEqual(self.post(items, token).status_code, 401)
+        staff = User.objects.get(email=self.email)
+        staff.is_staff = True
+        staff.save()
+
+        response = self.post(items, token)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results],
+                         ['success', 'error', 'error', 'error', 'error',
+                          'success'])
+        self.assertEqual(results[1]['message'], 'Email already exists')
+        self.assertEqual(results[2]['message'], 'Duplicated in request')
+        self.assertEqual(results[5]['data']['fields']['email'],
+                         'f@test.com')
+
+        user = User.objects.get(email='a@test.com')
+        self.assertEqual(results[0]['data']['pk'], str(user.id))
+        self.assertTrue(user.check_password('a'))
+
+        response = self.post({'email': 'a@test.com'}, token)
+        self.assertEqual(response.status_code, 400)
+
+
+class JWTLoginRequiredQueryTestCase(HBNNLiveServerTestCase):
+    """jwt_login_required 는 토큰만 검증하고 유저는 필요할 때 조회합니다"""
+    url = reverse('api_user')
+
+    def setUp(self):
+        self.create_user()
+        self.user = User.objects.get(email=self.email)
+        self.other = User.objects.create_user('other@test.com', 'other',
+                                              'other')
+        UserProfile.objects.create(user=self.user, taste=self.taste,
+                                   introduction=self.introduction,
+                                   description=self.description)
+        self.token = self.get_jwt_token()
+
+    def test_ownership_check_without_query(self):
+        url = urljoin(self.url, f'{self.other.id}/')
+
+        with self.assertNumQueries(0):
+            response = self.client.put(url, data=urlencode({'username': 'x'}),
+                                       HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 401)
+
+        with self.assertNumQueries(0):
+            response = self.client.delete(url, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(User.objects.filter(id=self.other.id).exists())
+
+    def test_query_count(self):
+        user_url = urljoin(self.url, f'{self.user.id}/')
+        profile_url = urljoin(user_url, 'profile/')
+
+        # ETag 를 위한 상태 (id, modified_at) 를 읽고, 조각 캐시에 없는
+        # 프로파일만 다시 읽습니다 (유저는 읽지 않습니다)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(profile_url,
+                                       HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"description"', queries[0]['sql'])
+        # 응답 캐시를 비워도 조각 캐시가 있으면 상태만 읽습니다
+        caches[settings.API_RESPONSE_CACHE].clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(profile_url,
+                                       HTTP_AUTHORIZATION=self.token)
+        # 변경이 없으면 캐시된 응답의 ETag 로 DB 없이 304 를 보냅니다
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                profile_url, HTTP_AUTHORIZATION=self.token,
+                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        # SELECT, UPDATE
+        with self.assertNumQueries(2):
+            self.client.put(user_url, data=urlencode({'username': 'x'}),
+                            HTTP_AUTHORIZATION=self.token)
+
+    @override_settings(DEBUG=True)
+    def test_query_budget_middleware(self):
+        profile_url = urljoin(self.url, f'{self.user.id}/profile/')
+        # DEBUG 에서만 미들웨어를 사용하므로 새 클라이언트로 요청합니다
+        client = Client()
+
+        with mock.patch.object(UserProfileAPIView, 'query_budget',
+                               {'get': (0, 1)}), \
+                self.assertLogs('hbnn.query_budget') as logs:
+            client.get(profile_url, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('UserProfileAPIView', logs.output[0])
+        self.assertIn('2 queries executed, budget is 0', logs.output[0])
+
+        with mock.patch('api.middleware.logger') as logger:
+            client.get(profile_url, HTTP_AUTHORIZATION=self.token)
+            client.get(reverse('api_live'))
+        logger.warning.assert_not_called()
+
+    def test_deleted_user(self):
+        self.user.delete()
+        response = self.client.get(reverse('api_match'), {'taste': self.taste},
+                                   HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(reverse('api_user_bulk'), data='[]',
+                                    content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalid_signature(self):
+        url = urljoin(self.url, f'{self.user.id}/')
+        header, payload, _ = self.token.split('.')
+        forged = f'{header}.{payload}.forged'
+
+        response = self.client.delete(url, HTTP_AUTHORIZATION=forged)
+        self.assertEqual(response.status_code, 401)
+
+
 class JWTAuthAPITestCase(HBNNLiveServerTestCase):
     url = reverse('api_auth')
 
@@ -253,6 +983,18 @@ class JWTAuthAPITestCase(HBNNLiveServerTestCase):
         })
         self.assertEqual(response.json().get('status'), 'success')
 
+    def test_api_jwt_auth_busy(self):
+        self.create_user()
+
+        # 해싱 풀이 가득 차면 기다리지 않고 503 으로 응답합니다
+        with mock.patch.object(hashing_pool, 'max_pending', 0):
+            response = self.client.post(self.url, {
+                'email': self.email,
+                'password': self.password,
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
 
 class UserProfileAPITestCase(HBNNLiveServerTestCase):
     url = reverse('api_user')
@@ -328,3 +1070,397 @@ class UserProfileAPITestCase(HBNNLiveServerTestCase):
         fields = response.json()['data']['fields']
         self.assertEqual(fields.get('taste'), new_taste)
         self.assertEqual(fields.get('introduction'), new_introduction)
+
+        userprofile = UserProfile.objects.get(user=user)
+        self.assertEqual(userprofile.taste, new_taste)
+        self.assertEqual(userprofile.introduction, new_introduction)
+        self.assertEqual(userprofile.description, self.description)
+
+    def test_userprofile_read_conditional(self):
+        self.create_user()
+        user = User.objects.get(email=self.email)
+        self.create_user_profile(user)
+        token = self.get_jwt_token()
+        url = self.get_url(str(user.id))
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=token)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=token,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(url, HTTP_AUTHORIZATION=token,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(url, data=urlencode({'taste': UserProfile.CHINESE}),
+                        HTTP_AUTHORIZATION=token)
+        response = self.client.get(url, HTTP_AUTHORIZATION=token,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # 프로파일이 없으면 조건 없이 404 입니다
+        other = User.objects.create_user('other@test.com', 'other')
+        response = self.client.get(self.get_url(str(other.id)),
+                                   HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.json()['message'],
+                         'User profile does not exist')
+
+    def test_userprofile_partial_update(self):
+        self.create_user()
+        user = User.objects.get(email=self.email)
+        self.create_user_profile(user)
+        token = self.get_jwt_token()
+        url = self.get_url(str(user.id))
+
+        def put(parameter):
+            return self.client.put(url, data=urlencode(parameter),
+                                   HTTP_AUTHORIZATION=token)
+
+        # SELECT, UPDATE (taste 는 검색 색인을 다시 쓰지 않습니다)
+        with self.assertNumQueries(2):
+            response = put({'taste': UserProfile.CHINESE})
+        fields = response.json()['data']['fields']
+        self.assertEqual(fields['taste'], UserProfile.CHINESE)
+        self.assertEqual(fields['introduction'], self.introduction)
+
+        # 최신 modified_at 으로만 변경할 수 있습니다
+        modified_at = fields['modified_at']
+        response = put({'introduction': '첫번째', 'modified_at': modified_at})
+        self.assertEqual(response.status_code, 200)
+        response = put({'introduction': '두번째', 'modified_at': modified_at})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(UserProfile.objects.get(user=user).introduction,
+                         '첫번째')
+
+        for parameter in ({}, {'user': 'x'}, {'taste': 100},
+                          {'taste': 'a'}, {'introduction': 'a' * 129}):
+            self.assertEqual(put(parameter).status_code, 400)
+
+
+class MatchAPITestCase(HBNNLiveServerTestCase):
+    url = reverse('api_match')
+
+    def setUp(self):
+        # 다른 테스트가 남긴 인덱스를 비웁니다
+        taste_index.rebuild()
+
+        self.create_user()
+        self.user = User.objects.get(email=self.email)
+        self.token = self.get_jwt_token()
+
+        self.candidates = []
+        for i, (taste, gender) in enumerate((
+                (UserProfile.KOREAN, User.MALE),
+                (UserProfile.KOREAN, User.FEMALE),
+                (UserProfile.KOREAN, User.FEMALE),
+                (UserProfile.JAPANESE, User.FEMALE))):
+            user = User.objects.create_user(f'{i}@test.com', f'test{i}')
+            user.gender = gender
+            user.save()
+            UserProfile.objects.create(user=user, taste=taste,
+                                       introduction=self.introduction,
+                                       description=self.description)
+            self.candidates.append(user)
+        UserProfile.objects.create(user=self.user, taste=UserProfile.KOREAN,
+                                   introduction=self.introduction,
+                                   description=self.description)
+
+    def match(self, **parameter):
+        return self.client.get(self.url, parameter,
+                               HTTP_AUTHORIZATION=self.token).json()
+
+    def test_match(self):
+        koreans = sorted(str(user.id) for user in self.candidates[:3])
+
+        # 본인은 제외됩니다
+        with self.assertNumQueries(0):
+            response = self.match(taste=UserProfile.KOREAN)
+        self.assertEqual(response['data'], koreans)
+        self.assertIsNone(response['next'])
+
+        response = self.match(taste=UserProfile.KOREAN, gender=User.FEMALE)
+        self.assertEqual(response['data'],
+                         sorted(str(user.id)
+                                for user in self.candidates[1:3]))
+
+        response = self.match(taste=UserProfile.KOREAN, limit=2)
+        self.assertEqual(response['data'], koreans[:2])
+        response = self.match(taste=UserProfile.KOREAN, limit=2,
+                              cursor=response['next'])
+        self.assertEqual(response['data'], koreans[2:])
+
+    def test_match_signals(self):
+        user = self.candidates[0]
+        user.userprofile.taste = UserProfile.JAPANESE
+        user.userprofile.save()
+        self.assertNotIn(str(user.id),
+                         self.match(taste=UserProfile.KOREAN)['data'])
+
+        user.gender = User.FEMALE
+        user.save()
+        self.assertIn(str(user.id),
+                      self.match(taste=UserProfile.JAPANESE,
+                                 gender=User.FEMALE)['data'])
+
+        user.delete()
+        self.assertNotIn(str(user.id),
+                         self.match(taste=UserProfile.JAPANESE)['data'])
+
+    def test_match_invalid(self):
+        for parameter in ({}, {'taste': 0}, {'taste': 'a'},
+                          {'taste': UserProfile.KOREAN, 'gender': 3},
+                          {'taste': UserProfile.KOREAN, 'cursor': 'a'}):
+            response = self.client.get(self.url, parameter,
+                                       HTTP_AUTHORIZATION=self.token)
+            self.assertEqual(response.status_code, 400)
+
+
+class SearchAPITestCase(HBNNLiveServerTestCase):
+    url = reverse('api_search')
+
+    def test_search(self):
+        self.create_user()
+        user = User.objects.get(email=self.email)
+        UserProfile.objects.create(user=user, taste=self.taste,
+                                   introduction=self.introduction,
+                                   description=self.description)
+        token = self.get_jwt_token()
+
+        response = self.client.get(self.url, {'q': '설명'},
+                                   HTTP_AUTHORIZATION=token).json()
+        self.assertEqual(response['status'], 'success')
+        self.assertEqual([profile['fields']['user']
+                          for profile in response['data']], [str(user.id)])
+        self.assertIsNone(response['next'])
+
+        response = self.client.get(self.url, {'q': '파스타'},
+                                   HTTP_AUTHORIZATION=token).json()
+        self.assertEqual(response['data'], [])
+
+        fail_response = self.client.get(self.url, {'q': ''},
+                                        HTTP_AUTHORIZATION=token)
+        self.assertEqual(fail_response.status_code, 400)
+
+
+class ProfileBatchAPITestCase(HBNNLiveServerTestCase):
+    url = reverse('api_profiles')
+
+    def test_profile_batch(self):
+        self.create_user()
+        token = self.get_jwt_token()
+
+        users = [User.objects.create_user(f'{i}@test.com', f'test{i}')
+                 for i in range(3)]
+        for user in users[:2]:
+            UserProfile.objects.create(user=user, taste=self.taste,
+                                       introduction=self.introduction,
+                                       description=self.description)
+        ids = [str(users[1].id), str(users[2].id), str(users[0].id)]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(ids)},
+                                       HTTP_AUTHORIZATION=token)
+        data = response.json()['data']
+        self.assertEqual([item['user']['pk'] for item in data['profiles']],
+                         [ids[0], ids[2]])
+        self.assertEqual(data['profiles'][0]['profile']['fields']['user'],
+                         ids[0])
+        self.assertEqual(data['profiles'][0]['user']['fields']['username'],
+                         'test1')
+        self.assertEqual(data['missing'], [ids[1]])
+
+        response = self.client.post(self.url, data=json.dumps({'ids': ids}),
+                                    content_type='application/json',
+                                    HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.json()['data'], data)
+
+        for parameter in ({}, {'ids': 'a,b'}):
+            fail_response = self.client.get(self.url, parameter,
+                                            HTTP_AUTHORIZATION=token)
+            self.assertEqual(fail_response.status_code, 400)
+
+
+class BatchAPITestCase(HBNNLiveServerTestCase):
+    url = reverse('api_batch')
+
+    def batch(self, *requests, **extra):
+        return self.client.post(self.url,
+                                data=json.dumps({'requests': requests}),
+                                content_type='application/json', **extra)
+
+    def test_batch(self):
+        self.create_user()
+        user = User.objects.get(email=self.email)
+        UserProfile.objects.create(user=user, taste=self.taste,
+                                   introduction=self.introduction,
+                                   description=self.description)
+        user_url = reverse('api_user', args=[user.id])
+        profile_url = reverse('api_userprofile', args=[user.id])
+
+        # 로그인한 토큰을 이후의 하위 요청이 씁니다
+        response = self.batch(
+            {'method': 'POST', 'path': reverse('api_auth'),
+             'body': {'email': self.email, 'password': self.password}},
+            {'method': 'GET', 'path': f'{user_url}?fields=username'},
+            {'method': 'GET', 'path': profile_url},
+            {'method': 'GET', 'path': f'{user_url}?fields=username'},
+            {'method': 'GET', 'path': '/api/unknown/'},
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'POST', 'path': self.url},
+            {'method': 'PATCH', 'path': user_url})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results],
+                         [200, 200, 200, 200, 404, 400, 400, 400])
+        self.assertEqual(results[1]['body']['data']['fields'],
+                         {'username': self.username})
+        self.assertEqual(results[2]['body']['data']['fields']['taste'],
+                         self.taste)
+        self.assertEqual(results[3], results[1])
+
+        # 쓰기 뒤의 같은 GET 은 다시 실행합니다
+        token = self.get_jwt_token()
+        response = self.batch(
+            {'method': 'GET', 'path': profile_url},
+            {'method': 'PUT', 'path': profile_url,
+             'body': {'introduction': '반갑습니다'}},
+            {'method': 'GET', 'path': profile_url},
+            HTTP_AUTHORIZATION=token)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results],
+                         [200, 200, 200])
+        self.assertEqual(
+            results[2]['body']['data']['fields']['introduction'],
+            '반갑습니다')
+
+        response = self.batch({'method': 'GET', 'path': profile_url})
+        self.assertEqual(response.json()['data'][0]['status'], 401)
+
+    def test_shared_auth(self):
+        self.create_user()
+        token = self.get_jwt_token()
+        path = reverse('api_user', args=[User.objects.get().id])
+        with mock.patch.object(JWTManager, 'decode_lazy',
+                               wraps=JWTManager.decode_lazy) as decode:
+            response = self.batch(
+                {'method': 'GET', 'path': f'{path}?fields=email'},
+                {'method': 'GET', 'path': f'{path}?fields=username'},
+                HTTP_AUTHORIZATION=token)
+        self.assertEqual([result['status']
+                          for result in response.json()['data']], [200, 200])
+        self.assertEqual(decode.call_count, 1)
+
+    def test_limits(self):
+        request = {'method': 'GET', 'path': reverse('api_ping')}
+        for body in ({}, {'requests': []}, {'requests': 'ping'}):
+            response = self.client.post(self.url, data=json.dumps(body),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+        with self.settings(API_BATCH_MAX_REQUESTS=2):
+            response = self.batch(request, request, request)
+        self.assertEqual(response.json()['message'], 'Too many requests')
+
+        self.create_user()
+        path = reverse('api_user', args=[User.objects.get().id])
+        # 상태와 조각 캐시에 없는 유저의 두 쿼리
+        with self.settings(API_BATCH_MAX_QUERIES=2):
+            response = self.batch(
+                {'method': 'GET', 'path': path}, request)
+        self.assertEqual([result['status']
+                          for result in response.json()['data']], [200, 503])
+
+        with self.settings(API_BATCH_MAX_SECONDS=0):
+            response = self.batch(request)
+        self.assertEqual(response.json()['data'][0]['body']['message'],
+                         'Batch budget exceeded')
+
+    def test_budget_inside_subrequest(self):
+        # 하위 요청 안에서 한도를 넘으면 그 자리에서 멈추고 롤백합니다
+        self.create_user()
+        user = User.objects.get()
+        token = self.get_jwt_token()
+        url = reverse('api_user', args=[user.id])
+        # SELECT 까지만 실행하고 UPDATE 는 실행하지 않습니다
+        with self.settings(API_BATCH_MAX_QUERIES=1):
+            response = self.batch(
+                {'method': 'PUT', 'path': url, 'body': {'username': 'x'}},
+                HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.json()['data'][0]['status'], 503)
+        self.assertEqual(User.objects.get().username, self.username)
+
+    def test_deleted_user(self):
+        # 앞의 하위 요청이 지운 유저의 토큰은 이후의 하위 요청에서 401 입니다
+        self.create_user()
+        User.objects.update(is_staff=True)
+        user = User.objects.get()
+        token = self.get_jwt_token()
+        bulk = {'method': 'POST', 'path': reverse('api_user_bulk'),
+                'json': []}
+        response = self.batch(
+            bulk,
+            {'method': 'DELETE', 'path': reverse('api_user', args=[user.id])},
+            bulk,
+            {'method': 'GET',
+             'path': f'{reverse("api_match")}?taste={self.taste}'},
+            HTTP_AUTHORIZATION=token)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results],
+                         [200, 200, 401, 401])
+        self.assertEqual(results[2]['body']['message'], 'JWT required')
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    def test_loadtest(self):
+        stdout = StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.json') as f:
+            call_command('loadtest', url=self.live_server_url, clients=2,
+                         users=2, duration=.5, seed=0, json_path=f.name,
+                         mix='users=1,profile=1,auth=0', stdout=stdout)
+            report = json.load(f)
+
+        self.assertEqual(list(report['endpoints']), ['users', 'profile'])
+        for stats in (*report['endpoints'].values(), report['total']):
+            self.assertGreater(stats['requests'], 0)
+            self.assertEqual(stats['errors'], 0)
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertEqual(report['total']['statuses'],
+                         {'200': report['total']['requests']})
+        self.assertIn('p99 ms', stdout.getvalue())
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_loadtest_asgi(self):
+        server = ASGIServer(ASGIHandler())
+        _, port = server.start()
+        stdout = StringIO()
+        try:
+            call_command('loadtest', url=f'http://localhost:{port}', clients=2,
+                         users=2, duration=.5, json_path='-',
+                         mix='users=1,user=1', stdout=stdout)
+        finally:
+            server.shutdown()
+        output = stdout.getvalue()
+        report = json.loads(output[output.index('{'):])
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertEqual(report['total']['errors'], 0)
+
+    def test_memory_sampler(self):
+        with MemorySampler(interval=.01) as memory:
+            data = b'x' * (32 * 1024 * 1024)
+        del data
+        report = memory.report()
+        self.assertEqual(list(report), ['rss_start_mb', 'rss_peak_mb',
+                                        'rss_growth_mb'])
+        self.assertGreaterEqual(report['rss_growth_mb'], 0)
+        self.assertGreaterEqual(report['rss_peak_mb'], report['rss_start_mb'])
+
+    def test_invalid_mix(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', url=self.live_server_url,
+                         mix='users=1,unknown=1')
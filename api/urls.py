@@ -1,10 +1,17 @@
 from django.conf.urls import url
 
-from .views import PingView, UserAPIView, JWTAuthView, UserProfileAPIView
+from .views import (PingView, UserAPIView, JWTAuthView, UserProfileAPIView,
+                    MatchAPIView, SearchAPIView, UserBulkAPIView,
+                    ProfileBatchAPIView, LiveView, ReadyView, MetricsView,
+                    BatchAPIView)
 
 urlpatterns = [
     url(r'^ping/$', PingView.as_view(), name='api_ping'),
+    url(r'^live/$', LiveView.as_view(), name='api_live'),
+    url(r'^ready/$', ReadyView.as_view(), name='api_ready'),
+    url(r'^metrics/$', MetricsView.as_view(), name='api_metrics'),
     url(r'^users/$', UserAPIView.as_view(), name='api_user'),
+    url(r'^users/bulk/$', UserBulkAPIView.as_view(), name='api_user_bulk'),
     url((r'^users/'
          r'([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/$'),
         UserAPIView.as_view(), name='api_user'),
@@ -12,5 +19,9 @@ urlpatterns = [
          r'([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/'
          r'profile/$'),
         UserProfileAPIView.as_view(), name='api_userprofile'),
+    url(r'^profiles/$', ProfileBatchAPIView.as_view(), name='api_profiles'),
     url(r'^auth/$', JWTAuthView.as_view(), name='api_auth'),
+    url(r'^match/$', MatchAPIView.as_view(), name='api_match'),
+    url(r'^search/$', SearchAPIView.as_view(), name='api_search'),
+    url(r'^batch/$', BatchAPIView.as_view(), name='api_batch'),
 ]
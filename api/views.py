@@ -3,19 +3,47 @@
     ~~~~~~~~~
 """
 
+import asyncio
+import io
 import json
+import time
 import typing
 import uuid
-
-from django.core import serializers
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import connection
-from django.http import JsonResponse, QueryDict
+from collections import OrderedDict
+from contextlib import ExitStack
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, Max, Q, QuerySet
+from django.db.models.signals import post_save
+from django.http import (HttpResponse, JsonResponse, QueryDict,
+                         StreamingHttpResponse)
+from django.urls import Resolver404, resolve
+from django.utils import timezone
 from django.views import View
 
-from api.decorators import jwt_login_required
+from api.decorators import cached_response, conditional, jwt_login_required
+from api.middleware import QueryRecorder, exporter
+from search.index import search
+from user.matching import taste_index
 from user.models import User, UserProfile
+from utils import response_cache
+from utils.aio import run_sync
 from utils.auth import JWTManager
+from utils.fragments import Fragment, FragmentCache, FragmentEncoder
+from utils.hashing import HashingPoolFull, hashing_pool
+from utils.health import health
+from utils.metrics import registry, render
+from utils.pagination import CursorPaginator, CursorPage, InvalidCursor
+from utils.routers import use_replica
+from utils.serializers import FieldSerializer, InvalidFields
 
 
 class APIView(View):
@@ -25,32 +53,157 @@ class APIView(View):
 
         http 요청 메서드(POST, GET, UPDATE, DELETE)에 대응하게 작성합니다.
 
+        replica_methods 에 적은 메서드의 읽기는 DATABASE_REPLICAS 로 보냅니다.
+        단, 쓰기를 한 클라이언트는 DATABASE_REPLICA_STICKY_SECONDS 동안
+        primary 에서 읽어 자신의 변경을 바로 볼 수 있습니다.
+
+        query_budget 은 메서드별 (최대 쿼리 수, 같은 모양의 쿼리 최대
+        반복 수) 이며 개발 환경에서 api.middleware.QueryBudgetMiddleware 가
+        검사합니다.
+
+        compression_level 은 응답의 압축 수준이며 None 이면
+        COMPRESSION_LEVEL, 0 이면 압축하지 않습니다.
+        (api.middleware.CompressionMiddleware)
+
+        ASGI (hbnn/asgi.py) 에서만 쓰는 핸들러를 async_post 처럼 async_
+        를 붙인 async def 로 함께 작성할 수 있습니다. 이벤트 루프에서
+        실행되므로 ORM 은 utils.aio.run_sync, 비밀번호 해싱은
+        hashing_pool.run_async 로 호출합니다. WSGI (기본 배포) 에서는 항상
+        같은 이름의 동기 핸들러를 실행합니다.
+
     """
+    replica_methods = ()
+    query_budget = {}
+    compression_level = None
+
+    PRIMARY_COOKIE = 'hbnn_primary'
+    SAFE_METHODS = ('get', 'head', 'options')
+
+    @classmethod
+    def is_async(cls, method: str) -> bool:
+        """method 에 ASGI 용 async 핸들러 (async_<method>) 가 있는지"""
+        return asyncio.iscoroutinefunction(
+            getattr(cls, f'async_{method.lower()}', None))
+
+    def reads_from_replica(self, request) -> bool:
+        return request.method.lower() in self.replica_methods and \
+            not request.COOKIES.get(self.PRIMARY_COOKIE)
+
+    def stick_to_primary(self, request, response) -> None:
+        if request.method.lower() not in self.SAFE_METHODS and \
+                response.status_code < 400 and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                self.PRIMARY_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                httponly=True)
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(request, 'is_asgi', False) and \
+                self.is_async(request.method):
+            # ASGI 에서는 이벤트 루프가 await 합니다
+            return self.dispatch_async(request, *args, **kwargs)
+
+        if self.reads_from_replica(request):
+            with use_replica():
+                return super().dispatch(request, *args, **kwargs)
+        response = super().dispatch(request, *args, **kwargs)
+        self.stick_to_primary(request, response)
+        return response
+
+    async def dispatch_async(self, request, *args, **kwargs):
+        handler = getattr(self, f'async_{request.method.lower()}')
+        if self.reads_from_replica(request):
+            with use_replica():
+                return await handler(request, *args, **kwargs)
+        response = await handler(request, *args, **kwargs)
+        self.stick_to_primary(request, response)
+        return response
 
     @staticmethod
     def response(data: typing.Optional[typing.Union[dict, list]] = None,
                  status_code: int = 200,
-                 message: typing.Optional[str] = None) -> JsonResponse:
+                 message: typing.Optional[str] = None,
+                 page: typing.Optional[CursorPage] = None) -> JsonResponse:
         payload = {
             'status': 'success' if status_code < 400 else 'error',
             'data': data,
             'message': message
         }
-        response = JsonResponse(payload)
+        if page is not None:
+            payload['next'] = page.next
+            payload['prev'] = page.prev
+        # data 안의 Fragment 는 다시 인코딩하지 않고 이어 붙입니다
+        response = JsonResponse(payload, encoder=FragmentEncoder)
         response.status_code = status_code
         return response
 
+    @classmethod
+    def busy(cls) -> JsonResponse:
+        """처리할 여유가 없을 때 Retry-After 와 함께 503 으로 응답합니다"""
+        response = cls.response(status_code=503, message='Server is busy')
+        response['Retry-After'] = str(settings.API_RETRY_AFTER)
+        return response
+
     @staticmethod
     def serialize(data, fields: typing.Union[list, tuple]):
-        dump = serializers.serialize(
-            'json', data,
-            fields=fields
-        )
-        return json.loads(dump)
+        if isinstance(data, QuerySet):
+            model = data.model
+        else:
+            data = list(data)
+            if not data:
+                return []
+            model = type(data[0])
+        serializer = FieldSerializer.for_model(model, tuple(fields))
+        return serializer.serialize(data)
+
+    STREAM_JSON = 'json'
+    STREAM_NDJSON = 'ndjson'
+
+    @classmethod
+    def stream_response(cls, queryset: QuerySet,
+                        fields: typing.Union[list, tuple],
+                        format: str = STREAM_JSON) -> StreamingHttpResponse:
+        """queryset 을 청크 단위로 읽으며 바로 응답으로 흘려보냅니다
+
+            결과 전체를 메모리에 올리지 않으므로 목록의 크기와 관계없이
+            워커의 메모리 사용량이 일정합니다.
+
+            - 'json': {'status', 'data': [...], 'message'} 형태의 하나의 문서
+            - 'ndjson': 한 줄에 하나씩 {'status', 'data': {...}, 'message'}
+        """
+        encoder = DjangoJSONEncoder()
+        serializer = FieldSerializer.for_model(queryset.model, tuple(fields))
+        # 스트리밍은 dispatch 가 끝난 뒤에 읽으므로 지금 데이터베이스를 정합니다
+        queryset = queryset.using(queryset.db)
+
+        def rows():
+            chunk_size = settings.API_STREAM_CHUNK_SIZE
+            for row in serializer.values(queryset).iterator(chunk_size):
+                yield serializer.from_values(row)
+
+        def json_array():
+            yield '{"status": "success", "data": ['
+            for i, row in enumerate(rows()):
+                yield (', ' if i else '') + encoder.encode(row)
+            yield '], "message": null}'
+
+        def ndjson():
+            for row in rows():
+                payload = {'status': 'success', 'data': row, 'message': None}
+                yield encoder.encode(payload) + '\n'
+
+        if format == cls.STREAM_NDJSON:
+            return StreamingHttpResponse(ndjson(),
+                                         content_type='application/x-ndjson')
+        return StreamingHttpResponse(json_array(),
+                                     content_type='application/json')
 
 
 class PingView(APIView):
     """서버에 ping을 보내어 라이브 상태를 확인합니다"""
+    replica_methods = ('get', )
+    # 자주 호출되는 작은 응답이므로 압축하지 않습니다
+    compression_level = 0
 
     def get(self, request) -> JsonResponse:
         """
@@ -69,12 +222,106 @@ class PingView(APIView):
                 }
         """
 
-        cursor = connection.cursor()
+        cursor = connections[router.db_for_read(User)].cursor()
         cursor.execute('''SELECT 1''')
         assert cursor.fetchone()[0] == 1
         return self.response(message="PONG")
 
 
+class LiveView(APIView):
+    """프로세스가 요청을 처리할 수 있는지만 확인합니다 (liveness)
+
+        데이터베이스를 사용하지 않으므로 자주 호출해도 부담이 없습니다.
+    """
+    compression_level = 0
+
+    def get(self, request) -> JsonResponse:
+        """
+            request
+                /api/live/
+
+            response:
+                {
+
+                    'status': 'success',
+
+                    'data': None,
+
+                    'message': 'ALIVE'
+
+                }
+        """
+        return self.response(message='ALIVE')
+
+
+class ReadyView(APIView):
+    """트래픽을 받을 준비가 되었는지 확인합니다 (readiness)
+
+        데이터베이스, 마이그레이션, 디스크 검사는 utils.health 가
+        HEALTH_CHECK_INTERVAL 마다 백그라운드에서 실행하고,
+        여기서는 보관된 결과와 그 나이만 응답합니다.
+    """
+    compression_level = 0
+
+    def get(self, request) -> JsonResponse:
+        """
+            request
+                /api/ready/
+
+            response:
+                {
+
+                    'status': 'success',
+
+                    'data': {
+
+                        'checks': {
+
+                            'database': {'ok': True, 'message': 'ok'},
+
+                            ...
+
+                        },
+
+                        'checked_at': 1484000000.0,
+
+                        'age': 1.234
+
+                    },
+
+                    'message': 'READY'
+
+                }
+
+                준비되지 않았으면 503 과 'NOT READY'
+        """
+        ok, data = health.status()
+        if not ok:
+            return self.response(data=data, status_code=503,
+                                 message='NOT READY')
+        return self.response(data=data, message='READY')
+
+
+class MetricsView(APIView):
+    """api.middleware 와 각 모듈이 기록한 메트릭을 Prometheus 텍스트
+        포맷으로 응답합니다
+
+        METRICS_DIR 이 있으면 노드의 모든 워커 프로세스 값을 더합니다.
+    """
+
+    def get(self, request) -> HttpResponse:
+        """
+            request
+                /api/metrics/
+
+            response:
+                text/plain; version=0.0.4
+        """
+        return HttpResponse(render(exporter.collect()),
+                            content_type='text/plain; version=0.0.4; '
+                                         'charset=utf-8')
+
+
 class UserAPIView(APIView):
     """기본적인 로그인을 수행하는 User 모델을 컨트롤 하는 API 입니다
 
@@ -85,6 +332,8 @@ class UserAPIView(APIView):
             - 'username': Username
             - 'created_at': Sign in timestamp
     """
+    replica_methods = ('get', )
+
     def post(self, request) -> JsonResponse:
         """유저를 생성합니다
 
@@ -101,32 +350,149 @@ class UserAPIView(APIView):
                 email=User.objects.normalize_email(email)).exists():
             return self.response(status_code=404,
                                  message='Email already exists')
+        try:
+            password_hash = hashing_pool.run('make', make_password, password)
+        except HashingPoolFull:
+            return self.busy()
         user = User.objects.create_user(email,
                                         username,
-                                        password)
+                                        password_hash=password_hash)
 
         serialized_user_data = self.serialize_users([user, ])[0]
         return self.response(data=serialized_user_data)
 
+    async def async_post(self, request) -> JsonResponse:
+        """ASGI 에서 이벤트 루프를 막지 않고 유저를 생성합니다 (post 와 같음)"""
+        email = request.POST.get('email')
+        username = request.POST.get('username')
+        password = request.POST.get('password')
+
+        exists = User.objects.filter(
+            email=User.objects.normalize_email(email)).exists
+        if await run_sync(exists):
+            return self.response(status_code=404,
+                                 message='Email already exists')
+        try:
+            password_hash = await hashing_pool.run_async(
+                'make', make_password, password)
+        except HashingPoolFull:
+            return self.busy()
+        user = await run_sync(User.objects.create_user, email, username,
+                              password_hash=password_hash)
+
+        serialized_user_data = self.serialize_users([user, ])[0]
+        return self.response(data=serialized_user_data)
+
+    @staticmethod
+    def user_key(user_id: uuid.UUID) -> typing.Optional[tuple]:
+        """조각 캐시의 키 (id, modified_at), 유저가 없으면 None"""
+        modified_at = User.objects.filter(id=user_id).values_list(
+            'modified_at', flat=True).first()
+        if modified_at is None:
+            return None
+        return uuid.UUID(str(user_id)), modified_at
+
+    def user_state(self, request, user_id: uuid.UUID = None):
+        """ETag 를 위한 유저 (목록) 의 상태"""
+        if user_id:
+            key = self.user_key(user_id)
+            if key is None:
+                return None
+            modified_at = key[1]
+            # get 은 이 키로 캐시된 조각을 찾습니다
+            return f'{user_id}:{modified_at.isoformat()}', modified_at, key
+        state = User.objects.aggregate(count=Count('id'),
+                                       modified_at=Max('modified_at'))
+        modified_at = state['modified_at']
+        key = f'{state["count"]}:{modified_at and modified_at.isoformat()}'
+        # 삭제는 Max(modified_at) 를 바꾸지 않으므로 목록은 ETag 로만 비교합니다
+        return key, None
+
+    def user_dependencies(self, request, user_id: uuid.UUID = None):
+        return [f'user:{user_id}'] if user_id else ['users']
+
+    @cached_response(user_dependencies)
+    @conditional(user_state)
     def get(self, request, user_id: uuid.UUID = None) -> JsonResponse:
         """유저의 정보를 가져옵니다
 
+            ETag, Last-Modified 헤더를 보내며 If-None-Match,
+            If-Modified-Since 요청에는 변경이 없으면 304 로 응답합니다.
+
             :param uuid user_id:
                 - None: 모든 유저의 정보를 가져옵니다
                 - uuid: 해당 id의 정보를 가져옵니다
+
+            :param request:
+                user_id 가 없을 때 (created_at, id) 순서로 페이지를 나눕니다
+
+                - 'limit': 페이지 크기 (최대 API_PAGE_MAX_LIMIT)
+                - 'cursor': 응답의 'next' 또는 'prev' 값
+                - 'stream': 'json' 또는 'ndjson' 일 때 페이지 없이
+                  전체 목록을 스트리밍합니다
+
+                - 'fields': 쉼표로 구분한 user_fields 중 응답할 필드
+                  (예: 'username,created_at'). 고른 컬럼만 읽습니다
         """
+        try:
+            serializer = self.user_serializer.sparse(request.GET.get('fields'))
+        except InvalidFields as e:
+            return self.response(status_code=400, message=str(e))
+
         if user_id:
-            try:
-                user = User.objects.get(id=user_id)
-            except ObjectDoesNotExist:
-                return self.response(status_code=404,
-                                     message='User does not exist')
-            serialized_user_data = self.serialize_users([user, ])[0]
-        else:
-            users = User.objects.all()
-            serialized_user_data = self.serialize_users(users)
+            return self.get_user(user_id, serializer)
 
-        return self.response(data=serialized_user_data)
+        stream = request.GET.get('stream')
+        if stream:
+            if stream not in (self.STREAM_JSON, self.STREAM_NDJSON):
+                return self.response(status_code=400,
+                                     message='Invalid stream format')
+            users = User.objects.order_by('created_at', 'id')
+            return self.stream_response(users, fields=serializer.fields,
+                                        format=stream)
+
+        try:
+            if serializer is self.user_serializer:
+                # 페이지는 키만 읽고, 캐시에 없는 유저만 전체 컬럼을 읽습니다
+                users = User.objects.values('id', 'created_at',
+                                            'modified_at')
+            else:
+                users = serializer.values(User.objects.all(), 'created_at')
+            page = CursorPaginator(users,
+                                   limit=request.GET.get('limit'),
+                                   cursor=request.GET.get('cursor')).page()
+        except InvalidCursor as e:
+            return self.response(status_code=400, message=str(e))
+
+        if serializer is not self.user_serializer:
+            data = [serializer.from_values(row) for row in page.items]
+            return self.response(data=data, page=page)
+        fragments = self.user_fragments.fragments(
+            [(row['id'], row['modified_at']) for row in page.items],
+            User.objects.all())
+        return self.response(data=list(fragments.values()), page=page)
+
+    def get_user(self, user_id: uuid.UUID,
+                 serializer: FieldSerializer) -> JsonResponse:
+        data = None
+        if serializer is not self.user_serializer:
+            row = serializer.values(User.objects.filter(id=user_id)).first()
+            if row is not None:
+                data = serializer.from_values(row)
+        else:
+            # user_state 가 읽어 둔 (id, modified_at)
+            if hasattr(self.request, 'conditional_state'):
+                state = self.request.conditional_state
+                key = state[2] if state is not None else None
+            else:
+                key = self.user_key(user_id)
+            if key is not None:
+                data = self.user_fragments.fragments(
+                    [key], User.objects.all()).get(key[0])
+        if data is None:
+            return self.response(status_code=404,
+                                 message='User does not exist')
+        return self.response(data=data)
 
     @jwt_login_required
     def put(self, request, user_id: uuid.UUID) -> JsonResponse:
@@ -148,7 +514,8 @@ class UserAPIView(APIView):
                 }
 
         """
-        if user_id == request.user.id:
+        # 본인만 변경할 수 있습니다 (토큰의 id 만 비교하므로 DB 를 거치지 않습니다)
+        if uuid.UUID(user_id) != request.user.id:
             return self.response(status_code=401,
                                  message='Unauthorized')
         try:
@@ -177,7 +544,8 @@ class UserAPIView(APIView):
 
         :param uuid user_id: 삭제할 유저의 id
         """
-        if user_id == request.user.id:
+        # 본인만 삭제할 수 있습니다
+        if uuid.UUID(user_id) != request.user.id:
             return self.response(status_code=401, message='Unauthorized')
 
         try:
@@ -189,12 +557,153 @@ class UserAPIView(APIView):
         user.delete()
         return self.response(data={}, message='Successfully deleted')
 
+    user_fields = ('username', 'email', 'created_at')
+    user_serializer = FieldSerializer(User, user_fields)
+    user_fragments = FragmentCache(user_serializer)
+
     def serialize_users(self, data):
-        return self.serialize(data, fields=('username', 'email', 'created_at'))
+        return self.user_serializer.serialize(data)
+
+
+class UserBulkAPIView(APIView):
+    """여러 유저를 한 번에 생성합니다 (관리자 전용)
+
+        url: /api/users/bulk/
+
+        :return List: 요청 순서대로 각 항목의 결과
+            - {'status': 'success', 'data': User, 'message': None}
+            - {'status': 'error', 'data': None, 'message': 실패 이유}
+    """
+    # USER_BULK_BATCH_SIZE 마다 같은 INSERT 가 반복됩니다
+    query_budget = {'post': (None, None)}
+
+    @jwt_login_required
+    def post(self, request) -> JsonResponse:
+        """
+            :param request:
+                body 에 json 배열로 전달합니다
+
+                [
+
+                    {'email': ..., 'username': ..., 'password': ...},
+
+                    ...
+
+                ]
+        """
+        if not request.user.is_staff:
+            return self.response(status_code=401, message='Unauthorized')
+        try:
+            items = json.loads(request.body.decode('utf8'))
+        except (UnicodeError, ValueError):
+            return self.response(status_code=400, message='Invalid JSON')
+        if not isinstance(items, list):
+            return self.response(status_code=400,
+                                 message='Expected a JSON array')
+        if len(items) > settings.USER_BULK_MAX_ITEMS:
+            return self.response(status_code=400,
+                                 message='Too many users')
+
+        results = [None] * len(items)
+        valid = []
+        emails, usernames = set(), set()
+        for i, item in enumerate(items):
+            try:
+                email, username, password = self.clean_item(item)
+            except ValidationError as e:
+                results[i] = self.item_error(e.messages[0])
+                continue
+            if email in emails or username in usernames:
+                results[i] = self.item_error('Duplicated in request')
+                continue
+            emails.add(email)
+            usernames.add(username)
+            valid.append((i, email, username, password))
+
+        # 이미 있는 이메일, 유저명을 한 번의 쿼리로 확인합니다
+        existing = User.objects.filter(
+            Q(email__in=emails) | Q(username__in=usernames)
+        ).values_list('email', 'username')
+        taken_emails, taken_usernames = set(), set()
+        for email, username in existing:
+            taken_emails.add(email)
+            taken_usernames.add(username)
+
+        creatable = []
+        for i, email, username, password in valid:
+            if email in taken_emails:
+                results[i] = self.item_error('Email already exists')
+            elif username in taken_usernames:
+                results[i] = self.item_error('Username already exists')
+            else:
+                creatable.append((i, email, username, password))
+
+        try:
+            password_hashes = hashing_pool.map(
+                'make', make_password,
+                (password for _, _, _, password in creatable))
+        except HashingPoolFull:
+            return self.busy()
+
+        users = [User(email=email, username=username, password=password_hash)
+                 for (_, email, username, _), password_hash
+                 in zip(creatable, password_hashes)]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    users, batch_size=settings.USER_BULK_BATCH_SIZE)
+        except IntegrityError:
+            # 확인한 뒤에 다른 요청이 같은 값을 먼저 저장한 경우입니다
+            return self.response(status_code=409,
+                                 message='Users changed concurrently')
+        # bulk_create 는 시그널을 보내지 않습니다
+        response_cache.bump('users')
+
+        serialized_users = UserAPIView.user_serializer.serialize(users)
+        for (i, _, _, _), user in zip(creatable, serialized_users):
+            results[i] = {'status': 'success', 'data': user,
+                          'message': None}
+        return self.response(data=results)
+
+    @staticmethod
+    def clean_item(item) -> typing.Tuple[str, str, str]:
+        if not isinstance(item, dict):
+            raise ValidationError('Expected an object')
+        values = [item.get(k) for k in ('email', 'username', 'password')]
+        if not all(isinstance(value, str) and value for value in values):
+            raise ValidationError('email, username and password required')
+        email, username, password = values
+        email = User.objects.normalize_email(email)
+        validate_email(email)
+        User._meta.get_field('username').run_validators(username)
+        return email, username, password
+
+    @staticmethod
+    def item_error(message: str) -> dict:
+        return {'status': 'error', 'data': None, 'message': message}
+
+
+login_seconds = registry.histogram(
+    'hbnn_login_seconds', 'JWTAuthView.post latency by result.',
+    labelnames=('result', ))
 
 
 class JWTAuthView(APIView):
     def post(self, request) -> JsonResponse:
+        started_at = time.perf_counter()
+        response = self.login(request)
+        login_seconds.observe(time.perf_counter() - started_at,
+                              result=response.status_code)
+        return response
+
+    async def async_post(self, request) -> JsonResponse:
+        started_at = time.perf_counter()
+        response = await self.async_login(request)
+        login_seconds.observe(time.perf_counter() - started_at,
+                              result=response.status_code)
+        return response
+
+    def login(self, request) -> JsonResponse:
         email = request.POST.get('email')
         password = request.POST.get('password')
         try:
@@ -202,9 +711,35 @@ class JWTAuthView(APIView):
         except ObjectDoesNotExist:
             return self.response(status_code=400,
                                  message='User does not exist')
-        if not user.check_password(raw_password=password):
+        # 해싱은 요청 스레드가 아닌 해싱 풀에서 수행합니다
+        try:
+            valid = hashing_pool.run('check', check_password,
+                                     password, user.password)
+        except HashingPoolFull:
+            return self.busy()
+        return self.token_response(user, valid)
+
+    async def async_login(self, request) -> JsonResponse:
+        email = request.POST.get('email')
+        password = request.POST.get('password')
+        try:
+            user = await run_sync(User.objects.get, email=email)
+        except ObjectDoesNotExist:
+            return self.response(status_code=400,
+                                 message='User does not exist')
+        try:
+            valid = await hashing_pool.run_async('check', check_password,
+                                                 password, user.password)
+        except HashingPoolFull:
+            return self.busy()
+        return self.token_response(user, valid)
+
+    def token_response(self, user: User, valid: bool) -> JsonResponse:
+        if not valid:
             return self.response(status_code=400,
                                  message='User does not exist')
+        # 이어지는 요청의 jwt_login_required 가 DB 를 읽지 않도록 합니다
+        JWTManager.cache_user(user)
         token = JWTManager.encode(user_id=str(user.id))
         data = {'token': token}
         return self.response(data=data)
@@ -221,10 +756,14 @@ class UserProfileAPIView(APIView):
             - 'introduction': 짧은 소개
             - 'description': 긴 소개
     """
+    replica_methods = ('get', )
+    # 상태와, 조각 캐시에 없을 때의 프로파일
+    query_budget = {'get': (2, 1)}
+
     def get_user(self, user_id):
-        try:
-            user = User.objects.get(id=user_id)
-        except ObjectDoesNotExist:
+        # jwt_login_required 가 조회한 유저와 같은 캐시를 사용합니다
+        user = JWTManager.get_user(user_id)
+        if user is None:
             return self.response(status_code=404,
                                  message='User does not exist')
         return user
@@ -261,28 +800,89 @@ class UserProfileAPIView(APIView):
             self.serialize_userprofile([userprofile, ])[0]
         return self.response(data=serialized_userprofile)
 
+    def userprofile_state(self, request, user_id: uuid.UUID):
+        """ETag 를 위한 유저 프로파일의 상태
+
+            id 와 modified_at 만 읽습니다. 고른 필드가 있으면 응답에 필요한
+            그 컬럼도 함께 읽어 두어 get 이 다시 조회하지 않습니다.
+        """
+        try:
+            serializer = self.userprofile_serializer.sparse(
+                request.GET.get('fields'))
+        except InvalidFields:
+            # get 이 400 으로 응답합니다
+            return None
+        row = self.userprofile_row(serializer, user_id)
+        if row is None:
+            return None
+        modified_at = row['modified_at']
+        return f'{row["id"]}:{modified_at.isoformat()}', modified_at, row
+
+    def userprofile_row(self, serializer: FieldSerializer,
+                        user_id: uuid.UUID) -> typing.Optional[dict]:
+        """프로파일의 id, modified_at (과 고른 필드의 컬럼)
+
+            전체 필드는 userprofile_fragments 에서 가져오므로 설명
+            (description) 같은 컬럼은 읽지 않습니다.
+        """
+        queryset = UserProfile.objects.filter(user_id=user_id)
+        if serializer is self.userprofile_serializer:
+            return queryset.values('id', 'modified_at').first()
+        return serializer.values(queryset, 'id', 'modified_at').first()
+
+    def userprofile_dependencies(self, request, user_id: uuid.UUID):
+        return [f'profile:{user_id}']
+
     @jwt_login_required
+    @cached_response(userprofile_dependencies)
+    @conditional(userprofile_state)
     def get(self, request, user_id: uuid.UUID) -> JsonResponse:
         """유저 프로파일을 가져옵니다
 
+            ETag, Last-Modified 헤더로 조건부 요청을 지원합니다.
+
             :param uuid user_id: 가져올 프로파일의 유저의 id
-        """
-        user = self.get_user(user_id)
 
+            :param request:
+                - 'fields': 쉼표로 구분한 userprofile_fields 중 응답할 필드
+                  (예: 'user,taste'). 고른 컬럼만 읽습니다
+        """
         try:
-            userprofile = user.userprofile
-        except AttributeError:
+            serializer = self.userprofile_serializer.sparse(
+                request.GET.get('fields'))
+        except InvalidFields as e:
+            return self.response(status_code=400, message=str(e))
+
+        # userprofile_state 가 읽어 둔 행
+        if hasattr(request, 'conditional_state'):
+            state = request.conditional_state
+            row = state[2] if state is not None else None
+        else:
+            row = self.userprofile_row(serializer, user_id)
+        if row is None:
+            if not User.objects.filter(id=user_id).exists():
+                return self.response(status_code=404,
+                                     message='User does not exist')
             return self.response(status_code=404,
                                  message='User profile does not exist')
 
-        serialized_userprofile = \
-            self.serialize_userprofile([userprofile, ])[0]
-        return self.response(data=serialized_userprofile)
+        if serializer is not self.userprofile_serializer:
+            return self.response(data=serializer.from_values(row))
+
+        # 조각 캐시에 없을 때만 프로파일의 행을 읽습니다
+        fragments = self.userprofile_fragments.fragments(
+            [(row['id'], row['modified_at'])], UserProfile.objects.all())
+        if row['id'] not in fragments:
+            return self.response(status_code=404,
+                                 message='User profile does not exist')
+        return self.response(data=fragments[row['id']])
 
     @jwt_login_required
     def put(self, request, user_id: uuid.UUID) -> JsonResponse:
         """유저 프로파일을 변경합니다
 
+            보낸 필드만 하나의 UPDATE 로 변경합니다.
+
             :param uuid user_id: 변경할 유저의 id
 
             :param request:
@@ -294,30 +894,499 @@ class UserProfileAPIView(APIView):
 
                     'introduction': '안녕하세요',
 
-                    'description': '자세한 설명은 생략한다'
+                    'description': '자세한 설명은 생략한다',
+
+                    'modified_at': 응답으로 받은 modified_at (선택)
 
                 }
+
+                modified_at 을 보내면 그 사이 다른 곳에서 변경된 경우 409 로
+                응답합니다.
         """
-        user = self.get_user(user_id)
+        parameters = QueryDict(request.body)
+        allowed = set(self.editable_fields) | {'modified_at'}
+        unknown = set(parameters) - allowed
+        if unknown:
+            return self.response(
+                status_code=400,
+                message=f'Unknown fields: {", ".join(sorted(unknown))}')
+
+        values = {}
+        for name in self.editable_fields:
+            if name not in parameters:
+                continue
+            field = UserProfile._meta.get_field(name)
+            try:
+                values[name] = field.clean(parameters.get(name), None)
+            except ValidationError as e:
+                return self.response(status_code=400,
+                                     message=f'{name}: {e.messages[0]}')
+        if not values:
+            return self.response(status_code=400,
+                                 message='No fields to update')
+
         try:
-            userprofile = user.userprofile
-        except AttributeError:
+            userprofile = UserProfile.objects.get(user_id=user_id)
+        except ObjectDoesNotExist:
             return self.response(status_code=404,
                                  message='User profile does not exist')
 
-        parameters = QueryDict(request.body)
-        for field in parameters:
-            try:
-                setattr(userprofile, field, parameters.get(field))
-                userprofile.save()
-            except AttributeError:
-                'error'
-        userprofile.refresh_from_db()
+        expected = parameters.get('modified_at')
+        if expected is not None:
+            current = self.serialize_userprofile(
+                [userprofile, ])[0]['fields']['modified_at']
+            if expected != current:
+                return self.response(status_code=409,
+                                     message='User profile was modified')
+
+        # 읽은 뒤 다른 요청이 먼저 변경했다면 갱신되는 행이 없습니다
+        modified_at = timezone.now()
+        updated = UserProfile.objects.filter(
+            pk=userprofile.pk, modified_at=userprofile.modified_at
+        ).update(modified_at=modified_at, **values)
+        if not updated:
+            return self.response(status_code=409,
+                                 message='User profile was modified')
+
+        for name, value in values.items():
+            setattr(userprofile, name, value)
+        userprofile.modified_at = modified_at
+        # update() 는 시그널을 보내지 않으므로 색인을 위해 직접 보냅니다
+        post_save.send(sender=UserProfile, instance=userprofile,
+                       created=False, raw=False, using=userprofile._state.db,
+                       update_fields=frozenset(values) | {'modified_at'})
 
         serialized_userprofile = \
             self.serialize_userprofile([userprofile, ])[0]
         return self.response(data=serialized_userprofile)
 
+    editable_fields = ('taste', 'introduction', 'description')
+    userprofile_fields = ('user', 'taste', 'introduction', 'description',
+                          'modified_at')
+    userprofile_serializer = FieldSerializer(UserProfile, userprofile_fields)
+    userprofile_fragments = FragmentCache(userprofile_serializer)
+
     def serialize_userprofile(self, data):
-        return self.serialize(data, fields=('user', 'taste',
-                                            'introduction', 'description'))
+        return self.userprofile_serializer.serialize(data)
+
+
+class ProfileBatchAPIView(APIView):
+    """여러 유저의 프로파일을 한 번에 가져옵니다
+
+        url: /api/profiles/
+
+        프로파일과 유저를 하나의 JOIN 쿼리로 읽습니다.
+
+        :return Dict:
+            - 'profiles': 요청 순서대로 {'user': User, 'profile': UserProfile}
+            - 'missing': 프로파일이 없는 유저 id
+    """
+    @jwt_login_required
+    def get(self, request) -> JsonResponse:
+        """
+            :param request:
+                - 'ids': 쉼표로 구분한 유저 id (최대 PROFILE_BATCH_MAX_IDS)
+        """
+        ids = [i for i in request.GET.get('ids', '').split(',') if i]
+        return self.batch(ids)
+
+    @jwt_login_required
+    def post(self, request) -> JsonResponse:
+        """긴 목록은 body 에 json 으로 전달합니다
+
+            :param request:
+                {
+
+                    'ids': [유저 id, ...]
+
+                }
+        """
+        try:
+            body = json.loads(request.body.decode('utf8'))
+            ids = body['ids']
+        except (UnicodeError, ValueError, TypeError, KeyError):
+            return self.response(status_code=400, message='Invalid JSON')
+        if not isinstance(ids, list):
+            return self.response(status_code=400, message='Invalid ids')
+        return self.batch(ids)
+
+    def batch(self, ids: list) -> JsonResponse:
+        try:
+            # 순서를 유지하면서 중복을 없앱니다
+            user_ids = list(OrderedDict.fromkeys(
+                uuid.UUID(str(user_id)) for user_id in ids))
+        except ValueError:
+            return self.response(status_code=400, message='Invalid ids')
+        if not user_ids:
+            return self.response(status_code=400, message='ids required')
+        if len(user_ids) > settings.PROFILE_BATCH_MAX_IDS:
+            return self.response(status_code=400, message='Too many ids')
+
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects.select_related('user')
+            .filter(user_id__in=user_ids)
+        }
+        # 한 번의 JOIN 으로 모두 읽으므로 조각 캐시로는 인코딩만 아낍니다
+        user_fragments = UserAPIView.user_fragments
+        profile_fragments = UserProfileAPIView.userprofile_fragments
+        data = {'profiles': [], 'missing': []}
+        for user_id in user_ids:
+            profile = profiles.get(user_id)
+            if profile is None:
+                data['missing'].append(str(user_id))
+                continue
+            data['profiles'].append({
+                'user': user_fragments.from_object(profile.user),
+                'profile': profile_fragments.from_object(profile),
+            })
+        return self.response(data=data)
+
+
+class MatchAPIView(APIView):
+    """같은 음식 취향을 가진 밥친구 후보를 찾습니다
+
+        url: /api/match/
+
+        워커 프로세스의 취향 인덱스에서 조회하므로 DB 를 거치지 않습니다.
+
+        :return List: 후보 유저의 id (id 순서)
+    """
+    @jwt_login_required
+    def get(self, request) -> JsonResponse:
+        """
+            :param request:
+                - 'taste': 음식 취향 (필수)
+                - 'gender': 성별 (선택)
+                - 'limit': 페이지 크기 (최대 API_PAGE_MAX_LIMIT)
+                - 'cursor': 응답의 'next' 값
+        """
+        tastes = dict(UserProfile.TASTE_CHOICES)
+        genders = dict(User.GENDER_CHOICES)
+        try:
+            taste = int(request.GET['taste'])
+            gender = request.GET.get('gender')
+            gender = int(gender) if gender else None
+            limit = CursorPaginator.parse_limit(request.GET.get('limit'))
+            after = request.GET.get('cursor')
+            if after:
+                after = str(uuid.UUID(after))
+        except (KeyError, ValueError):
+            return self.response(status_code=400,
+                                 message='Invalid parameters')
+        if taste not in tastes or gender not in (None, *genders):
+            return self.response(status_code=400,
+                                 message='Invalid parameters')
+
+        # 후보를 고를 때는 id 만 쓰므로 지워진 유저인지 따로 확인합니다
+        if not request.user.exists():
+            return self.response(status_code=401, message='JWT required')
+
+        taste_index.ensure_built()
+        user_ids = taste_index.candidates(taste, gender, after=after,
+                                          limit=limit + 1,
+                                          exclude=request.user.id)
+        next_ = user_ids[limit - 1] if len(user_ids) > limit else None
+        page = CursorPage(items=user_ids[:limit], next=next_, prev=None)
+        return self.response(data=page.items, page=page)
+
+
+class SearchAPIView(APIView):
+    """소개(introduction)와 긴 소개(description)로 유저 프로파일을 검색합니다
+
+        url: /api/search/
+
+        :return List: 순위 순서의 UserProfile
+    """
+    @jwt_login_required
+    def get(self, request) -> JsonResponse:
+        """
+            :param request:
+                - 'q': 검색어
+                - 'limit': 페이지 크기 (최대 API_PAGE_MAX_LIMIT)
+                - 'page': 응답의 'next' 또는 'prev' 값 (1부터 시작)
+        """
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = CursorPaginator.parse_limit(request.GET.get('limit'))
+            page_number = int(request.GET.get('page') or 1)
+        except (InvalidCursor, ValueError):
+            return self.response(status_code=400,
+                                 message='Invalid parameters')
+        if not query or page_number < 1:
+            return self.response(status_code=400,
+                                 message='Invalid parameters')
+
+        ranked = search(query, offset=(page_number - 1) * limit,
+                        limit=limit + 1)
+        has_next = len(ranked) > limit
+        profile_ids = [row['profile_id'] for row in ranked[:limit]]
+        modified = dict(UserProfile.objects.filter(id__in=profile_ids)
+                        .values_list('id', 'modified_at'))
+        profiles = UserProfileAPIView.userprofile_fragments.fragments(
+            [(profile_id, modified[profile_id]) for profile_id in profile_ids
+             if profile_id in modified], UserProfile.objects.all())
+        data = list(profiles.values())
+
+        page = CursorPage(items=data,
+                          next=page_number + 1 if has_next else None,
+                          prev=page_number - 1 if page_number > 1 else None)
+        return self.response(data=data, page=page)
+
+
+batch_subrequests = registry.counter(
+    'hbnn_batch_subrequests_total',
+    'Sub-requests handled by /api/batch/ by route and status code.',
+    labelnames=('route', 'status'))
+
+
+class BatchBudgetExceeded(Exception):
+    pass
+
+
+class BatchBudget(QueryRecorder):
+    """배치의 하위 요청 전체가 쓸 수 있는 쿼리 수와 시간
+
+        한도를 넘은 뒤의 쿼리는 실행하지 않고 BatchBudgetExceeded 를
+        일으키므로 실행 중인 하위 요청도 그 자리에서 멈춥니다.
+        시간은 쿼리를 실행할 때와 하위 요청 사이에서만 확인합니다.
+    """
+
+    # 하위 요청을 감싼 atomic() 의 트랜잭션 문은 세지 않고, 한도를 넘은 뒤의
+    # 롤백도 막지 않습니다
+    TRANSACTION_SQL = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT',
+                       'ROLLBACK TO SAVEPOINT')
+
+    def __init__(self, max_queries: int, seconds: float):
+        super().__init__()
+        self.max_queries = max_queries
+        self.deadline = time.monotonic() + seconds
+
+    def exceeded(self) -> bool:
+        return self.count >= self.max_queries or \
+            time.monotonic() > self.deadline
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(self.TRANSACTION_SQL):
+            return execute(sql, params, many, context)
+        if self.exceeded():
+            raise BatchBudgetExceeded()
+        return super().__call__(execute, sql, params, many, context)
+
+
+class BatchAPIView(APIView):
+    """여러 API 호출을 하나의 요청으로 처리합니다
+
+        url: /api/batch/
+
+        하위 요청은 api/urls.py 로 찾은 APIView 를 이 요청 스레드에서
+        차례로 호출하며 미들웨어는 거치지 않습니다.
+
+        - 배치의 Authorization 을 한 번만 검증하고 모든 하위 요청이 같은
+          유저를 씁니다. 하위 요청의 로그인(POST /api/auth/)이 성공하면
+          이후의 하위 요청은 그 토큰을 씁니다.
+        - 같은 GET 하위 요청은 한 번만 실행합니다. 쓰기 하위 요청 뒤에는
+          다시 실행합니다.
+        - 하위 요청의 쿠키 (hbnn_primary) 는 이후의 하위 요청과 배치 응답에
+          전달됩니다.
+        - 하위 요청은 API_BATCH_MAX_REQUESTS 개까지이며, 하위 요청 전체가
+          API_BATCH_MAX_SECONDS 초 또는 API_BATCH_MAX_QUERIES 개의 쿼리를
+          넘기면 (BatchBudget) 실행 중인 하위 요청은 롤백하고, 그 하위
+          요청과 남은 하위 요청은 503 입니다.
+        - DELETE 하위 요청 뒤에는 유저를 다시 조회하므로 지워진 유저의
+          토큰은 이후의 하위 요청에서 401 입니다.
+
+        :return List: 요청 순서대로 {'status': 상태 코드, 'body': 응답 본문}
+    """
+    query_budget = {'post': (None, None)}
+
+    API_PREFIX = '/api/'
+    METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+    # 하위 요청에 넘기지 않는 배치 요청의 environ
+    EXCLUDED_ENVIRON = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING',
+                        'HTTP_AUTHORIZATION', 'HTTP_COOKIE',
+                        'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+                        'wsgi.input')
+
+    def post(self, request) -> JsonResponse:
+        """
+            :param request:
+                {
+
+                    'requests': [
+
+                        {
+                            'method': 'GET',
+                            'path': '/api/users/{user_id}/profile/',
+                            'body': 폼 필드 (선택),
+                            'json': json 본문 (선택)
+                        },
+
+                        ...
+
+                    ]
+
+                }
+        """
+        try:
+            body = json.loads(request.body.decode('utf8'))
+            items = body['requests']
+        except (UnicodeError, ValueError, TypeError, KeyError):
+            return self.response(status_code=400, message='Invalid JSON')
+        if not isinstance(items, list) or not items:
+            return self.response(status_code=400, message='requests required')
+        if len(items) > settings.API_BATCH_MAX_REQUESTS:
+            return self.response(status_code=400, message='Too many requests')
+
+        self.authorization = request.META.get('HTTP_AUTHORIZATION')
+        self.cookies = dict(request.COOKIES)
+        self.set_cookies = {}
+        self.users = {}
+        self.identity = {}
+
+        results = []
+        budget = BatchBudget(settings.API_BATCH_MAX_QUERIES,
+                             settings.API_BATCH_MAX_SECONDS)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(budget))
+            for item in items:
+                if budget.exceeded():
+                    results.append(self.budget_exceeded())
+                    continue
+                results.append(self.run(item))
+
+        response = self.response(data=results)
+        for name, morsel in self.set_cookies.items():
+            response.cookies[name] = morsel
+        return response
+
+    def run(self, item) -> dict:
+        if not isinstance(item, dict):
+            return self.item_error(400, 'Invalid request')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in self.METHODS or not isinstance(path, str) or \
+                not path.startswith(self.API_PREFIX):
+            return self.item_error(400, 'Invalid request')
+
+        path_info, _, query = path.partition('?')
+        try:
+            match = resolve('/' + path_info[len(self.API_PREFIX):],
+                            urlconf='api.urls')
+        except Resolver404:
+            return self.item_error(404, 'Not found')
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is None or not issubclass(view_class, APIView) or \
+                issubclass(view_class, BatchAPIView):
+            return self.item_error(400, 'Not allowed in batch')
+
+        if method == 'GET':
+            key = (path, self.authorization)
+            if key in self.identity:
+                return self.identity[key]
+        else:
+            # 쓰기 뒤에는 같은 GET 도 다시 읽습니다
+            key = None
+            self.identity.clear()
+
+        try:
+            request = self.sub_request(method, path_info, query, item)
+        except (TypeError, ValueError):
+            return self.item_error(400, 'Invalid body')
+        request.resolver_match = match
+        try:
+            # 한도를 넘어 멈춘 하위 요청의 쓰기는 남기지 않습니다
+            with transaction.atomic():
+                response = match.func(request, *match.args, **match.kwargs)
+        except BatchBudgetExceeded:
+            batch_subrequests.inc(route=match.url_name, status=503)
+            return self.budget_exceeded()
+        except Exception as e:
+            response = response_for_exception(request, e)
+        if method == 'DELETE':
+            # 지워졌을 수 있는 유저를 다음 하위 요청에서 다시 조회합니다
+            self.users.clear()
+        batch_subrequests.inc(route=match.url_name,
+                              status=response.status_code)
+
+        self.share(match.url_name, response)
+        result = self.result(response)
+        if key is not None:
+            self.identity[key] = result
+        return result
+
+    def budget_exceeded(self) -> dict:
+        return self.item_error(503, 'Batch budget exceeded')
+
+    def sub_request(self, method: str, path_info: str, query: str,
+                    item: dict) -> WSGIRequest:
+        body, content_type = b'', None
+        if item.get('json') is not None:
+            body = json.dumps(item['json']).encode('utf8')
+            content_type = 'application/json'
+        elif item.get('body') is not None:
+            if not isinstance(item['body'], dict):
+                raise ValueError('body must be an object')
+            body = urlencode(item['body'], doseq=True).encode('utf8')
+            content_type = 'application/x-www-form-urlencoded'
+
+        environ = {key: value for key, value in self.request.META.items()
+                   if key not in self.EXCLUDED_ENVIRON}
+        environ.update({
+            'REQUEST_METHOD': method,
+            # WSGI 는 바이트를 latin-1 로 디코딩한 문자열을 사용합니다
+            'PATH_INFO': path_info.encode('utf8').decode('latin1'),
+            'QUERY_STRING': query,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+        if content_type is not None:
+            environ['CONTENT_TYPE'] = content_type
+        if self.authorization is not None:
+            environ['HTTP_AUTHORIZATION'] = self.authorization
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items())
+
+        request = WSGIRequest(environ)
+        user = self.jwt_user()
+        if user is not None:
+            request.jwt_user = user
+        return request
+
+    def jwt_user(self):
+        """현재 Authorization 의 유저 (토큰마다 한 번만 검증합니다)"""
+        if self.authorization not in self.users:
+            type_, _, token = (self.authorization or '').partition(' ')
+            self.users[self.authorization] = \
+                JWTManager.decode_lazy(token=token) \
+                if type_.upper() == 'JWT' and token else None
+        return self.users[self.authorization]
+
+    def share(self, route: str, response: HttpResponse) -> None:
+        """하위 요청의 로그인과 쿠키를 이후의 하위 요청에 전달합니다"""
+        if route == 'api_auth' and response.status_code == 200:
+            token = json.loads(response.content)['data']['token']
+            self.authorization = f'JWT {token}'
+        for name, morsel in response.cookies.items():
+            self.cookies[name] = morsel.value
+            self.set_cookies[name] = morsel
+
+    def result(self, response: HttpResponse) -> dict:
+        if response.streaming:
+            return self.item_error(400, 'Streaming is not allowed in batch')
+        body = None
+        if response.content:
+            if response.get('Content-Type', '').startswith(
+                    'application/json'):
+                # 하위 응답의 JSON 은 다시 인코딩하지 않고 이어 붙입니다
+                body = Fragment(response.content)
+            else:
+                body = response.content.decode(response.charset)
+        return {'status': response.status_code, 'body': body}
+
+    @staticmethod
+    def item_error(status_code: int, message: str) -> dict:
+        return {'status': status_code,
+                'body': {'status': 'error', 'data': None, 'message': message}}
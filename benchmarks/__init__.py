@@ -0,0 +1,35 @@
+"""
+    Benchmarks
+    ~~~~~~~~~~
+
+    python -m benchmarks.<name> 으로 실행합니다.
+
+    실제 db.sqlite3 를 건드리지 않도록 별도의 SQLite 데이터베이스
+    (기본값은 메모리)에 스키마를 만든 뒤 측정합니다.
+"""
+
+import os
+import time
+import typing
+
+
+def setup_django(database: str = ':memory:') -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hbnn.settings')
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DATABASES['default']['NAME'] = database
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def best_of(func: typing.Callable, repeat: int = 5) -> float:
+    """func 를 repeat 번 실행하여 가장 빠른 시간(초)을 반환합니다"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,93 @@
+"""
+    /api/batch/ 벤치마크
+    ~~~~~~~~~~~~~~~~~~~~
+
+    앱의 첫 화면처럼 여러 API (내 정보, 내 프로파일, 유저 목록, 여러
+    프로파일) 를 하나씩 호출할 때와 /api/batch/ 로 한 번에 호출할 때를
+    미들웨어를 포함한 Django 테스트 클라이언트로 비교합니다.
+
+    네트워크 왕복은 HTTP 요청마다 --rtt 밀리초를 더하여 흉내냅니다.
+
+        $ python -m benchmarks.batch [--rtt 50]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks import best_of, setup_django
+from utils.tables import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--rtt', type=float, default=50.,
+                        help='HTTP 요청마다 더하는 왕복 시간 (밀리초)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import Client
+
+    from user.models import User, UserProfile
+    from utils.auth import JWTManager
+
+    User.objects.bulk_create(
+        (User(email=f'{i}@bench.com', username=f'bench{i}', password='!')
+         for i in range(args.users)),
+        batch_size=500)
+    users = list(User.objects.order_by('created_at', 'id'))
+    UserProfile.objects.bulk_create(
+        UserProfile(user=user, taste=UserProfile.KOREAN,
+                    introduction='안녕하세요', description='벤치마크')
+        for user in users)
+
+    me = users[0]
+    ids = ','.join(str(user.id) for user in users[1:21])
+    requests = [
+        {'method': 'GET', 'path': f'/api/users/{me.id}/'},
+        {'method': 'GET', 'path': f'/api/users/{me.id}/profile/'},
+        {'method': 'GET', 'path': '/api/users/?limit=20'},
+        {'method': 'GET', 'path': f'/api/profiles/?ids={ids}'},
+        {'method': 'GET', 'path': '/api/ping/'},
+    ]
+
+    client = Client(
+        SERVER_NAME='localhost',
+        HTTP_AUTHORIZATION=f'JWT {JWTManager.encode(user_id=str(me.id))}')
+    cache = caches[settings.API_RESPONSE_CACHE]
+
+    def http(method, path, **kwargs):
+        time.sleep(args.rtt / 1000)
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code == 200, response.content
+        return len(response.content)
+
+    def separate():
+        # 응답 캐시를 거치지 않고 매번 만듭니다
+        cache.clear()
+        return sum(http('get', request['path']) for request in requests)
+
+    def batch():
+        cache.clear()
+        return http('post', '/api/batch/',
+                    data=json.dumps({'requests': requests}),
+                    content_type='application/json')
+
+    rows = []
+    for name, func in (('separate requests', separate),
+                       ('/api/batch/', batch)):
+        size = func()
+        seconds = best_of(func, args.repeat)
+        rows.append((name, f'{seconds * 1000:.2f}', size))
+
+    print_table(rows, header=(f'{len(requests)} calls (rtt {args.rtt:g} ms)',
+                              'best ms', 'bytes'))
+
+
+if __name__ == '__main__':
+    main()
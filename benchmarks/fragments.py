@@ -0,0 +1,66 @@
+"""
+    JSON 조각 캐시 벤치마크
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    유저 목록 응답을 매번 FieldSerializer 로 인코딩하는 경로와,
+    (id, modified_at) 만 읽고 캐시된 조각을 이어 붙이는 경로를 비교합니다.
+
+        $ python -m benchmarks.fragments [--users 10000] [--page 100]
+"""
+
+import argparse
+
+from benchmarks import best_of, setup_django
+from utils.tables import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.http import JsonResponse
+
+    from api.views import APIView
+    from user.models import User
+    from utils.fragments import FragmentCache
+    from utils.serializers import FieldSerializer
+
+    User.objects.bulk_create(
+        (User(email=f'{i}@bench.com', username=f'bench{i}', password='!')
+         for i in range(args.users)),
+        batch_size=500)
+
+    serializer = FieldSerializer(User, ('username', 'email', 'created_at'))
+    fragments = FragmentCache(serializer, maxsize=args.users, ttl=3600)
+
+    rows = []
+    for size in (args.page, args.users):
+        users = User.objects.order_by('created_at', 'id')[:size]
+
+        def encode():
+            JsonResponse({'data': serializer.serialize(users)})
+
+        def splice():
+            keys = list(users.values_list('id', 'modified_at'))
+            data = list(fragments.fragments(keys, User.objects.all())
+                        .values())
+            APIView.response(data=data)
+
+        splice()
+        encode_time = best_of(encode, args.repeat)
+        splice_time = best_of(splice, args.repeat)
+        rows.append((size, f'{encode_time * 1000:.2f}',
+                     f'{splice_time * 1000:.2f}',
+                     f'{encode_time / splice_time:.2f}x'))
+
+    print_table(rows, header=('users', 'encode ms', 'fragments ms',
+                              'speedup'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+    취향 인덱스 벤치마크
+    ~~~~~~~~~~~~~~~~~~~~
+
+    프로파일 1,000,000개로 TasteIndex 를 만들고 후보 조회 시간을 잽니다.
+
+        $ python -m benchmarks.match [--profiles 1000000]
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from benchmarks import setup_django
+from utils.tables import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profiles', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from user.matching import TasteIndex
+    from user.models import User, UserProfile
+
+    tastes = [taste for taste, _ in UserProfile.TASTE_CHOICES]
+    genders = [gender for gender, _ in User.GENDER_CHOICES]
+    rng = random.Random(0)
+    rows = [(uuid.UUID(int=rng.getrandbits(128), version=4),
+             rng.choice(tastes), rng.choice(genders))
+            for _ in range(args.profiles)]
+
+    index = TasteIndex()
+    start = time.perf_counter()
+    index.build(rows)
+    build_seconds = time.perf_counter() - start
+
+    ids = [str(user_id) for user_id, _, _ in rows]
+    results = []
+    for label, gender in (('taste', False), ('taste+gender', True)):
+        timings = []
+        for _ in range(args.lookups):
+            taste = rng.choice(tastes)
+            after = rng.choice(ids)
+            start = time.perf_counter()
+            index.candidates(taste, rng.choice(genders) if gender else None,
+                             after=after, limit=args.limit, exclude=after)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results.append((
+            label,
+            f'{timings[len(timings) // 2] * 1e6:.1f}',
+            f'{timings[int(len(timings) * .99)] * 1e6:.1f}',
+        ))
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.add(uuid.uuid4(), rng.choice(tastes), rng.choice(genders))
+    add_seconds = (time.perf_counter() - start) / 1000
+
+    print(f'build {args.profiles} profiles: {build_seconds:.2f}s, '
+          f'signal update: {add_seconds * 1e6:.1f}us')
+    print_table(results, header=(f'lookup (limit {args.limit})',
+                                 'p50 us', 'p99 us'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+    APIView.serialize 벤치마크
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    django.core.serializers 'json' → json.loads → JsonResponse 로 이어지는
+    기존 경로와 FieldSerializer 경로를 유저 10,000명으로 비교합니다.
+
+        $ python -m benchmarks.serializer [--users 10000]
+"""
+
+import argparse
+import json
+
+from benchmarks import best_of, setup_django
+from utils.tables import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core import serializers
+    from django.http import JsonResponse
+
+    from user.models import User
+    from utils.serializers import FieldSerializer
+
+    fields = ('username', 'email', 'created_at')
+    User.objects.bulk_create(
+        (User(email=f'{i}@bench.com', username=f'bench{i}', password='!')
+         for i in range(args.users)),
+        batch_size=500)
+
+    def legacy():
+        dump = serializers.serialize('json', User.objects.all(),
+                                     fields=fields)
+        JsonResponse({'data': json.loads(dump)})
+
+    serializer = FieldSerializer(User, fields)
+
+    def compiled():
+        JsonResponse({'data': serializer.serialize(User.objects.all())})
+
+    legacy_time = best_of(legacy, args.repeat)
+    compiled_time = best_of(compiled, args.repeat)
+    print_table(
+        (
+            ('serialize+json.loads', f'{legacy_time * 1000:.1f}', '1.00x'),
+            ('FieldSerializer', f'{compiled_time * 1000:.1f}',
+             f'{legacy_time / compiled_time:.2f}x'),
+        ),
+        header=(f'path ({args.users} users)', 'best ms', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
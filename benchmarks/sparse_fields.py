@@ -0,0 +1,75 @@
+"""
+    ?fields= 벤치마크
+    ~~~~~~~~~~~~~~~~~
+
+    유저 목록 API (GET /api/users/) 를 전체 필드와 최소 필드
+    (fields=username) 로 호출하여 시간과 응답 크기를 비교합니다.
+    페이지 (limit=100) 와 전체 목록 스트리밍 (stream=json) 을 잽니다.
+
+        $ python -m benchmarks.sparse_fields [--users 10000]
+"""
+
+import argparse
+
+from benchmarks import best_of, setup_django
+from utils.tables import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import RequestFactory
+
+    from api.views import UserAPIView
+    from user.models import User
+
+    User.objects.bulk_create(
+        (User(email=f'{i}@bench.com', username=f'bench{i}', password='!')
+         for i in range(args.users)),
+        batch_size=500)
+
+    factory = RequestFactory()
+    view = UserAPIView.as_view()
+    cache = caches[settings.API_RESPONSE_CACHE]
+
+    def call(params):
+        # 응답 캐시를 거치지 않고 매번 만듭니다
+        cache.clear()
+        response = view(factory.get('/api/users/', params))
+        if response.streaming:
+            return len(b''.join(response.streaming_content))
+        return len(response.content)
+
+    cases = (
+        ('page, full (cold fragments)', {'limit': 100}, True),
+        ('page, full (warm fragments)', {'limit': 100}, False),
+        ('page, fields=username', {'limit': 100, 'fields': 'username'},
+         False),
+        ('stream, full', {'stream': 'json'}, False),
+        ('stream, fields=username', {'stream': 'json', 'fields': 'username'},
+         False),
+    )
+    rows = []
+    for name, params, cold in cases:
+        def run():
+            if cold:
+                UserAPIView.user_fragments.cache.clear()
+            call(params)
+
+        size = call(params)
+        seconds = best_of(run, args.repeat)
+        rows.append((name, f'{seconds * 1000:.2f}', size))
+
+    print_table(rows, header=(f'GET /api/users/ ({args.users} users)',
+                              'best ms', 'bytes'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+    SQLite 동시성 벤치마크
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    여러 워커 프로세스가 하나의 SQLite 파일에 읽기와 쓰기를 섞어 보낼 때의
+    처리량과 'database is locked' 오류 수를 기본 설정과
+    hbnn.settings_production 설정으로 비교합니다.
+
+    기본 설정은 요청마다 새로 연결하고 (CONN_MAX_AGE=0),
+    production 설정은 연결을 유지하고 SQLITE_PRAGMAS 를 적용합니다.
+
+        $ python -m benchmarks.sqlite_concurrency [--workers 8] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from utils.tables import print_table
+
+ROWS = 10000
+
+
+def prepare(path: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE user (id INTEGER PRIMARY KEY, '
+                 'username VARCHAR(60), modified_at REAL)')
+    conn.executemany('INSERT INTO user VALUES (?, ?, ?)',
+                     ((i, f'user{i}', time.time()) for i in range(ROWS)))
+    conn.commit()
+    conn.close()
+
+
+def connect(path: str, pragmas) -> sqlite3.Connection:
+    # Django 의 sqlite3 백엔드와 같은 기본 timeout (5초)
+    conn = sqlite3.connect(path, timeout=5)
+    for name, value in pragmas:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def worker(path, pragmas, persistent, write_ratio, seconds, queue):
+    rng = random.Random(os.getpid())
+    reads = writes = errors = 0
+    conn = connect(path, pragmas) if persistent else None
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if not persistent:
+            conn = connect(path, pragmas)
+        try:
+            if rng.random() < write_ratio:
+                conn.execute('UPDATE user SET modified_at = ? WHERE id = ?',
+                             (time.time(), rng.randrange(ROWS)))
+                conn.commit()
+                writes += 1
+            else:
+                conn.execute('SELECT * FROM user WHERE id = ?',
+                             (rng.randrange(ROWS), )).fetchone()
+                reads += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+        if not persistent:
+            conn.close()
+    queue.put((reads, writes, errors))
+
+
+def run(pragmas, persistent, args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        prepare(path)
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(path, pragmas, persistent, args.write_ratio,
+                      args.seconds, queue))
+            for _ in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    reads, writes, errors = (sum(column) for column in zip(*results))
+    return (f'{reads / args.seconds:.0f}', f'{writes / args.seconds:.0f}',
+            errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=.1)
+    args = parser.parse_args()
+
+    from hbnn.settings_production import SQLITE_PRAGMAS
+
+    print_table(
+        (
+            ('default', *run((), False, args)),
+            ('production', *run(SQLITE_PRAGMAS, True, args)),
+        ),
+        header=(f'profile ({args.workers} workers)', 'reads/s', 'writes/s',
+                'lock errors'))
+
+
+if __name__ == '__main__':
+    main()
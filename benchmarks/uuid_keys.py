@@ -0,0 +1,140 @@
+"""
+    UUID 키 벤치마크
+    ~~~~~~~~~~~~~~~~
+
+    user_user 스키마(마이그레이션으로 만든 것 그대로)를 가진 SQLite 파일에
+    uuid4 키와 uuid7 키로 유저 1,000,000명을 넣어 비교합니다.
+
+    - insert: 1,000 행씩 커밋하며 넣는 데 걸린 시간
+    - size: 데이터베이스 파일 크기
+    - recent lookups: 가장 최근에 가입한 유저들을 primary key 로 조회
+    - pk scan: primary key 순서로 전체 id 를 읽는 시간
+    - page: (created_at, id) 커서 페이지 하나를 읽는 시간
+
+        $ python -m benchmarks.uuid_keys [--rows 1000000]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from benchmarks import best_of, setup_django
+from utils.tables import print_table
+
+BATCH_SIZE = 1000
+
+
+def schema() -> list:
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sql FROM sqlite_master "
+                       "WHERE tbl_name = 'user_user' AND sql IS NOT NULL "
+                       "ORDER BY type DESC")
+        return [sql for sql, in cursor.fetchall()]
+
+
+def rows(count: int, make_id):
+    created_at = datetime.datetime(2017, 1, 1)
+    step = datetime.timedelta(seconds=1)
+    for i in range(count):
+        created_at += step
+        yield (make_id().hex, '', None, f'user{i:07d}@hbnn.kr',
+               f'user{i:07d}', 1, True, False, str(created_at),
+               str(created_at))
+
+
+def run(path: str, statements: list, count: int, make_id, lookups: int):
+    conn = sqlite3.connect(path, isolation_level=None)
+    for sql in statements:
+        conn.execute(sql)
+
+    insert = 'INSERT INTO user_user (id, password, last_login, email, ' \
+             'username, gender, is_active, is_staff, created_at, ' \
+             'modified_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    batch = []
+    start = time.perf_counter()
+    for row in rows(count, make_id):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.execute('BEGIN')
+            conn.executemany(insert, batch)
+            conn.execute('COMMIT')
+            batch = []
+    if batch:
+        conn.execute('BEGIN')
+        conn.executemany(insert, batch)
+        conn.execute('COMMIT')
+    insert_seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    conn.close()
+
+    # 캐시를 비운 새 연결로 읽습니다
+    conn = sqlite3.connect(path)
+    recent = [user_id for user_id, in conn.execute(
+        'SELECT id FROM user_user ORDER BY created_at DESC LIMIT ?',
+        (lookups, ))]
+    random.Random(0).shuffle(recent)
+
+    def lookup():
+        for user_id in recent:
+            conn.execute('SELECT * FROM user_user WHERE id = ?',
+                         (user_id, )).fetchone()
+
+    def scan():
+        conn.execute('SELECT id FROM user_user ORDER BY id').fetchall()
+
+    created_at, user_id = conn.execute(
+        'SELECT created_at, id FROM user_user ORDER BY created_at, id '
+        'LIMIT 1 OFFSET ?', (count // 2, )).fetchone()
+
+    def page():
+        conn.execute(
+            'SELECT * FROM user_user WHERE created_at >= ? '
+            'AND (created_at > ? OR id > ?) ORDER BY created_at, id '
+            'LIMIT 21', (created_at, created_at, user_id)).fetchall()
+
+    results = (insert_seconds, size, best_of(lookup, repeat=3),
+               best_of(scan, repeat=3), best_of(page))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from utils.uuids import uuid7
+
+    statements = schema()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for label, make_id in (('uuid4', uuid.uuid4), ('uuid7', uuid7)):
+            path = os.path.join(directory, f'{label}.sqlite3')
+            insert, size, lookup, scan, page = run(
+                path, statements, args.rows, make_id, args.lookups)
+            results.append((
+                label,
+                f'{insert:.2f}',
+                f'{size / 1024 / 1024:.1f}',
+                f'{lookup * 1000:.1f}',
+                f'{scan * 1000:.1f}',
+                f'{page * 1e6:.0f}',
+            ))
+
+    print_table(results, header=(
+        f'key ({args.rows} rows)', 'insert s', 'size MiB',
+        f'recent lookups ms ({args.lookups})', 'pk scan ms', 'page us'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+ASGI config for hbnn project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 에는 ASGI 지원이 없으므로 utils.asgi.ASGIHandler 를 사용합니다.
+uvicorn hbnn.asgi:application 처럼 ASGI 서버로 실행합니다.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hbnn.settings")
+django.setup(set_prefix=False)
+
+from utils.asgi import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
+
+# 요청을 받기 전에 취향 인덱스를 만들어 두고 readiness 검사를 시작합니다
+from user.matching import taste_index  # noqa: E402
+from utils.health import health  # noqa: E402
+taste_index.ensure_built()
+health.start()
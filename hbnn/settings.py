@@ -42,9 +42,13 @@ INSTALLED_APPS = [
 INSTALLED_APPS += [
     'api',
     'user',
+    'search',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +88,36 @@ DATABASES = {
     }
 }
 
+# 연결마다 실행할 (이름, 값) 목록 (hbnn/settings_production.py 참고)
+SQLITE_PRAGMAS = ()
+
+DATABASE_ROUTERS = ['utils.routers.ReplicaRouter']
+
+# 읽기 전용 복제본 alias 목록 (hbnn/settings_replica.py 참고)
+DATABASE_REPLICAS = []
+
+# 쓰기 후 primary 에서 읽는 시간 (초)
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+
+# 'responses' 는 GET 응답 캐시입니다. 여러 워커 프로세스가 무효화를 함께
+# 보려면 FileBasedCache 처럼 프로세스 사이에 공유되는 백엔드를 사용합니다.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hbnn-responses',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
@@ -122,3 +156,113 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.10/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# API
+
+API_PAGE_DEFAULT_LIMIT = 20
+
+API_PAGE_MAX_LIMIT = 100
+
+API_STREAM_CHUNK_SIZE = 500
+
+# /api/users/bulk/ 한 번에 생성할 수 있는 유저 수와 INSERT 한 번의 크기
+USER_BULK_MAX_ITEMS = 5000
+
+USER_BULK_BATCH_SIZE = 500
+
+# /api/profiles/ 한 번에 가져올 수 있는 프로파일 수
+PROFILE_BATCH_MAX_IDS = 100
+
+# GET 응답 캐시와 만료 시간 (초)
+API_RESPONSE_CACHE = 'responses'
+
+API_RESPONSE_CACHE_TIMEOUT = 300
+
+# 503 응답의 Retry-After (초)
+API_RETRY_AFTER = 1
+
+# 유저, 프로파일마다 인코딩해 둔 JSON 조각의 수와 만료 시간 (초)
+# (워커 프로세스마다 따로 가집니다)
+API_FRAGMENT_CACHE_SIZE = 10000
+
+API_FRAGMENT_CACHE_TTL = 3600
+
+# /api/batch/ 한 번에 보낼 수 있는 하위 요청 수와,
+# 하위 요청 전체에 쓸 수 있는 시간 (초)과 쿼리 수
+API_BATCH_MAX_REQUESTS = 20
+
+API_BATCH_MAX_SECONDS = 5
+
+API_BATCH_MAX_QUERIES = 100
+
+
+# Compression
+
+# api.middleware.CompressionMiddleware 가 압축하는 최소 응답 크기 (바이트)
+COMPRESSION_MIN_SIZE = 1024
+
+# gzip 압축 수준 (1-9, brotli 는 같은 값을 quality 로 사용합니다)
+# APIView.compression_level 로 view 마다 바꿀 수 있습니다
+COMPRESSION_LEVEL = 6
+
+
+# Query budget
+
+# DEBUG 일 때 api.middleware.QueryBudgetMiddleware 가 사용하는
+# (요청 하나의 최대 쿼리 수, 같은 모양의 쿼리 최대 반복 수) 기본값
+# APIView.query_budget 으로 메서드마다 바꿀 수 있습니다
+QUERY_BUDGET_DEFAULT = (10, 3)
+
+
+# Metrics
+
+# 워커 프로세스들이 /api/metrics/ 용 메트릭을 쓰는 디렉터리와 주기 (초)
+# None 이면 요청을 받은 프로세스의 값만 응답합니다
+METRICS_DIR = None
+
+METRICS_FLUSH_INTERVAL = 1
+
+
+# Health check
+
+# /api/ready/ 의 검사를 백그라운드에서 다시 실행하는 주기와,
+# 결과가 이보다 오래되면 준비되지 않은 것으로 보는 시간 (초)
+HEALTH_CHECK_INTERVAL = 5
+
+HEALTH_CHECK_STALE_AFTER = HEALTH_CHECK_INTERVAL * 3
+
+# 데이터베이스가 있는 디스크의 최소 여유 공간
+HEALTH_MIN_FREE_DISK_BYTES = 100 * 1024 * 1024
+
+
+# JWT
+
+# JWT 인증시 유저 조회 캐시 (워커 프로세스마다 따로 가집니다)
+JWT_USER_CACHE_SIZE = 1024
+
+JWT_USER_CACHE_TTL = 30
+
+
+# Password hashing
+
+# 비밀번호 해싱 전용 스레드 수와, 실행 중 + 대기 중인 작업의 최대 개수
+PASSWORD_HASHING_WORKERS = os.cpu_count() or 2
+
+# 풀은 워커 프로세스마다 따로 있으므로 이 값도 프로세스 하나의 한도입니다.
+# 프로세스 하나가 동시에 처리하는 요청이 이 값보다 많아야 503 (Retry-After) 이
+# 나가므로, 스레드가 하나인 기본 uWSGI 워커 (Dockerfile) 에서는 이 한도에
+# 닿지 않습니다. --threads 나 ASGI 로 요청을 동시에 받을 때만 의미가 있습니다.
+PASSWORD_HASHING_MAX_PENDING = PASSWORD_HASHING_WORKERS * 4
+
+
+# Matching
+
+# 다른 워커의 변경을 반영하기 위해 취향 인덱스를 다시 만드는 주기 (초)
+MATCH_INDEX_REBUILD_INTERVAL = 300
+
+
+# ASGI
+
+# hbnn/asgi.py 에서 ORM 호출과 동기 view 를 실행하는 스레드 수
+ASYNC_THREADS = 8
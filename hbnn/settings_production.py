@@ -0,0 +1,54 @@
+"""
+Production settings for hbnn project.
+
+    $ DJANGO_SETTINGS_MODULE=hbnn.settings_production uwsgi ...
+
+여러 uWSGI 워커가 하나의 SQLite 파일을 함께 쓰도록 조정합니다.
+"""
+
+from hbnn.settings import *  # noqa: F401,F403
+from hbnn.settings import BASE_DIR, CACHES, DATABASES, os
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get('HBNN_ALLOWED_HOSTS', '*').split(',')
+
+
+# Database
+
+# 요청마다 다시 연결하지 않고 워커가 연결을 유지합니다
+DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# 연결이 만들어질 때 utils.sqlite.apply_pragmas 가 적용합니다
+SQLITE_PRAGMAS = (
+    # 읽기와 쓰기가 서로를 막지 않습니다
+    ('journal_mode', 'WAL'),
+    # WAL 에서는 NORMAL 로도 손상되지 않습니다 (체크포인트 때만 fsync)
+    ('synchronous', 'NORMAL'),
+    # 잠금을 바로 'database is locked' 로 실패시키지 않고 기다립니다 (ms)
+    ('busy_timeout', 5000),
+    # 256MiB 까지 mmap 으로 읽습니다
+    ('mmap_size', 268435456),
+    # 연결마다 64MiB 페이지 캐시 (음수는 KiB)
+    ('cache_size', -65536),
+    ('temp_store', 'MEMORY'),
+)
+
+
+# Cache
+
+# 응답 캐시의 무효화를 모든 워커가 함께 보도록 파일에 둡니다
+CACHES['responses'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(BASE_DIR, '.cache', 'responses'),
+    'OPTIONS': {
+        'MAX_ENTRIES': 10000,
+    },
+}
+
+
+# Metrics
+
+# 모든 uWSGI 워커의 메트릭을 /api/metrics/ 한 번으로 수집합니다
+# (배포할 때 비웁니다)
+METRICS_DIR = os.path.join(BASE_DIR, '.cache', 'metrics')
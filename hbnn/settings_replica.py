@@ -0,0 +1,25 @@
+"""
+Local read-replica settings for hbnn project.
+
+    $ DJANGO_SETTINGS_MODULE=hbnn.settings_replica python manage.py migrate
+    $ DJANGO_SETTINGS_MODULE=hbnn.settings_replica \
+        python manage.py replicate_sqlite --interval 1 &
+    $ DJANGO_SETTINGS_MODULE=hbnn.settings_replica python manage.py runserver
+
+두 개의 SQLite 파일로 primary/복제본 구성을 흉내냅니다.
+replicate_sqlite 명령이 복제를 대신합니다.
+"""
+
+from hbnn.settings import *  # noqa: F401,F403
+from hbnn.settings import BASE_DIR, DATABASES, os
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    'TEST': {
+        # 테스트에서는 default 를 그대로 복제본으로 씁니다
+        'MIRROR': 'default',
+    },
+}
+
+DATABASE_REPLICAS = ['replica']
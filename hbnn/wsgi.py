@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hbnn.settings")
 
 application = get_wsgi_application()
+
+# 요청을 받기 전에 취향 인덱스를 만들어 두고 readiness 검사를 시작합니다
+from user.matching import taste_index  # noqa: E402
+from utils.health import health  # noqa: E402
+taste_index.ensure_built()
+health.start()
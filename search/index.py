@@ -0,0 +1,52 @@
+import typing
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from search.models import SearchPosting
+from search.tokenizer import tokenize
+from user.models import UserProfile
+
+# 필드별 가중치
+FIELD_WEIGHTS = (
+    ('introduction', 2),
+    ('description', 1),
+)
+INDEXED_FIELDS = frozenset(field for field, _ in FIELD_WEIGHTS)
+
+
+def profile_tokens(profile: UserProfile) -> typing.Dict[str, int]:
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token, count in tokenize(getattr(profile, field)).items():
+            weights[token] = weights.get(token, 0) + count * weight
+    return weights
+
+
+def index_profile(profile: UserProfile) -> None:
+    """프로파일 하나의 색인을 새로 씁니다"""
+    postings = [SearchPosting(token=token, profile_id=profile.pk,
+                              weight=weight)
+                for token, weight in profile_tokens(profile).items()]
+    with transaction.atomic():
+        SearchPosting.objects.filter(profile_id=profile.pk).delete()
+        SearchPosting.objects.bulk_create(postings)
+
+
+def search(query: str, offset: int, limit: int) -> typing.List[dict]:
+    """query 의 토큰과 일치하는 프로파일을 순위대로 반환합니다
+
+        일치한 토큰의 수, 가중치의 합 순서로 정렬합니다. 조회하는 행은
+        query 의 토큰이 나타나는 posting 뿐이므로 전체 프로파일 수와
+        관계없습니다.
+
+        :return: [{'profile_id', 'matched', 'score'}, ...]
+    """
+    tokens = list(tokenize(query))
+    if not tokens:
+        return []
+    postings = SearchPosting.objects.filter(token__in=tokens)
+    ranked = postings.values('profile_id').annotate(
+        matched=Count('id'), score=Sum('weight')
+    ).order_by('-matched', '-score', 'profile_id')
+    return list(ranked[offset:offset + limit])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from search.index import index_profile
+from user.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the profile search index from every UserProfile'
+
+    def handle(self, *args, **options):
+        count = 0
+        for profile in UserProfile.objects.iterator():
+            index_profile(profile)
+            count += 1
+        self.stdout.write(f'Indexed {count} profiles')
@@ -0,0 +1,18 @@
+from django.db import models
+
+from user.models import UserProfile
+
+
+class SearchPosting(models.Model):
+    """역색인의 한 항목: token 이 profile 에 weight 만큼 나타납니다
+
+        프로파일이 삭제되면 CASCADE 로 함께 삭제됩니다.
+    """
+    token = models.CharField(max_length=32)
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE,
+                                related_name='+')
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        # (token, profile) 인덱스로 토큰 조회를 합니다
+        unique_together = (('token', 'profile'), )
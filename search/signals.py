@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from search.index import INDEXED_FIELDS, index_profile
+from user.models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+def update_search_index(sender, instance: UserProfile, update_fields=None,
+                        **kwargs):
+    # 색인하는 필드가 바뀌지 않았다면 건너뜁니다
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    index_profile(instance)
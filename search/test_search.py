@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from search.index import search
+from search.models import SearchPosting
+from search.tokenizer import tokenize
+from user.models import User, UserProfile
+
+
+class TokenizerTestCase(TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize('비빔밥'),
+                         {'비빔': 1, '빔밥': 1, '비빔밥': 1})
+        self.assertEqual(tokenize('밥 Python 좋아'),
+                         {'밥': 1, 'python': 1, '좋아': 1})
+        self.assertEqual(tokenize('파스타파스타'),
+                         {'파스': 2, '스타': 2, '타파': 1, '파스타': 2,
+                          '스타파': 1, '타파스': 1})
+        self.assertEqual(tokenize(None), {})
+
+
+class SearchIndexTestCase(TestCase):
+    def create_profile(self, name, introduction, description=''):
+        user = User.objects.create_user(f'{name}@test.com', name)
+        return UserProfile.objects.create(user=user,
+                                          taste=UserProfile.KOREAN,
+                                          introduction=introduction,
+                                          description=description)
+
+    def test_search(self):
+        bibimbap = self.create_profile('a', '비빔밥 좋아해요')
+        both = self.create_profile('b', '냉면', '비빔밥이랑 비빔국수')
+        noodle = self.create_profile('c', '비빔국수 먹어요')
+
+        ranked = [row['profile_id'] for row in search('비빔밥', 0, 10)]
+        self.assertEqual(ranked[:2], [bibimbap.id, both.id])
+        self.assertIn(noodle.id, ranked)
+
+        self.assertEqual(search('비빔밥', 1, 1)[0]['profile_id'], both.id)
+        self.assertEqual(search('  ', 0, 10), [])
+
+    def test_incremental_update(self):
+        profile = self.create_profile('a', '비빔밥')
+
+        profile.introduction = '냉면'
+        profile.save()
+        self.assertEqual(search('비빔밥', 0, 10), [])
+        self.assertEqual(search('냉면', 0, 10)[0]['profile_id'], profile.id)
+
+        profile.delete()
+        self.assertFalse(SearchPosting.objects.exists())
@@ -0,0 +1,33 @@
+import re
+import typing
+import unicodedata
+from collections import Counter
+
+# 한글 음절과 그 외의 단어를 나눕니다
+HANGUL = re.compile(r'[가-힣]+')
+WORD = re.compile(r'[가-힣]+|[^\W가-힣_]+')
+
+MAX_TOKEN_LENGTH = 32
+
+
+def ngrams(text: str, n: int) -> typing.Iterator[str]:
+    return (text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def tokenize(text: typing.Optional[str]) -> Counter:
+    """텍스트를 토큰과 등장 횟수로 나눕니다
+
+        - 한글: 음절 bigram 과 trigram (한 글자 단어는 그대로)
+        - 그 외: 소문자로 바꾼 단어
+    """
+    tokens = Counter()
+    if not text:
+        return tokens
+    text = unicodedata.normalize('NFC', text).lower()
+    for word in WORD.findall(text):
+        if HANGUL.fullmatch(word) and len(word) > 1:
+            tokens.update(ngrams(word, 2))
+            tokens.update(ngrams(word, 3))
+        else:
+            tokens[word[:MAX_TOKEN_LENGTH]] += 1
+    return tokens
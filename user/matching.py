@@ -0,0 +1,147 @@
+import bisect
+import heapq
+import itertools
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.db import connection
+
+from user.models import User, UserProfile
+
+
+class TasteIndex:
+    """음식 취향으로 같이 밥 먹을 사람을 찾기 위한 워커 프로세스 내 인덱스
+
+        (taste, gender) -> 정렬된 user id 목록을 가지고 있어
+        후보 조회는 이분 탐색 한 번과 limit 개의 슬라이스로 끝납니다.
+
+        같은 프로세스의 변경은 시그널로 바로 반영되고, 다른 워커의 변경은
+        MATCH_INDEX_REBUILD_INTERVAL 마다 백그라운드에서 다시 만들어
+        반영합니다.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._members = {}
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.built_at = None
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return str(user_id)
+
+    def build(self, rows: typing.Iterable[tuple]) -> None:
+        """(user_id, taste, gender) 목록으로 인덱스를 새로 만듭니다"""
+        buckets = {}
+        members = {}
+        for user_id, taste, gender in rows:
+            user_id = self._key(user_id)
+            taste, gender = int(taste), int(gender)
+            buckets.setdefault((taste, gender), []).append(user_id)
+            members[user_id] = (taste, gender)
+        for ids in buckets.values():
+            ids.sort()
+        with self._lock:
+            self._buckets = buckets
+            self._members = members
+            self.built_at = time.monotonic()
+
+    def rebuild(self) -> None:
+        rows = UserProfile.objects.values_list('user_id', 'taste',
+                                               'user__gender')
+        self.build(rows.iterator())
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self.rebuild()
+        finally:
+            self._rebuilding = False
+            connection.close()
+
+    def ensure_built(self) -> None:
+        if self.built_at is None:
+            self.rebuild()
+            return
+        interval = settings.MATCH_INDEX_REBUILD_INTERVAL
+        if interval and time.monotonic() - self.built_at > interval:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            # 다시 만드는 동안에는 기존 인덱스로 응답합니다
+            threading.Thread(target=self._rebuild_in_background,
+                             daemon=True).start()
+
+    def add(self, user_id, taste: int, gender: int) -> None:
+        if self.built_at is None:
+            return
+        user_id = self._key(user_id)
+        with self._lock:
+            self._discard(user_id)
+            taste, gender = int(taste), int(gender)
+            bisect.insort(self._buckets.setdefault((taste, gender), []),
+                          user_id)
+            self._members[user_id] = (taste, gender)
+
+    def add_profile(self, profile: UserProfile) -> None:
+        if self.built_at is None:
+            return
+        # 이미 인덱스에 있는 유저라면 성별을 다시 조회하지 않습니다
+        member = self._members.get(self._key(profile.user_id))
+        gender = member[1] if member is not None else profile.user.gender
+        self.add(profile.user_id, profile.taste, gender)
+
+    def remove(self, user_id) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._discard(self._key(user_id))
+
+    def update_gender(self, user_id, gender: int) -> None:
+        member = self._members.get(self._key(user_id))
+        if member is not None and member[1] != int(gender):
+            self.add(user_id, member[0], gender)
+
+    def _discard(self, user_id: str) -> None:
+        member = self._members.pop(user_id, None)
+        if member is None:
+            return
+        ids = self._buckets[member]
+        i = bisect.bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            del ids[i]
+
+    def candidates(self, taste: int, gender: typing.Optional[int] = None,
+                   after: typing.Optional[str] = None, limit: int = 20,
+                   exclude: typing.Optional[str] = None) -> typing.List[str]:
+        """taste (와 gender) 가 같은 유저의 id 를 id 순서로 limit 개 반환합니다
+
+            :param after: 이전 페이지의 마지막 id
+            :param exclude: 결과에서 뺄 id (요청한 본인)
+        """
+        genders = (gender, ) if gender is not None else \
+            tuple(g for g, _ in User.GENDER_CHOICES)
+        after = self._key(after) if after is not None else ''
+        exclude = self._key(exclude) if exclude is not None else None
+
+        with self._lock:
+            slices = []
+            for g in genders:
+                ids = self._buckets.get((taste, g), ())
+                start = bisect.bisect_right(ids, after)
+                # 본인이 섞여 있을 수 있으므로 하나 더 가져옵니다
+                slices.append(ids[start:start + limit + 1])
+
+        merged = heapq.merge(*slices)
+        if exclude is not None:
+            merged = (user_id for user_id in merged if user_id != exclude)
+        return list(itertools.islice(merged, limit))
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+taste_index = TasteIndex()
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:57
+
+from django.db import migrations, models
+import utils.uuids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_userprofile'),
+    ]
+
+    operations = [
+        # default 는 파이썬에서만 쓰이므로 테이블을 다시 만들지 않습니다
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='user',
+                    name='id',
+                    field=models.UUIDField(default=utils.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['taste', 'modified_at'], name='profile_taste_modified_idx'),
+        ),
+    ]
@@ -1,16 +1,21 @@
-import uuid
-
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
+from utils.uuids import uuid7
+
 
 class UserManager(BaseUserManager):
-    def create_user(self, email: str, username: str, password: str=None):
+    def create_user(self, email: str, username: str, password: str=None,
+                    password_hash: str=None):
+        """password_hash 를 주면 이미 해싱된 값을 그대로 저장합니다"""
         user = self.model(
             email=self.normalize_email(email),
             username=username
         )
-        user.set_password(password)
+        if password_hash is None:
+            user.set_password(password)
+        else:
+            user.password = password_hash
         user.save(using=self._db)
         return user
 
@@ -26,7 +31,7 @@ class User(AbstractBaseUser):
 
     objects = UserManager()
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
 
     email = models.EmailField(max_length=255, unique=True)
     username = models.CharField(max_length=60, unique=True)
@@ -41,6 +46,13 @@ class User(AbstractBaseUser):
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        indexes = [
+            # 커서 페이지네이션의 정렬 순서
+            models.Index(fields=['created_at', 'id'],
+                         name='user_created_id_idx'),
+        ]
+
 
 class UserProfile(models.Model):
     KOREAN = 1
@@ -66,3 +78,9 @@ class UserProfile(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['taste', 'modified_at'],
+                         name='profile_taste_modified_idx'),
+        ]
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.matching import taste_index
+from user.models import User, UserProfile
+from utils import response_cache
+from utils.auth import JWTManager
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_jwt_user_cache(sender, instance: User, **kwargs):
+    JWTManager.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_taste_index_gender(sender, instance: User, **kwargs):
+    taste_index.update_gender(instance.pk, instance.gender)
+
+
+@receiver(post_save, sender=UserProfile)
+def add_to_taste_index(sender, instance: UserProfile, **kwargs):
+    taste_index.add_profile(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_from_taste_index(sender, instance: UserProfile, **kwargs):
+    taste_index.remove(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_response_cache(sender, instance: User, **kwargs):
+    response_cache.bump(f'user:{instance.pk}', 'users')
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_userprofile_response_cache(sender, instance: UserProfile, **kwargs):
+    response_cache.bump(f'profile:{instance.user_id}')
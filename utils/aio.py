@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+# run_sync 가 스레드 풀에서 설치할 execute_wrapper 목록
+_execute_wrappers = contextvars.ContextVar('hbnn_aio_execute_wrappers',
+                                           default=())
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """ASGI 에서 ORM 호출과 동기 view 를 실행하는 스레드 풀
+
+        스레드 수는 ASYNC_THREADS 이며 처음 사용할 때 만들어지므로
+        fork 한 뒤의 프로세스마다 따로 생깁니다.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_THREADS,
+                thread_name_prefix='hbnn-async')
+        return _executor
+
+
+def _call(func, args, kwargs):
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for wrapper in _execute_wrappers.get():
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+            return func(*args, **kwargs)
+    finally:
+        # 요청 스레드가 아니므로 request_finished 가 오지 않습니다
+        close_old_connections()
+
+
+async def run_sync(func: typing.Callable, *args, **kwargs):
+    """ORM 처럼 블로킹되는 호출을 get_executor() 의 스레드에서 실행합니다
+
+        use_replica 같은 contextvars 는 실행하는 스레드로 전달됩니다.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _call, func, args, kwargs)
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), call)
+
+
+@contextmanager
+def execute_wrapper(wrapper: typing.Callable):
+    """이 블록에서 호출한 run_sync 가 스레드 풀에서 실행하는 쿼리에
+        connection.execute_wrapper 를 설치합니다
+
+        이벤트 루프 스레드의 연결은 여러 요청이 함께 쓰므로 건드리지 않습니다.
+    """
+    token = _execute_wrappers.set((*_execute_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        _execute_wrappers.reset(token)
@@ -0,0 +1,409 @@
+"""
+    ASGI
+    ~~~~
+
+    Django 2.2 에는 ASGI 핸들러가 없으므로 (3.0 부터) 직접 구현합니다.
+
+    - async 핸들러 (async_post 등) 를 가진 APIView 로 가는 요청은
+      이벤트 루프에서 await 합니다.
+      async_capable = True 인 미들웨어는 그대로, MiddlewareMixin 미들웨어는
+      훅을 run_sync 로 실행하여 WSGI 와 같은 미들웨어를 거칩니다.
+      둘 다 아닌 미들웨어가 있으면 스레드 풀의 동기 체인에서 WSGI 처럼
+      동기 핸들러를 실행합니다.
+    - 그 밖의 요청은 utils.aio 의 스레드 풀에서 WSGI 와 같은 미들웨어
+      체인으로 처리합니다.
+
+    asgiref 나 ASGI 서버에 의존하지 않습니다. ASGIServer 는 서버가
+    설치되지 않은 환경에서 부하 테스트를 위한 최소한의 HTTP/1.1 서버입니다.
+"""
+
+import asyncio
+import functools
+import io
+import sys
+import threading
+import typing
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers import base
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest, get_script_name
+from django.http import HttpResponse
+from django.urls import Resolver404, get_resolver, set_script_prefix, \
+    set_urlconf
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from utils.aio import get_executor, run_sync
+
+
+class ASGIRequest(WSGIRequest):
+    is_asgi = True
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """ASGI http scope 를 WSGI environ 으로 바꿉니다"""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI 는 바이트를 latin-1 로 디코딩한 문자열을 사용합니다
+        'SCRIPT_NAME': script_name.encode('utf8').decode('latin1'),
+        'PATH_INFO': path.encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = \
+            client[0], str(client[1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
+
+
+def response_headers(response: HttpResponse) -> typing.List[tuple]:
+    headers = [(name.encode('latin1'), str(value).encode('latin1'))
+               for name, value in response.items()]
+    for cookie in response.cookies.values():
+        headers.append((b'Set-Cookie',
+                        cookie.output(header='').strip().encode('latin1')))
+    return headers
+
+
+class MiddlewareMixinAdapter:
+    """MiddlewareMixin 미들웨어를 async 체인에서 사용합니다
+
+        process_request, process_response 는 세션 저장처럼 DB 를 쓸 수
+        있으므로 run_sync 로 이벤트 루프 밖에서 실행합니다.
+        process_view, process_exception 은 ASGIHandler 가 실행합니다.
+    """
+
+    def __init__(self, middleware_class, get_response):
+        self.middleware = middleware_class()
+        self.get_response = get_response
+
+    async def __call__(self, request) -> HttpResponse:
+        response = None
+        if hasattr(self.middleware, 'process_request'):
+            response = await run_sync(self.middleware.process_request,
+                                      request)
+        if response is None:
+            response = await self.get_response(request)
+        if hasattr(self.middleware, 'process_response'):
+            response = await run_sync(self.middleware.process_response,
+                                      request, response)
+        return response
+
+
+class ASGIHandler(base.BaseHandler):
+    """ASGI 3 애플리케이션"""
+    request_class = ASGIRequest
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+        self.load_async_middleware()
+
+    def load_async_middleware(self) -> None:
+        """async 핸들러 앞의 미들웨어 체인을 만듭니다
+
+            async_capable 도 MiddlewareMixin 도 아닌 미들웨어가 있으면
+            None 이며, 모든 요청을 동기 체인으로 보냅니다.
+        """
+        handler = self._get_response_async
+        for path in reversed(settings.MIDDLEWARE):
+            middleware = import_string(path)
+            if getattr(middleware, 'async_capable', False):
+                factory = middleware
+            elif issubclass(middleware, MiddlewareMixin):
+                factory = functools.partial(MiddlewareMixinAdapter,
+                                            middleware)
+            else:
+                self._async_middleware_chain = None
+                return
+            try:
+                instance = factory(handler)
+            except MiddlewareNotUsed:
+                continue
+            handler = self._adapt(instance)
+        self._async_middleware_chain = handler
+
+    @staticmethod
+    def _adapt(instance):
+        # WSGI 의 convert_exception_to_response 처럼 미들웨어마다 예외를
+        # 응답으로 바꾸며, 다음 미들웨어가 coroutine 함수를 받도록 감쌉니다
+        async def call(request):
+            try:
+                return await instance(request)
+            except Exception as e:
+                return response_for_exception(request, e)
+        return call
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope: {scope["type"]}')
+
+    @staticmethod
+    async def lifespan(receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive) -> typing.Optional[bytes]:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def async_view(self, request) -> bool:
+        """async 핸들러를 가진 APIView 로 가는 요청인지"""
+        from api.views import APIView
+        try:
+            match = get_resolver().resolve(request.path_info)
+        except Resolver404:
+            return False
+        view_class = getattr(match.func, 'view_class', None)
+        return view_class is not None and \
+            issubclass(view_class, APIView) and \
+            view_class.is_async(request.method)
+
+    async def handle_http(self, scope: dict, receive, send) -> None:
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = build_environ(scope, body)
+        request = self.request_class(environ)
+        if self._async_middleware_chain is not None and \
+                self.async_view(request):
+            response = await self.get_response_async(environ, request)
+        else:
+            # 동기 체인에서는 WSGI 처럼 스레드에서 동기 핸들러를 실행합니다
+            request.is_asgi = False
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                get_executor(), self.get_response_sync, environ, request)
+        await self.send_response(response, send)
+
+    def get_response_sync(self, environ: dict, request) -> HttpResponse:
+        """WSGIHandler 와 같이 스레드에서 미들웨어 체인을 실행합니다"""
+        set_script_prefix(get_script_name(environ))
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        response = self.get_response(request)
+        if not response.streaming:
+            # request_finished 로 이 스레드의 연결을 정리합니다
+            response.content
+            response.close()
+        return response
+
+    async def get_response_async(self, environ: dict,
+                                 request) -> HttpResponse:
+        set_script_prefix(get_script_name(environ))
+        set_urlconf(settings.ROOT_URLCONF)
+        # request_finished 는 send_response 의 response.close() 가 보냅니다
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        response = await self._async_middleware_chain(request)
+        response._closable_objects.append(request)
+        return response
+
+    async def _get_response_async(self, request) -> HttpResponse:
+        match = get_resolver().resolve(request.path_info)
+        request.resolver_match = match
+        for middleware_method in self._view_middleware:
+            response = await run_sync(middleware_method, request, match.func,
+                                      match.args, match.kwargs)
+            if response is not None:
+                return response
+        try:
+            response = await match.func(request, *match.args,
+                                        **match.kwargs)
+        except Exception as e:
+            response = await run_sync(self.exception_middleware_response,
+                                      request, e)
+            if response is None:
+                raise
+        if response is None:
+            raise ValueError(f'The view {match.func.__name__} didn\'t '
+                             'return an HttpResponse object.')
+        return response
+
+    def exception_middleware_response(self, request, exception):
+        """process_exception 이 만든 응답 (없으면 None)"""
+        for middleware_method in self._exception_middleware:
+            response = middleware_method(request, exception)
+            if response:
+                return response
+        return None
+
+    @staticmethod
+    async def send_response(response: HttpResponse, send) -> None:
+        streaming = response.streaming
+        if not streaming and not response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers(response),
+        })
+        if not streaming:
+            await send({'type': 'http.response.body',
+                        'body': response.content})
+            response.close()
+            return
+
+        # 스트리밍 본문은 DB 를 읽으므로 스레드에서 꺼냅니다
+        loop = asyncio.get_running_loop()
+
+        def produce():
+            try:
+                for chunk in response:
+                    asyncio.run_coroutine_threadsafe(send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    }), loop).result()
+            finally:
+                response.close()
+
+        await loop.run_in_executor(get_executor(), produce)
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class ASGIServer:
+    """부하 테스트용 최소한의 HTTP/1.1 ASGI 서버
+
+        요청마다 연결을 닫으며 (Connection: close) 파이프라이닝,
+        chunked 요청, TLS 를 지원하지 않습니다. 배포에는 uvicorn 같은
+        ASGI 서버를 사용합니다.
+    """
+
+    def __init__(self, application, host: str = '127.0.0.1', port: int = 0):
+        self.application = application
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self) -> typing.Tuple[str, int]:
+        self._thread = threading.Thread(target=asyncio.run,
+                                        args=(self._serve(), ), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.host, self.port
+
+    def shutdown(self) -> None:
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join()
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port, backlog=1024)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            method, target, version = \
+                head.decode('latin1').split('\r\n', 1)[0].split(' ', 2)
+            headers = []
+            for line in head.decode('latin1').split('\r\n')[1:]:
+                if line:
+                    name, _, value = line.partition(':')
+                    headers.append((name.strip().lower().encode('latin1'),
+                                    value.strip().encode('latin1')))
+            length = int(dict(headers).get(b'content-length', b'0'))
+            body = await reader.readexactly(length)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ValueError):
+            writer.close()
+            return
+
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': version.partition('/')[2],
+            'method': method,
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode('latin1'),
+            'query_string': query.encode('latin1'),
+            'root_path': '',
+            'headers': headers,
+            'client': writer.get_extra_info('peername')[:2],
+            'server': (self.host, self.port),
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                try:
+                    reason = HTTPStatus(status).phrase
+                except ValueError:
+                    reason = ''
+                lines = [f'HTTP/1.1 {status} {reason}'.encode('latin1')]
+                lines.extend(name + b': ' + value
+                             for name, value in message.get('headers', ()))
+                lines.append(b'Connection: close')
+                writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+            elif message['type'] == 'http.response.body':
+                writer.write(message.get('body', b''))
+                await writer.drain()
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            writer.close()
@@ -1,15 +1,24 @@
 import typing
+import uuid
 from datetime import datetime, timedelta
 
 import jwt
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from jwt import DecodeError
+from django.utils.functional import SimpleLazyObject, empty
+from jwt import InvalidTokenError
 
 from user.models import User
+from utils.cache import TTLLRUCache
 
 
 class JWTManager:
+    # 토큰의 user_id -> User 행 (다른 워커의 변경은 TTL 동안 늦게 반영됩니다)
+    user_cache = TTLLRUCache(maxsize=settings.JWT_USER_CACHE_SIZE,
+                             ttl=settings.JWT_USER_CACHE_TTL,
+                             name='jwt_user')
+    user_attnames = tuple(f.attname for f in User._meta.concrete_fields)
+
     @staticmethod
     def encode(user_id: str) -> str:
         """
@@ -28,15 +37,16 @@ class JWTManager:
         return token.decode('utf8')
 
     @staticmethod
-    def decode(token: str) -> typing.Optional[User]:
-        """
-        :return: User.id
+    def decode_claims(token: str) -> typing.Optional[dict]:
+        """DB 를 거치지 않고 토큰의 서명과 클레임만 검증합니다
+
+        :return: 검증된 payload (user_id 는 uuid.UUID)
         """
         seconds_of_a_day = int(timedelta(days=1).total_seconds())
         try:
-            data = jwt.decode(jwt=token, key=settings.SECRET_KEY, verify=False,
-                              algorithm='HS256')
-        except DecodeError:
+            data = jwt.decode(jwt=token, key=settings.SECRET_KEY,
+                              algorithms=['HS256'])
+        except InvalidTokenError:
             return None
         # 키 체크
         for k in ('utcnow', 'a_day_ago', 'user_id'):
@@ -45,8 +55,100 @@ class JWTManager:
         # 유효성 체크
         if seconds_of_a_day != data['utcnow'] - data['a_day_ago']:
             return None
+        try:
+            data['user_id'] = uuid.UUID(str(data['user_id']))
+        except ValueError:
+            return None
+        return data
 
+    @classmethod
+    def decode(cls, token: str) -> typing.Optional[User]:
+        """
+        :return: User
+        """
+        data = cls.decode_claims(token)
+        if data is None:
+            return None
+        return cls.get_user(data['user_id'])
+
+    @classmethod
+    def decode_lazy(cls, token: str) -> typing.Optional['LazyUser']:
+        """
+        :return: .id 외의 속성을 처음 읽을 때 조회되는 LazyUser
+        """
+        data = cls.decode_claims(token)
+        if data is None:
+            return None
+        return LazyUser(data['user_id'])
+
+    @classmethod
+    def get_user(cls, user_id: typing.Union[str, uuid.UUID]
+                 ) -> typing.Optional[User]:
+        """user_cache 를 거쳐 유저를 가져옵니다
+
+            호출할 때마다 새 인스턴스를 만들어 반환하므로
+            호출한 쪽에서 값을 바꾸어도 캐시는 영향을 받지 않습니다.
+        """
         try:
-            return User.objects.get(id=data['user_id'])
-        except ObjectDoesNotExist:
+            user_id = uuid.UUID(str(user_id))
+        except ValueError:
             return None
+
+        cached = cls.user_cache.get(user_id)
+        if cached is None:
+            try:
+                user = User.objects.get(id=user_id)
+            except ObjectDoesNotExist:
+                return None
+            cls.cache_user(user)
+            return user
+        db, values = cached
+        return User.from_db(db, cls.user_attnames, values)
+
+    @classmethod
+    def cache_user(cls, user: User) -> None:
+        """이미 읽은 유저 (로그인) 를 user_cache 에 넣습니다"""
+        values = tuple(getattr(user, a) for a in cls.user_attnames)
+        cls.user_cache.set(user.pk, (user._state.db, values))
+
+    @classmethod
+    def invalidate_user(cls, user_id: uuid.UUID) -> None:
+        cls.user_cache.delete(user_id)
+
+
+class TokenUserDoesNotExist(User.DoesNotExist):
+    """토큰의 유저가 지워졌습니다 (jwt_login_required 가 401 로 바꿉니다)"""
+
+
+class LazyUser(SimpleLazyObject):
+    """토큰의 user_id 만으로 만든 User 대리 객체
+
+        .id 와 .pk 는 토큰의 클레임에서 바로 읽고,
+        다른 속성에 처음 접근할 때 JWTManager.get_user 로 행을 가져옵니다.
+        행이 없으면 TokenUserDoesNotExist 를 일으킵니다.
+    """
+
+    def __init__(self, user_id: uuid.UUID):
+        def get_user():
+            user = JWTManager.get_user(user_id)
+            if user is None:
+                raise TokenUserDoesNotExist('User does not exist')
+            return user
+
+        self.__dict__['_user_id'] = user_id
+        super().__init__(get_user)
+
+    @property
+    def id(self) -> uuid.UUID:
+        return self.__dict__['_user_id']
+
+    pk = id
+
+    def exists(self) -> bool:
+        """id 만 쓰는 핸들러가 지워진 유저를 거절할 때 사용합니다"""
+        if self._wrapped is empty:
+            try:
+                self._setup()
+            except TokenUserDoesNotExist:
+                return False
+        return True
@@ -0,0 +1,96 @@
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from utils.metrics import registry
+
+cache_hits = registry.counter(
+    'hbnn_cache_hits_total',
+    'In-process cache hits by cache.',
+    labelnames=('cache', ))
+cache_misses = registry.counter(
+    'hbnn_cache_misses_total',
+    'In-process cache misses (including expired entries) by cache.',
+    labelnames=('cache', ))
+cache_evictions = registry.counter(
+    'hbnn_cache_evictions_total',
+    'Entries dropped from an in-process cache to stay within maxsize.',
+    labelnames=('cache', ))
+cache_entries = registry.gauge(
+    'hbnn_cache_entries',
+    'Entries currently held by an in-process cache.',
+    labelnames=('cache', ))
+
+
+class TTLLRUCache:
+    """크기 제한(LRU)과 만료 시간(TTL)을 함께 가지는 프로세스 내 캐시
+
+        maxsize 를 넘으면 가장 오래 쓰이지 않은 항목부터 버리고,
+        ttl 초가 지난 항목은 조회 시점에 버립니다.
+        name 을 주면 stats() 를 utils.metrics.registry 로 내보냅니다.
+    """
+    _missing = object()
+
+    def __init__(self, maxsize: int, ttl: float,
+                 timer: typing.Callable[[], float] = time.monotonic,
+                 name: typing.Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if name is not None:
+            self.export(name)
+
+    def export(self, name: str) -> None:
+        cache_hits.set_function(lambda: self.hits, cache=name)
+        cache_misses.set_function(lambda: self.misses, cache=name)
+        cache_evictions.set_function(lambda: self.evictions, cache=name)
+        cache_entries.set_function(lambda: len(self._data), cache=name)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is not self._missing:
+                expires_at, value = item
+                if expires_at > self.timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self.timer() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,81 @@
+import typing
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    # 선택 의존성입니다 (requirements/prod.txt). 없으면 gzip 만 사용합니다
+    brotli = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def available_encodings() -> typing.Tuple[str, ...]:
+    """서버가 선호하는 순서의 사용 가능한 인코딩"""
+    return (BROTLI, GZIP) if brotli is not None else (GZIP, )
+
+
+def parse_accept_encoding(header: str) -> typing.Dict[str, float]:
+    """'gzip;q=0.8, br' -> {'gzip': 0.8, 'br': 1.0}"""
+    accepted = {}
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        q = 1.
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.
+        accepted[name.lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> typing.Optional[str]:
+    """Accept-Encoding 에서 q 가 가장 큰 (같으면 서버가 선호하는) 인코딩
+
+        받아들일 수 있는 인코딩이 없으면 None 입니다.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.
+    for encoding in available_encodings():
+        q = accepted.get(encoding, accepted.get('*', 0.))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Compressor:
+    """조각 단위로 압축하는 스트리밍 압축기
+
+        level 은 gzip 의 압축 수준 (1-9) 이며 brotli 에서는 quality 로
+        그대로 사용합니다.
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._compressor = brotli.Compressor(quality=level)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.finish
+        else:
+            # wbits 에 16 을 더하면 gzip 헤더와 트레일러를 씁니다
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED,
+                                                16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def flush(self) -> bytes:
+        return self._flush()
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,138 @@
+import json
+import re
+import typing
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+from utils.cache import TTLLRUCache
+from utils.metrics import registry
+from utils.serializers import FieldSerializer
+
+fragment_lookups = registry.counter(
+    'hbnn_fragment_cache_lookups_total',
+    'Pre-encoded JSON fragment lookups by model and result.',
+    labelnames=('model', 'result'))
+
+
+class Fragment(bytes):
+    """이미 JSON 으로 인코딩된 값
+
+        APIView.response 는 다시 인코딩하지 않고 그대로 이어 붙입니다.
+    """
+    __slots__ = ()
+
+
+class FragmentEncoder(DjangoJSONEncoder):
+    """Fragment 를 응답에 그대로 이어 붙이는 인코더
+
+        bytes 는 json 의 C 인코더가 모르는 타입이므로 default() 가 불리며,
+        여기서 응답마다 다른 자리표시 문자열을 돌려주고 인코딩이 끝난 뒤
+        자리표시를 Fragment 로 바꿉니다. Fragment 가 없는 응답은
+        json.dumps 와 같은 비용입니다.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = []
+        self.marker = None
+
+    def default(self, o):
+        if isinstance(o, Fragment):
+            if self.marker is None:
+                self.marker = f'\x00{uuid.uuid4().hex}:'
+            self.fragments.append(o)
+            return f'{self.marker}{len(self.fragments) - 1}'
+        return super().default(o)
+
+    def encode(self, o) -> str:
+        text = super().encode(o)
+        if not self.fragments:
+            return text
+        # 자리표시는 인코딩된 문자열 "\u0000<nonce>:<번호>" 로 나타납니다
+        marker = re.escape(json.dumps(self.marker)[1:-1])
+        fragments = self.fragments
+        return re.sub(f'"{marker}(\\d+)"',
+                      lambda m: fragments[int(m.group(1))].decode('utf8'),
+                      text)
+
+
+class FragmentCache:
+    """객체마다 FieldSerializer 의 결과를 JSON 으로 인코딩해 둡니다
+
+        키가 (pk, modified_at) 이므로 저장할 때마다 새 키가 되어
+        무효화하지 않아도 오래된 조각을 쓰지 않으며, 이전 조각은 LRU 로
+        밀려납니다. modified_at 을 바꾸지 않는 .update() 에 대비하여
+        API_FRAGMENT_CACHE_TTL 이 지나면 다시 인코딩합니다.
+
+        워커 프로세스마다 따로 가집니다.
+    """
+
+    def __init__(self, serializer: FieldSerializer,
+                 maxsize: typing.Optional[int] = None,
+                 ttl: typing.Optional[float] = None):
+        self.serializer = serializer
+        self.model_name = serializer.model._meta.model_name
+        self.cache = TTLLRUCache(
+            maxsize=maxsize if maxsize is not None
+            else settings.API_FRAGMENT_CACHE_SIZE,
+            ttl=ttl if ttl is not None else settings.API_FRAGMENT_CACHE_TTL,
+            name=f'fragment_{self.model_name}')
+        self.encoder = DjangoJSONEncoder()
+        self.values_fields = serializer.values_fields
+        if 'modified_at' not in self.values_fields:
+            self.values_fields += ('modified_at', )
+
+    def _encode(self, key: tuple, data: dict) -> Fragment:
+        fragment = Fragment(self.encoder.encode(data).encode('utf8'))
+        self.cache.set(key, fragment)
+        return fragment
+
+    def _get(self, key: tuple, build: typing.Callable[[], dict]) -> Fragment:
+        fragment = self.cache.get(key)
+        if fragment is None:
+            fragment_lookups.inc(model=self.model_name, result='miss')
+            return self._encode(key, build())
+        fragment_lookups.inc(model=self.model_name, result='hit')
+        return fragment
+
+    def from_values(self, row: dict) -> Fragment:
+        """.values() 의 행 (modified_at 포함) 의 조각"""
+        key = (row[self.serializer.pk_attname], row['modified_at'])
+        return self._get(key, lambda: self.serializer.from_values(row))
+
+    def from_object(self, obj) -> Fragment:
+        return self._get((obj.pk, obj.modified_at),
+                         lambda: self.serializer.from_object(obj))
+
+    def fragments(self, keys: typing.Sequence[tuple],
+                  queryset: QuerySet) -> 'OrderedDict[typing.Any, Fragment]':
+        """[(pk, modified_at), ...] 의 조각을 keys 순서로 돌려줍니다
+
+            캐시에 없는 행만 queryset 에서 한 번의 쿼리로 읽습니다.
+            그 사이 지워진 행은 빠집니다.
+        """
+        found, missing = {}, []
+        for key in keys:
+            fragment = self.cache.get(key)
+            if fragment is None:
+                missing.append(key[0])
+            else:
+                found[key[0]] = fragment
+        hits = len(found)
+        if hits:
+            fragment_lookups.inc(hits, model=self.model_name, result='hit')
+
+        if missing:
+            rows = queryset.filter(pk__in=missing).values(*self.values_fields)
+            for row in rows:
+                pk = row[self.serializer.pk_attname]
+                found[pk] = self._encode((pk, row['modified_at']),
+                                         self.serializer.from_values(row))
+            fragment_lookups.inc(len(missing), model=self.model_name,
+                                 result='miss')
+
+        return OrderedDict((pk, found[pk]) for pk, _ in keys if pk in found)
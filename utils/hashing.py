@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+import typing
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from utils.metrics import registry
+
+hash_seconds = registry.histogram(
+    'hbnn_password_hash_seconds',
+    'Time spent hashing passwords in the hashing pool.',
+    labelnames=('operation', ))
+queue_seconds = registry.histogram(
+    'hbnn_password_hash_queue_seconds',
+    'Time password hashing jobs waited for a free worker.',
+    labelnames=('operation', ))
+rejected_total = registry.counter(
+    'hbnn_password_hash_rejected_total',
+    'Password hashing jobs rejected because the queue was full.',
+    labelnames=('operation', ))
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class HashingPool:
+    """비밀번호 해싱(PBKDF2)을 전담하는 크기 제한 스레드 풀
+
+        hashlib 의 PBKDF2 는 GIL 을 풀어 주므로 스레드로도 여러 코어를
+        사용합니다. 실행 중이거나 대기 중인 작업이 max_pending 개를 넘으면
+        쌓아 두지 않고 HashingPoolFull 을 발생시킵니다.
+
+        스레드는 처음 작업이 들어올 때 만들어지므로 uWSGI 가 fork 한
+        뒤의 워커 프로세스마다 따로 생깁니다.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='hbnn-hashing')
+        return self._executor
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def submit(self, operation: str, func: typing.Callable,
+               *args, **kwargs) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                rejected_total.inc(operation=operation)
+                raise HashingPoolFull(operation)
+            self.pending += 1
+            executor = self._get_executor()
+
+        enqueued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            queue_seconds.observe(started_at - enqueued_at,
+                                  operation=operation)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hash_seconds.observe(time.perf_counter() - started_at,
+                                     operation=operation)
+
+        try:
+            future = executor.submit(job)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, operation: str, func: typing.Callable, *args, **kwargs):
+        """작업을 풀에 넣고 결과를 기다립니다"""
+        return self.submit(operation, func, *args, **kwargs).result()
+
+    async def run_async(self, operation: str, func: typing.Callable,
+                        *args, **kwargs):
+        """run 과 같지만 기다리는 동안 이벤트 루프를 막지 않습니다"""
+        future = self.submit(operation, func, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    def map(self, operation: str, func: typing.Callable,
+            iterable: typing.Iterable) -> typing.List:
+        """여러 작업을 워커 수만큼씩 나누어 병렬로 실행합니다
+
+            한 번에 최대 workers 개만 넣으므로 대량 작업이 로그인 같은
+            다른 요청의 자리를 모두 차지하지 않습니다. 자리가 없으면
+            먼저 넣은 작업이 끝나기를 기다리고, 기다릴 작업도 없으면
+            HashingPoolFull 을 발생시킵니다.
+        """
+        results = []
+        window = deque()
+        for item in iterable:
+            while True:
+                if len(window) >= self.workers:
+                    results.append(window.popleft().result())
+                try:
+                    window.append(self.submit(operation, func, item))
+                    break
+                except HashingPoolFull:
+                    if not window:
+                        raise
+                    results.append(window.popleft().result())
+        results.extend(future.result() for future in window)
+        return results
+
+
+hashing_pool = HashingPool(workers=settings.PASSWORD_HASHING_WORKERS,
+                           max_pending=settings.PASSWORD_HASHING_MAX_PENDING)
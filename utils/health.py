@@ -0,0 +1,126 @@
+import os
+import shutil
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+def check_database() -> str:
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        assert cursor.fetchone()[0] == 1
+    return 'ok'
+
+
+def check_migrations() -> str:
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migrations')
+    return 'ok'
+
+
+def check_disk() -> str:
+    name = str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+    directory = os.path.dirname(os.path.abspath(name))
+    if not os.path.isdir(directory):
+        # 메모리 데이터베이스
+        directory = settings.BASE_DIR
+    free = shutil.disk_usage(directory).free
+    if free < settings.HEALTH_MIN_FREE_DISK_BYTES:
+        raise RuntimeError(f'{free} bytes free')
+    return f'{free} bytes free'
+
+
+class HealthChecker:
+    """readiness 검사를 백그라운드에서 주기적으로 실행하고 결과를 보관합니다
+
+        프로브는 보관된 결과와 그 나이(age)만 읽으므로 프로브가 아무리
+        자주 와도 데이터베이스에는 interval 마다 한 번씩만 검사가 갑니다.
+        결과가 stale_after 초보다 오래되면 (갱신 스레드가 멈췄다면)
+        준비되지 않은 것으로 봅니다.
+
+        fork 된 프로세스에는 스레드가 따라오지 않으므로 조회할 때
+        프로세스가 바뀌었으면 스레드를 새로 시작합니다.
+    """
+
+    def __init__(self, checks: typing.Dict[str, typing.Callable[[], str]],
+                 interval: float, stale_after: float):
+        self.checks = OrderedDict(checks)
+        self.interval = interval
+        self.stale_after = stale_after
+        self.results = None
+        self.checked_at = None
+        self._checked_at_monotonic = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        results = OrderedDict()
+        for name, check in self.checks.items():
+            try:
+                results[name] = {'ok': True, 'message': check()}
+            except Exception as e:
+                results[name] = {'ok': False,
+                                 'message': f'{type(e).__name__}: {e}'}
+        with self._lock:
+            self.results = results
+            self.checked_at = time.time()
+            self._checked_at_monotonic = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            finally:
+                # 이 스레드의 연결은 다음 검사까지 쓰지 않습니다
+                connections.close_all()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> None:
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name='hbnn-health')
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> typing.Tuple[bool, dict]:
+        """(준비 여부, {'checks', 'checked_at', 'age'}) 를 반환합니다"""
+        self.start()
+        with self._lock:
+            results = self.results
+            checked_at = self.checked_at
+            checked = self._checked_at_monotonic
+        if results is None:
+            return False, {'checks': None, 'checked_at': None, 'age': None}
+
+        age = time.monotonic() - checked
+        ok = age <= self.stale_after and \
+            all(result['ok'] for result in results.values())
+        return ok, {'checks': results, 'checked_at': checked_at,
+                    'age': round(age, 3)}
+
+
+health = HealthChecker(
+    checks={
+        'database': check_database,
+        'migrations': check_migrations,
+        'disk': check_disk,
+    },
+    interval=settings.HEALTH_CHECK_INTERVAL,
+    stale_after=settings.HEALTH_CHECK_STALE_AFTER)
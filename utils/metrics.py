@@ -0,0 +1,295 @@
+import bisect
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import typing
+import uuid
+from collections import OrderedDict
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.,
+                   2.5, 5., 10.)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._functions = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._functions.clear()
+
+    def set_function(self, function: typing.Callable[[], float],
+                     **labels) -> None:
+        """값을 저장하지 않고 snapshot 할 때마다 function() 으로 읽습니다"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[list(key), self._copy(value)]
+                       for key, value in self._values.items()]
+            functions = list(self._functions.items())
+        samples += [[list(key), function()] for key, function in functions]
+        return {'type': self.type, 'help': self.documentation,
+                'labelnames': list(self.labelnames), 'samples': samples}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        function = self._functions.get(key)
+        if function is not None:
+            return function()
+        return self._values.get(key, 0)
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: typing.Sequence[str] = (),
+                 buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.))
+            # 마지막 칸은 +Inf
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ((), 0.))
+        return sum(counts)
+
+    @staticmethod
+    def _copy(value):
+        counts, total = value
+        return [list(counts), total]
+
+    def snapshot(self) -> dict:
+        snapshot = super().snapshot()
+        snapshot['buckets'] = list(self.buckets)
+        return snapshot
+
+
+class Registry:
+    """프로세스 안의 메트릭을 이름으로 모아 둡니다"""
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f'{name} is already registered')
+            return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: typing.Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: typing.Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: typing.Sequence[str] = (),
+                  buckets: typing.Sequence[float] = DEFAULT_BUCKETS
+                  ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames,
+                              buckets=buckets)
+
+    def __iter__(self) -> typing.Iterator[Metric]:
+        return iter(list(self._metrics.values()))
+
+    def snapshot(self) -> dict:
+        """JSON 으로 저장할 수 있는 현재 값들"""
+        return OrderedDict((metric.name, metric.snapshot())
+                           for metric in self)
+
+
+def merge(snapshots: typing.Iterable[dict]) -> dict:
+    """여러 프로세스의 snapshot 을 레이블별로 더합니다"""
+    merged = OrderedDict()
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(metric, samples=OrderedDict())
+            samples = target['samples']
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = Histogram._copy(value) \
+                        if metric['type'] == Histogram.type else value
+                elif metric['type'] == Histogram.type:
+                    counts, total = value
+                    current[0] = [a + b for a, b in zip(current[0], counts)]
+                    current[1] += total
+                else:
+                    samples[key] = current + value
+    for metric in merged.values():
+        metric['samples'] = [[list(key), value]
+                             for key, value in metric['samples'].items()]
+    return merged
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    return value.replace('"', '\\"') if quote else value
+
+
+def _labels(names: typing.Sequence[str], values: typing.Sequence[str],
+            extra: typing.Sequence[tuple] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(f'{name}="{_escape(str(value))}"'
+                             for name, value in pairs)
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(snapshot: dict) -> str:
+    """Prometheus 텍스트 포맷 (version 0.0.4)"""
+    lines = []
+    for name, metric in snapshot.items():
+        lines.append(f'# HELP {name} {_escape(metric["help"], False)}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        labelnames = metric['labelnames']
+        for values, value in metric['samples']:
+            if metric['type'] != Histogram.type:
+                lines.append(f'{name}{_labels(labelnames, values)} '
+                             f'{_number(value)}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for le, count in zip((*metric['buckets'], math.inf), counts):
+                cumulative += count
+                label = _labels(labelnames, values, [('le', _number(le))])
+                lines.append(f'{name}_bucket{label} {cumulative}')
+            label = _labels(labelnames, values)
+            lines.append(f'{name}_sum{label} {_number(total)}')
+            lines.append(f'{name}_count{label} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class FileExporter:
+    """워커 프로세스마다 메트릭을 파일로 써서 노드 전체를 한 번에 수집합니다
+
+        각 프로세스는 directory/<pid>-<token>.json 에 자기 값 전체를
+        interval 초에 한 번씩 덮어쓰고, 수집할 때는 모든 파일을 읽어
+        더합니다. 종료된 워커의 파일도 남겨 두므로 카운터가 줄어들지
+        않습니다. (배포할 때 directory 를 비웁니다)
+
+        directory 가 None 이면 현재 프로세스의 값만 사용합니다.
+    """
+
+    def __init__(self, registry: Registry, directory: typing.Optional[str],
+                 interval: float = 1.):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._path = None
+        self._flushed_at = 0.
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        # fork 된 프로세스는 새 파일에 씁니다
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._path = os.path.join(
+                self.directory, f'{pid}-{uuid.uuid4().hex[:8]}.json')
+        return self._path
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            path = self.path
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(tmp, path)
+            self._flushed_at = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        if self.directory is not None and \
+                time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def collect(self) -> dict:
+        if self.directory is None:
+            return self.registry.snapshot()
+        self.flush()
+        snapshots = []
+        for path in sorted(glob.glob(os.path.join(self.directory,
+                                                  '*.json'))):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # 다른 워커가 지우는 중
+                continue
+        return merge(snapshots)
+
+
+registry = Registry()
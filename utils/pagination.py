@@ -0,0 +1,112 @@
+import base64
+import binascii
+import json
+import typing
+import uuid
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage(typing.NamedTuple):
+    items: list
+    next: typing.Optional[str]
+    prev: typing.Optional[str]
+
+
+class CursorPaginator:
+    """(created_at, id) 키셋을 기준으로 페이지를 나눕니다
+
+        OFFSET 을 쓰지 않으므로 몇 번째 페이지든 같은 비용으로 조회합니다.
+
+        커서는 마지막으로 본 행의 (created_at, id) 와 방향을 담은
+        불투명한 base64 문자열입니다.
+    """
+    FORWARD = 'n'
+    BACKWARD = 'p'
+
+    def __init__(self, queryset: QuerySet, limit: typing.Optional[str] = None,
+                 cursor: typing.Optional[str] = None):
+        self.queryset = queryset
+        self.limit = self.parse_limit(limit)
+        self.cursor = cursor
+
+    @staticmethod
+    def parse_limit(limit: typing.Optional[str]) -> int:
+        if limit in (None, ''):
+            return settings.API_PAGE_DEFAULT_LIMIT
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid limit')
+        if limit < 1:
+            raise InvalidCursor('Invalid limit')
+        # 서버측 최대 페이지 크기
+        return min(limit, settings.API_PAGE_MAX_LIMIT)
+
+    @classmethod
+    def encode_cursor(cls, direction: str, obj) -> str:
+        # 모델 인스턴스와 .values() 의 dict 모두 받습니다
+        if isinstance(obj, dict):
+            created_at, id_ = obj['created_at'], obj['id']
+        else:
+            created_at, id_ = obj.created_at, obj.id
+        raw = json.dumps([direction, created_at.isoformat(), id_.hex])
+        return base64.urlsafe_b64encode(raw.encode('utf8')).decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+            direction, created_at, id_ = json.loads(raw.decode('utf8'))
+            created_at = parse_datetime(created_at)
+            id_ = uuid.UUID(id_)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+        if direction not in (cls.FORWARD, cls.BACKWARD) or created_at is None:
+            raise InvalidCursor('Invalid cursor')
+        return direction, created_at, id_
+
+    def page(self) -> CursorPage:
+        queryset = self.queryset
+        direction = self.FORWARD
+        if self.cursor:
+            direction, created_at, id_ = self.decode_cursor(self.cursor)
+            # 앞의 범위 조건이 있어야 (created_at, id) 인덱스를
+            # 처음부터 훑지 않고 커서 위치에서 바로 시작합니다
+            if direction == self.FORWARD:
+                bound = Q(created_at__gte=created_at)
+                after = Q(created_at__gt=created_at) | Q(id__gt=id_)
+            else:
+                bound = Q(created_at__lte=created_at)
+                after = Q(created_at__lt=created_at) | Q(id__lt=id_)
+            queryset = queryset.filter(bound, after)
+
+        if direction == self.FORWARD:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        # 다음 페이지 존재 여부를 알기 위해 하나 더 가져옵니다
+        items = list(queryset[:self.limit + 1])
+        has_more = len(items) > self.limit
+        items = items[:self.limit]
+
+        if direction == self.BACKWARD:
+            items.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, bool(self.cursor)
+
+        if not items:
+            return CursorPage(items=items, next=None, prev=None)
+        next_ = self.encode_cursor(self.FORWARD, items[-1]) \
+            if has_next else None
+        prev = self.encode_cursor(self.BACKWARD, items[0]) \
+            if has_prev else None
+        return CursorPage(items=items, next=next_, prev=prev)
@@ -0,0 +1,116 @@
+import os
+import re
+import traceback
+import typing
+from collections import OrderedDict
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def sql_shape(sql: str) -> str:
+    """값만 다른 쿼리가 같은 문자열이 되도록 정규화합니다
+
+        리터럴은 ?, IN (%s, %s, ...) 처럼 길이가 다른 목록은 (...) 로 바꿉니다.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _PLACEHOLDERS.sub('(...)', sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget(ContextDecorator):
+    """블록 안에서 실행된 쿼리 수와 반복되는 쿼리(N+1)를 검사합니다
+
+        with QueryBudget(max_queries=1):
+            self.client.get(url)
+
+        max_queries 를 넘거나 같은 모양의 쿼리가 max_repeats 번보다 많이
+        실행되면 QueryBudgetExceeded 를 발생시키며, 반복된 쿼리는 처음
+        실행된 곳의 (이 프로젝트 코드의) 스택을 함께 보여줍니다.
+        raise_exception=False 이면 violations() 로 확인만 합니다.
+
+        None 인 제한은 검사하지 않습니다.
+    """
+
+    def __init__(self, max_queries: typing.Optional[int] = None,
+                 max_repeats: typing.Optional[int] = None,
+                 using: typing.Optional[typing.Sequence[str]] = None,
+                 raise_exception: bool = True):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.using = using
+        self.raise_exception = raise_exception
+        self.queries = []
+        self._stack = None
+
+    def _recreate_cm(self):
+        # 데코레이터로 쓰면 호출마다 새 기록을 가집니다
+        return type(self)(self.max_queries, self.max_repeats, self.using,
+                          self.raise_exception)
+
+    def record(self, execute, sql, params, many, context):
+        self.queries.append((sql, self._caller()))
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def _is_project_frame(frame: traceback.FrameSummary) -> bool:
+        filename = frame.filename
+        if filename == __file__ or 'site-packages' in filename:
+            return False
+        return filename.startswith(str(settings.BASE_DIR) + os.sep)
+
+    @classmethod
+    def _caller(cls) -> traceback.StackSummary:
+        frames = traceback.extract_stack()[:-2]
+        return traceback.StackSummary.from_list(
+            [frame for frame in frames if cls._is_project_frame(frame)])
+
+    def __enter__(self) -> 'QueryBudget':
+        self.queries = []
+        self._stack = ExitStack()
+        aliases = self.using if self.using is not None else connections
+        for alias in aliases:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self.record))
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stack.close()
+        if exc_type is None and self.raise_exception:
+            violations = self.violations()
+            if violations:
+                raise QueryBudgetExceeded('\n\n'.join(violations))
+
+    def repeated(self) -> 'OrderedDict[str, list]':
+        """max_repeats 번보다 많이 실행된 모양 -> [(sql, stack), ...]"""
+        shapes = OrderedDict()
+        for sql, stack in self.queries:
+            shapes.setdefault(sql_shape(sql), []).append((sql, stack))
+        if self.max_repeats is None:
+            return OrderedDict()
+        return OrderedDict((shape, queries)
+                           for shape, queries in shapes.items()
+                           if len(queries) > self.max_repeats)
+
+    def violations(self) -> typing.List[str]:
+        violations = []
+        if self.max_queries is not None and \
+                len(self.queries) > self.max_queries:
+            listing = '\n'.join(f'  {i}. {sql}' for i, (sql, _)
+                                in enumerate(self.queries, start=1))
+            violations.append(f'{len(self.queries)} queries executed, '
+                              f'budget is {self.max_queries}:\n{listing}')
+        for shape, queries in self.repeated().items():
+            stack = ''.join(queries[0][1].format())
+            violations.append(f'Possible N+1: {len(queries)} queries shaped '
+                              f'like\n  {shape}\nfirst executed at:\n{stack}')
+        return violations
@@ -0,0 +1,43 @@
+import hashlib
+import typing
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_PREFIX = 'hbnn:version:'
+RESPONSE_PREFIX = 'hbnn:response:'
+
+
+def get_cache():
+    return caches[settings.API_RESPONSE_CACHE]
+
+
+def new_version() -> str:
+    # 숫자가 아닌 임의의 값이라 버전 키가 지워져도 예전 값과 겹치지 않습니다
+    return uuid.uuid4().hex
+
+
+def get_versions(names: typing.Iterable[str]) -> typing.List[str]:
+    """names 의 현재 버전을 가져옵니다 (없으면 새로 만듭니다)"""
+    cache = get_cache()
+    keys = [VERSION_PREFIX + name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*names: str) -> None:
+    """names 에 의존하는 모든 캐시된 응답을 O(1) 로 무효화합니다"""
+    get_cache().set_many({VERSION_PREFIX + name: new_version()
+                          for name in names}, None)
+
+
+def response_key(path: str, versions: typing.Iterable[str],
+                 replica: bool = False) -> str:
+    """replica 이면 복제본에서 읽어 만든 응답을 primary 의 것과 따로 둡니다"""
+    key = '|'.join((path, *versions, 'replica' if replica else 'primary'))
+    return RESPONSE_PREFIX + hashlib.md5(key.encode('utf8')).hexdigest()
@@ -0,0 +1,57 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from utils.metrics import registry
+
+routed_total = registry.counter(
+    'hbnn_db_routed_total',
+    'Database router decisions by alias and operation.',
+    labelnames=('alias', 'operation'))
+
+# async 핸들러가 utils.aio.run_sync 로 넘긴 ORM 호출에도 전달됩니다
+_replica = contextvars.ContextVar('hbnn_replica', default=False)
+
+
+@contextmanager
+def use_replica():
+    """이 블록 안의 읽기를 DATABASE_REPLICAS 로 보냅니다"""
+    token = _replica.set(True)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def reading_from_replica() -> bool:
+    return bool(settings.DATABASE_REPLICAS) and _replica.get()
+
+
+class ReplicaRouter:
+    """읽기는 (use_replica 블록 안에서) 복제본으로, 쓰기는 primary 로 보냅니다
+
+        DATABASE_REPLICAS 가 비어 있으면 모든 쿼리가 default 로 갑니다.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = DEFAULT_DB_ALIAS
+        if reading_from_replica():
+            alias = random.choice(settings.DATABASE_REPLICAS)
+        routed_total.inc(alias=alias, operation='read')
+        return alias
+
+    def db_for_write(self, model, **hints):
+        routed_total.inc(alias=DEFAULT_DB_ALIAS, operation='write')
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 복제본은 primary 와 같은 데이터입니다
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,131 @@
+import datetime
+import decimal
+import functools
+import typing
+import uuid
+
+from django.db.models import Model, QuerySet
+
+
+def _datetime(value: datetime.datetime) -> str:
+    # DjangoJSONEncoder 와 같은 표기 (밀리초, UTC 는 'Z')
+    r = value.isoformat()
+    if value.microsecond:
+        r = r[:23] + r[26:]
+    if r.endswith('+00:00'):
+        r = r[:-6] + 'Z'
+    return r
+
+
+def _time(value: datetime.time) -> str:
+    r = value.isoformat()
+    if value.microsecond:
+        r = r[:12]
+    return r
+
+
+_CONVERTERS = {
+    'DateTimeField': _datetime,
+    'DateField': datetime.date.isoformat,
+    'TimeField': _time,
+    'UUIDField': str,
+    'DecimalField': str,
+}
+
+
+def _converter(field) -> typing.Optional[typing.Callable]:
+    if field.is_relation:
+        field = field.target_field
+    convert = _CONVERTERS.get(field.get_internal_type())
+    if convert is None:
+        return None
+
+    def converter(value):
+        return None if value is None else convert(value)
+    return converter
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class FieldSerializer:
+    """모델과 필드 목록으로부터 직렬화 계획을 한 번만 만들어 둡니다
+
+        django.core.serializers 의 'json' 포맷과 같은
+        {'model', 'pk', 'fields'} 형태의 dict 를 만들지만,
+        문자열로 인코딩했다가 다시 파싱하지 않고 한 번에 만듭니다.
+
+        QuerySet 은 .values() 로 필요한 컬럼만 읽습니다.
+    """
+
+    def __init__(self, model: typing.Type[Model],
+                 fields: typing.Iterable[str]):
+        opts = model._meta
+        self.model = model
+        self.label = str(opts)
+        self.fields = tuple(fields)
+
+        self.pk_attname = opts.pk.attname
+        self.pk_converter = _converter(opts.pk)
+        # (응답 키, 모델 attname, 값 변환 함수)
+        self.plan = tuple(
+            (name, opts.get_field(name).attname,
+             _converter(opts.get_field(name)))
+            for name in self.fields
+        )
+        self.values_fields = (self.pk_attname, ) + tuple(
+            attname for _, attname, _ in self.plan
+            if attname != self.pk_attname)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def for_model(cls, model: typing.Type[Model],
+                  fields: typing.Tuple[str, ...]) -> 'FieldSerializer':
+        return cls(model, fields)
+
+    def _build(self, get) -> dict:
+        pk = get(self.pk_attname)
+        if self.pk_converter is not None:
+            pk = self.pk_converter(pk)
+        fields = {}
+        for name, attname, converter in self.plan:
+            value = get(attname)
+            fields[name] = value if converter is None else converter(value)
+        return {'model': self.label, 'pk': pk, 'fields': fields}
+
+    def from_values(self, row: dict) -> dict:
+        return self._build(row.__getitem__)
+
+    def from_object(self, obj: Model) -> dict:
+        return self._build(functools.partial(getattr, obj))
+
+    def values(self, queryset: QuerySet, *extra: str) -> QuerySet:
+        """extra 는 직렬화하지 않지만 함께 읽을 컬럼입니다 (예: 커서)"""
+        return queryset.values(*self.values_fields, *(
+            name for name in extra if name not in self.values_fields))
+
+    def sparse(self, fields: typing.Optional[str]) -> 'FieldSerializer':
+        """'username,email' 처럼 쉼표로 구분한 필드만 내보내는 serializer
+
+            None 이거나 필드가 없으면 ('', ',') 자신을 돌려줍니다.
+            self.fields 에 없는 필드가 있으면 InvalidFields 이며, 필드 순서는
+            요청과 관계없이 self.fields 를 따릅니다.
+        """
+        if fields is None:
+            return self
+        names = {name.strip() for name in fields.split(',') if name.strip()}
+        if not names:
+            return self
+        unknown = names.difference(self.fields)
+        if unknown:
+            raise InvalidFields(
+                f'Unknown fields: {", ".join(sorted(unknown))}')
+        return self.for_model(self.model, tuple(
+            name for name in self.fields if name in names))
+
+    def serialize(self, data: typing.Union[QuerySet, typing.Iterable[Model]]
+                  ) -> typing.List[dict]:
+        if isinstance(data, QuerySet) and data._result_cache is None:
+            return [self.from_values(row) for row in self.values(data)]
+        return [self.from_object(obj) for obj in data]
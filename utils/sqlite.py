@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """connection_created 시그널에서 SQLITE_PRAGMAS 를 적용합니다
+
+        PRAGMA 는 연결마다 설정되므로 새 연결이 만들어질 때마다 실행합니다.
+        (journal_mode=WAL 은 데이터베이스 파일에 남습니다)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', ())
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
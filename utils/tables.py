@@ -0,0 +1,19 @@
+import typing
+
+
+def print_table(rows: typing.Iterable[typing.Sequence],
+                header: typing.Sequence[str],
+                write: typing.Callable[[str], typing.Any] = print) -> None:
+    """열을 맞춘 표를 한 줄씩 write 로 출력합니다
+
+        benchmarks/ 의 스크립트와 loadtest 명령이 함께 사용합니다.
+        관리 명령에서는 write=self.stdout.write 로 사용합니다.
+    """
+    rows = [tuple(str(column) for column in row) for row in rows]
+    widths = [max(len(str(h)), *(len(row[i]) for row in rows))
+              for i, h in enumerate(header)]
+    line = '  '.join('{:<%d}' % width for width in widths)
+    write(line.format(*header))
+    write(line.format(*('-' * width for width in widths)))
+    for row in rows:
+        write(line.format(*row))
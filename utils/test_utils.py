@@ -0,0 +1,454 @@
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+import uuid
+from unittest import mock
+
+from django.db import connection, router
+from django.test import RequestFactory, TestCase, override_settings
+
+from api.decorators import cached_response
+from api.views import APIView
+from user.models import User
+from utils.aio import execute_wrapper, run_sync
+from utils.auth import JWTManager
+from utils.cache import TTLLRUCache
+from utils.compression import Compressor, choose_encoding, compress
+from utils.fragments import Fragment, FragmentCache, FragmentEncoder
+from utils.hashing import HashingPool, HashingPoolFull, queue_seconds
+from utils.health import check_disk, check_migrations
+from utils import response_cache
+from utils.metrics import FileExporter, Registry, merge, render
+from utils.query_budget import QueryBudget, QueryBudgetExceeded, sql_shape
+from utils.routers import reading_from_replica, routed_total, use_replica
+from utils.serializers import FieldSerializer, InvalidFields
+from utils.sqlite import apply_pragmas
+from utils.uuids import uuid7
+
+
+class TTLLRUCacheTestCase(TestCase):
+    def test_lru(self):
+        cache = TTLLRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl(self):
+        now = [0]
+        cache = TTLLRUCache(maxsize=2, ttl=10, timer=lambda: now[0])
+        cache.set('a', 1)
+        now[0] = 9
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class JWTManagerTestCase(TestCase):
+    def test_decode_cached(self):
+        user = User.objects.create_user('test@test.com', 'test', 'test')
+        token = JWTManager.encode(user_id=str(user.id))
+
+        self.assertEqual(JWTManager.decode(token), user)
+        with self.assertNumQueries(0):
+            cached_user = JWTManager.decode(token)
+        self.assertEqual(cached_user.username, 'test')
+
+        # 저장하면 캐시가 무효화됩니다
+        user.username = 'test2'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(JWTManager.decode(token).username, 'test2')
+
+        user.delete()
+        self.assertIsNone(JWTManager.decode(token))
+
+    def test_decode_invalid_user_id(self):
+        token = JWTManager.encode(user_id='not-a-uuid')
+        self.assertIsNone(JWTManager.decode(token))
+
+
+class HashingPoolTestCase(TestCase):
+    @staticmethod
+    def wait_done(pool):
+        # 결과를 받은 뒤에도 워커 스레드는 아직 _done 콜백을 실행 중일 수
+        # 있으므로 스레드가 끝날 때까지 기다립니다
+        pool._executor.shutdown(wait=True)
+
+    def test_run(self):
+        pool = HashingPool(workers=1, max_pending=1)
+        count = queue_seconds.count(operation='test')
+
+        self.assertEqual(pool.run('test', pow, 2, 10), 1024)
+        self.assertEqual(queue_seconds.count(operation='test'), count + 1)
+        self.wait_done(pool)
+        self.assertEqual(pool.pending, 0)
+
+    def test_full(self):
+        pool = HashingPool(workers=1, max_pending=1)
+        release = threading.Event()
+        future = pool.submit('test', release.wait)
+
+        with self.assertRaises(HashingPoolFull):
+            pool.submit('test', pow, 2, 10)
+        release.set()
+        future.result()
+
+    def test_run_async(self):
+        pool = HashingPool(workers=1, max_pending=1)
+        self.assertEqual(asyncio.run(pool.run_async('test', pow, 2, 10)),
+                         1024)
+        self.wait_done(pool)
+        self.assertEqual(pool.pending, 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class AioTestCase(TestCase):
+    def test_run_sync(self):
+        def call():
+            return threading.get_ident(), reading_from_replica()
+
+        async def handler():
+            with use_replica():
+                return await run_sync(call)
+
+        # ASGI 에서는 스레드 풀에서, contextvars 를 가지고 실행합니다
+        ident, replica = asyncio.run(handler())
+        self.assertNotEqual(ident, threading.get_ident())
+        self.assertTrue(replica)
+
+    def test_execute_wrapper(self):
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        async def handler():
+            with execute_wrapper(wrapper):
+                await run_sync(query)
+            await run_sync(query)
+
+        asyncio.run(handler())
+        self.assertEqual(queries, ['SELECT 1'])
+
+
+class CompressionTestCase(TestCase):
+    @mock.patch('utils.compression.brotli', None)
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'gzip')
+        self.assertIsNone(choose_encoding(''))
+        self.assertIsNone(choose_encoding('br'))
+        self.assertIsNone(choose_encoding('gzip;q=0, deflate'))
+        self.assertIsNone(choose_encoding('*;q=0'))
+
+    @mock.patch('utils.compression.brotli', object())
+    def test_choose_encoding_brotli(self):
+        self.assertEqual(choose_encoding('gzip, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0.5'), 'gzip')
+
+    def test_compressor(self):
+        data = b'{"description": "' + b'hbnn ' * 1000 + b'"}'
+        compressor = Compressor('gzip', 6)
+        chunks = [compressor.compress(data[i:i + 100])
+                  for i in range(0, len(data), 100)]
+        chunks.append(compressor.flush())
+        self.assertEqual(gzip.decompress(b''.join(chunks)), data)
+        self.assertEqual(gzip.decompress(compress(data, 'gzip', 1)), data)
+        self.assertLess(len(compress(data, 'gzip', 9)), len(data))
+
+
+class FragmentTestCase(TestCase):
+    def test_encoder(self):
+        data = {'data': [Fragment(b'{"a": 1}'), 'x\x00', Fragment(b'[]')]}
+        self.assertEqual(json.dumps(data, cls=FragmentEncoder),
+                         '{"data": [{"a": 1}, "x\\u0000", []]}')
+        self.assertEqual(json.dumps({'a': 1}, cls=FragmentEncoder),
+                         '{"a": 1}')
+
+    def test_fragments(self):
+        serializer = FieldSerializer(User, ('username', 'email'))
+        cache = FragmentCache(serializer, maxsize=10, ttl=60)
+        users = [User.objects.create_user(f'test{i}@test.com', f'test{i}',
+                                          'test') for i in range(3)]
+
+        def fragments():
+            keys = list(User.objects.filter(id__in=[u.id for u in users])
+                        .order_by('-username')
+                        .values_list('id', 'modified_at'))
+            return cache.fragments(keys, User.objects.all())
+
+        # 캐시에 없는 행만 한 번의 쿼리로 읽습니다
+        with self.assertNumQueries(2):
+            result = fragments()
+        self.assertEqual(list(result), [u.id for u in reversed(users)])
+        self.assertEqual(json.loads(result[users[0].id]),
+                         serializer.from_object(users[0]))
+        with self.assertNumQueries(1):
+            self.assertEqual(fragments(), result)
+
+        # 저장하면 modified_at 이 바뀌므로 그 행만 다시 읽습니다
+        users[1].username = 'changed'
+        users[1].save()
+        with self.assertNumQueries(2):
+            result = fragments()
+        self.assertEqual(json.loads(result[users[1].id])['fields'],
+                         {'username': 'changed', 'email': 'test1@test.com'})
+        self.assertIs(cache.from_object(users[1]), result[users[1].id])
+
+
+class FieldSerializerTestCase(TestCase):
+    def test_sparse(self):
+        serializer = FieldSerializer(User, ('username', 'email', 'created_at'))
+        self.assertIs(serializer.sparse(None), serializer)
+
+        sparse = serializer.sparse(' created_at, username,username')
+        self.assertEqual(sparse.fields, ('username', 'created_at'))
+        self.assertIs(serializer.sparse('username,created_at'), sparse)
+        self.assertIs(serializer.sparse(''), serializer)
+        self.assertIs(serializer.sparse(' , '), serializer)
+
+        with self.assertRaises(InvalidFields):
+            serializer.sparse('username,password')
+
+    def test_values(self):
+        serializer = FieldSerializer(User, ('username', ))
+        queryset = serializer.values(User.objects.all(), 'created_at', 'id')
+        self.assertEqual(queryset._fields, ('id', 'username', 'created_at'))
+
+
+class SQLitePragmaTestCase(TestCase):
+    def get_pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_apply_pragmas(self):
+        cache_size = self.get_pragma('cache_size')
+        with override_settings(SQLITE_PRAGMAS=(('cache_size', -1234), )):
+            apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.get_pragma('cache_size'), -1234)
+
+        apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.get_pragma('cache_size'), -1234)
+        with override_settings(SQLITE_PRAGMAS=(('cache_size', cache_size), )):
+            apply_pragmas(sender=None, connection=connection)
+
+
+class MetricsTestCase(TestCase):
+    def make_registry(self):
+        registry = Registry()
+        counter = registry.counter('requests_total', 'Requests.',
+                                   labelnames=('route', ))
+        histogram = registry.histogram('latency_seconds', 'Latency.',
+                                       buckets=(.1, 1))
+        return registry, counter, histogram
+
+    def test_render(self):
+        registry, counter, histogram = self.make_registry()
+        counter.inc(route='a"b')
+        histogram.observe(.05)
+        histogram.observe(2)
+        self.assertEqual(render(registry.snapshot()), '\n'.join((
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{route="a\\"b"} 1',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 1',
+            'latency_seconds_bucket{le="+Inf"} 2',
+            'latency_seconds_sum 2.05',
+            'latency_seconds_count 2',
+        )) + '\n')
+
+    def test_file_exporter(self):
+        # 워커 프로세스 두 개를 레지스트리 두 개로 흉내냅니다
+        first, first_counter, first_histogram = self.make_registry()
+        second, second_counter, _ = self.make_registry()
+        first_counter.inc(route='a')
+        first_histogram.observe(.5)
+        second_counter.inc(2, route='a')
+        second_counter.inc(route='b')
+
+        with tempfile.TemporaryDirectory() as directory:
+            FileExporter(second, directory).flush()
+            collected = FileExporter(first, directory).collect()
+
+        self.assertEqual(collected, merge([first.snapshot(),
+                                           second.snapshot()]))
+        self.assertEqual(dict(map(lambda s: (s[0][0], s[1]),
+                                  collected['requests_total']['samples'])),
+                         {'a': 3, 'b': 1})
+        self.assertEqual(collected['latency_seconds']['samples'],
+                         [[[], [[0, 1, 0], .5]]])
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        self.ids = [
+            User.objects.create(email=f'{i}@hbnn.kr', username=str(i)).id
+            for i in range(3)
+        ]
+
+    def test_sql_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT * FROM "user_user" WHERE "id" IN (%s, %s) '
+                      "AND name = 'x''y' LIMIT 21"),
+            sql_shape('SELECT * FROM "user_user" WHERE "id" IN (%s) '
+                      "AND name = 'z' LIMIT 1"))
+
+    def test_max_queries(self):
+        with QueryBudget(max_queries=1):
+            list(User.objects.filter(id__in=self.ids))
+        with self.assertRaisesMessage(QueryBudgetExceeded,
+                                      '2 queries executed, budget is 1'):
+            with QueryBudget(max_queries=1):
+                User.objects.count()
+                User.objects.count()
+
+    def test_n_plus_one(self):
+        with self.assertRaises(QueryBudgetExceeded) as cm:
+            with QueryBudget(max_repeats=2):
+                for user_id in self.ids:
+                    User.objects.get(id=user_id)
+        message = str(cm.exception)
+        self.assertIn('Possible N+1: 3 queries shaped like', message)
+        # 쿼리를 실행한 이 파일의 위치를 보여줍니다
+        self.assertIn('test_utils.py', message)
+        self.assertIn('User.objects.get(id=user_id)', message)
+
+        budget = QueryBudget(max_repeats=3, raise_exception=False)
+        with budget:
+            for user_id in self.ids:
+                User.objects.get(id=user_id)
+        self.assertEqual(budget.violations(), [])
+
+    def test_decorator(self):
+        @QueryBudget(max_queries=1)
+        def count():
+            return User.objects.count()
+
+        # 호출마다 따로 셉니다
+        self.assertEqual(count(), 3)
+        self.assertEqual(count(), 3)
+
+
+class HealthCheckTestCase(TestCase):
+    def test_checks(self):
+        self.assertEqual(check_migrations(), 'ok')
+        self.assertTrue(check_disk().endswith('bytes free'))
+        with override_settings(HEALTH_MIN_FREE_DISK_BYTES=2 ** 62):
+            self.assertRaises(RuntimeError, check_disk)
+
+
+class UUID7TestCase(TestCase):
+    def test_uuid7(self):
+        ids = [uuid7() for _ in range(1000)]
+        self.assertTrue(all(i.version == 7 for i in ids))
+        self.assertTrue(all(i.variant == uuid.RFC_4122 for i in ids))
+        # SQLite 에 저장되는 hex 문자열도 생성 순서대로 정렬됩니다
+        self.assertEqual([i.hex for i in ids], sorted(i.hex for i in ids))
+
+    def test_mixed_keys(self):
+        old = User.objects.create(id=uuid.uuid4(), email='old@hbnn.kr',
+                                  username='old')
+        new = User.objects.create_user(email='new@hbnn.kr', username='new',
+                                       password='password')
+        self.assertEqual(new.id.version, 7)
+        self.assertEqual(User.objects.get(id=old.id), old)
+        self.assertEqual(User.objects.get(id=new.id), new)
+
+    def test_cursor_uses_index(self):
+        created_at = User.objects.create_user(
+            email='user@hbnn.kr', username='user',
+            password='password').created_at
+        queryset = User.objects.filter(created_at__gte=created_at) \
+            .order_by('created_at', 'id')
+        self.assertIn('user_created_id_idx', queryset.explain())
+
+
+class RoutedView(APIView):
+    replica_methods = ('get', )
+
+    def get(self, request):
+        return self.response(data=router.db_for_read(User))
+
+    def post(self, request):
+        return self.response(data=router.db_for_write(User))
+
+
+class CachedRoutedView(RoutedView):
+    # 복제본은 쓰기 전의 값 ('replica'), primary 는 쓴 값 ('default') 입니다
+    @cached_response(lambda view, request: ['routed'])
+    def get(self, request):
+        return super().get(request)
+
+    def post(self, request):
+        response_cache.bump('routed')
+        return super().post(request)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTestCase(TestCase):
+    def test_router(self):
+        self.assertEqual(router.db_for_read(User), 'default')
+        with use_replica():
+            self.assertEqual(router.db_for_read(User), 'replica')
+            self.assertEqual(router.db_for_write(User), 'default')
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'user'))
+
+        with override_settings(DATABASE_REPLICAS=[]), use_replica():
+            self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_dispatch(self):
+        factory = RequestFactory()
+        view = RoutedView.as_view()
+        reads = routed_total.value(alias='replica', operation='read')
+
+        response = view(factory.get('/'))
+        self.assertEqual(json.loads(response.content)['data'], 'replica')
+        self.assertEqual(routed_total.value(alias='replica',
+                                            operation='read'), reads + 1)
+
+        # 쓰기를 한 클라이언트는 잠시 primary 에서 읽습니다
+        response = view(factory.post('/'))
+        cookie = response.cookies[APIView.PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+
+        request = factory.get('/')
+        request.COOKIES[APIView.PRIMARY_COOKIE] = cookie.value
+        response = view(request)
+        self.assertEqual(json.loads(response.content)['data'], 'default')
+
+    def test_cached_response(self):
+        factory = RequestFactory()
+        view = CachedRoutedView.as_view()
+        response_cache.get_cache().clear()
+
+        # 쓴 직후 복제본에서 읽은 (지연된) 응답이 캐시에 들어갑니다
+        cookie = view(factory.post('/')).cookies[APIView.PRIMARY_COOKIE]
+        response = view(factory.get('/'))
+        self.assertEqual(json.loads(response.content)['data'], 'replica')
+
+        # 쓴 클라이언트는 그 응답이 아니라 쓴 값을 받습니다
+        request = factory.get('/')
+        request.COOKIES[APIView.PRIMARY_COOKIE] = cookie.value
+        response = view(request)
+        self.assertEqual(json.loads(response.content)['data'], 'default')
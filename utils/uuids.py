@@ -0,0 +1,28 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last = 0
+
+
+def uuid7() -> uuid.UUID:
+    """시간 순서로 정렬되는 UUID (RFC 9562 의 version 7)
+
+        앞 48비트는 유닉스 시간(밀리초), 뒤는 난수입니다.
+        SQLite 에는 hex 문자열로 저장되므로 새 키는 항상 primary key
+        B-tree 의 오른쪽 끝에 쌓입니다. 같은 밀리초 안에서도 한 프로세스가
+        만든 값은 이전 값보다 커지도록 12비트 카운터(rand_a)를 올립니다.
+    """
+    global _last
+    with _lock:
+        ms = int(time.time() * 1000)
+        # (ms << 12 | rand_a) 가 이전 값 이하이면 하나 올립니다
+        value = max(ms << 12, _last + 1)
+        _last = value
+
+    ms, rand_a = value >> 12, value & 0xfff
+    rand_b = int.from_bytes(os.urandom(8), 'big') & 0x3fffffffffffffff
+    high = ms << 16 | 0x7 << 12 | rand_a
+    return uuid.UUID(int=high << 64 | 0x2 << 62 | rand_b)